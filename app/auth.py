@@ -0,0 +1,16 @@
+import hmac
+import os
+from typing import Optional
+from fastapi import Header, HTTPException, status
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+def is_admin_token(token: Optional[str]) -> bool:
+    # Fails closed: nothing is admin until ADMIN_TOKEN is configured.
+    if not ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode("latin-1", "replace"), ADMIN_TOKEN.encode("latin-1", "replace"))
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required")
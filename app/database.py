@@ -1,23 +1,175 @@
+import itertools
+import logging
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.models import Base
+import threading
+import time
+from typing import Callable, List, Optional, Tuple, TypeVar
+from fastapi import Depends, Header
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+from app.migrations import LATEST_VERSION, current_version, upgrade
+from app.tenancy import ShardMap, MULTI_TENANT, TENANT_SHARD_URLS, TENANT_SHARD_MAP, SHARD_POOL_SIZE, get_tenant_id, parse_shard_map
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./leave_management.db")
+READ_REPLICA_URLS = [url.strip() for url in os.getenv("READ_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "10"))
+# Opt-in only, so a deploy that forgot ENVIRONMENT never migrates from every worker at once.
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "false").lower() == "true"
+SCHEMA_VERSION = LATEST_VERSION
+
+def normalize_url(url: str) -> str:
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql://", 1)
+    return url
 
-if DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+def make_engine(url: str, **kwargs):
+    connect_args = {"check_same_thread": False} if "sqlite" in url else {}
+    return create_engine(url, connect_args=connect_args, **kwargs)
 
-connect_args = {"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+DATABASE_URL = normalize_url(DATABASE_URL)
+engine = make_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def get_db():
+class Replica:
+    def __init__(self, url: str):
+        self.engine = make_engine(url, pool_pre_ping=True)
+        self.sessionmaker = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.healthy = True
+        self.checked_at = 0.0
+
+class ReplicaRouter:
+    def __init__(self, urls: List[str], primary_sessionmaker=SessionLocal, health_interval: float = REPLICA_HEALTH_INTERVAL):
+        self.replicas = [Replica(normalize_url(url)) for url in urls]
+        self.primary_sessionmaker = primary_sessionmaker
+        self.health_interval = health_interval
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def check_health(self, replica: Replica) -> bool:
+        try:
+            with replica.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            healthy = True
+        except Exception as e:
+            logger.warning("Read replica %s failed health check: %s", replica.engine.url, e)
+            healthy = False
+        replica.healthy = healthy
+        replica.checked_at = time.monotonic()
+        return healthy
+
+    def pick(self) -> Optional[Replica]:
+        if not self.replicas:
+            return None
+        with self._lock:
+            start = next(self._counter)
+        now = time.monotonic()
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if now - replica.checked_at >= self.health_interval:
+                self.check_health(replica)
+            if replica.healthy:
+                return replica
+        return None
+
+    def session(self) -> Tuple[Session, Optional[Replica]]:
+        replica = self.pick()
+        if replica is None:
+            return self.primary_sessionmaker(), None
+        db = replica.sessionmaker()
+        db.info["replica"] = replica
+        return db, replica
+
+    def mark_unhealthy(self, replica: Replica):
+        replica.healthy = False
+        replica.checked_at = time.monotonic()
+
+    def status(self) -> List[dict]:
+        return [
+            {"url": replica.engine.url.render_as_string(hide_password=True), "healthy": replica.healthy}
+            for replica in self.replicas
+        ]
+
+read_router = ReplicaRouter(READ_REPLICA_URLS)
+
+def open_session(tenant_id: str) -> Session:
+    if MULTI_TENANT:
+        return shard_map.session(tenant_id)
     db = SessionLocal()
+    db.info["tenant_id"] = tenant_id
+    return db
+
+def get_db(tenant_id: str = Depends(get_tenant_id)):
+    db = open_session(tenant_id)
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_read_db(tenant_id: str = Depends(get_tenant_id), x_read_consistency: Optional[str] = Header(None)):
+    # Replicas serve the single-database deployment; tenant shards read from their primary.
+    if MULTI_TENANT:
+        db, replica = shard_map.session(tenant_id), None
+    # Clients that just wrote can ask for "strong" reads to bypass replica lag.
+    elif x_read_consistency == "strong":
+        db, replica = read_router.primary_sessionmaker(), None
+    else:
+        db, replica = read_router.session()
+        db.info["tenant_id"] = tenant_id
     try:
         yield db
+    except DBAPIError:
+        if replica:
+            read_router.mark_unhealthy(replica)
+        raise
     finally:
+        fallback = db.info.pop("primary_fallback", None)
+        if fallback is not None:
+            fallback.close()
         db.close()
 
-def create_tables():
-    Base.metadata.create_all(bind=engine)
+def read_with_fallback(db: Session, read: Callable[[Session], T]) -> T:
+    # A replica that fails mid-request leaves rotation and the read is retried once on the
+    # primary, which get_read_db closes with the request's session.
+    try:
+        return read(db)
+    except DBAPIError as e:
+        replica = db.info.get("replica")
+        if replica is None:
+            raise
+        logger.warning("Read replica %s failed, retrying on primary: %s", replica.engine.url, e)
+        read_router.mark_unhealthy(replica)
+        db.rollback()
+        primary = db.info["primary_fallback"] = read_router.primary_sessionmaker()
+        primary.info["tenant_id"] = db.info.get("tenant_id")
+        return read(primary)
+
+def get_schema_version(bind=None) -> Optional[int]:
+    return current_version(bind or engine)
+
+def ensure_schema(bind=None, auto_migrate: bool = AUTO_MIGRATE) -> bool:
+    # Workers only compare versions; migrations run once per deploy via `python -m app.migrations upgrade`.
+    bind = bind or engine
+    version = get_schema_version(bind)
+    if version is not None and version >= SCHEMA_VERSION:
+        return False
+    if not auto_migrate:
+        raise RuntimeError(
+            f"Database schema is at version {version or 0}, expected {SCHEMA_VERSION}; "
+            "run `python -m app.migrations upgrade` before starting the API"
+        )
+    upgrade(bind)
+    return True
+
+shard_map = ShardMap(
+    [normalize_url(url) for url in TENANT_SHARD_URLS] or [DATABASE_URL],
+    engine_factory=lambda url: make_engine(url, pool_size=SHARD_POOL_SIZE, max_overflow=SHARD_POOL_SIZE),
+    overrides=parse_shard_map(TENANT_SHARD_MAP),
+    on_engine_created=lambda shard_engine: ensure_schema(shard_engine),
+    background_engine_factory=lambda url: make_engine(url, poolclass=NullPool)
+)
@@ -0,0 +1,363 @@
+import calendar
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import Integer, and_, case, cast, event, func, select
+from sqlalchemy.orm import Session
+from app.jobs import enqueue_job, register_handler
+from app.models import Employee, LeaveRequest, LeaveStatus, SeasonalProfile
+from app.tenancy import current_tenant
+
+FORECAST_HISTORY_YEARS = int(os.getenv("FORECAST_HISTORY_YEARS", "2"))
+FORECAST_HIGH_RISK = float(os.getenv("FORECAST_HIGH_RISK", "0.75"))
+FORECAST_MEDIUM_RISK = float(os.getenv("FORECAST_MEDIUM_RISK", "0.9"))
+FORECAST_BATCH_SIZE = int(os.getenv("FORECAST_BATCH_SIZE", "20000"))
+FORECAST_CACHE_TTL = float(os.getenv("FORECAST_CACHE_TTL", "300"))
+FORECAST_CACHE_SIZE = int(os.getenv("FORECAST_CACHE_SIZE", "64"))
+FORECAST_PROFILE_REFRESH_DELAY = int(os.getenv("FORECAST_PROFILE_REFRESH_DELAY", "60"))
+
+PROFILE_JOB = "forecast.seasonal_profile"
+EPOCH = date(1970, 1, 1)
+
+TRACKED_MODELS = (LeaveRequest, Employee)
+
+# "all" moves on every committed write that can change a forecast; "history" only when the
+# write can change the seasonal profile, i.e. it touches leave that has already started.
+_write_versions = {"all": 0, "history": 0}
+_version_lock = threading.Lock()
+
+def write_version(scope: str = "all") -> int:
+    return _write_versions[scope]
+
+def _mark(session: Session, history: bool):
+    session.info["forecast_writes"] = session.info.get("forecast_writes", False) or history
+
+def _touches_history(obj) -> bool:
+    if isinstance(obj, LeaveRequest):
+        return obj.start_date is None or obj.start_date < date.today()
+    return True
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, LeaveRequest):
+            _mark(session, _touches_history(obj))
+        elif isinstance(obj, Employee):
+            _mark(session, False)
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, TRACKED_MODELS):
+            _mark(session, _touches_history(obj))
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and issubclass(mapper.class_, TRACKED_MODELS):
+            _mark(orm_execute_state.session, True)
+
+@event.listens_for(Session, "before_commit")
+def _queue_profile_refresh(session):
+    # Writes to past leave change the persisted seasonal profile; queue a rebuild in the same
+    # transaction. Writes within one refresh window share a job that runs once the window closes.
+    if session.info.get("replica"):
+        return
+    session.flush()
+    if session.info.get("forecast_writes"):
+        now = time.time()
+        window = int(now) // FORECAST_PROFILE_REFRESH_DELAY
+        job = ForecastService.request_profile(session, current_tenant(session), date.today(), suffix=str(window))
+        if job is not None:
+            job.next_run_at = datetime.utcnow() + timedelta(seconds=(window + 1) * FORECAST_PROFILE_REFRESH_DELAY - now)
+
+@event.listens_for(Session, "after_commit")
+def _publish_writes(session):
+    history = session.info.pop("forecast_writes", None)
+    if history is not None:
+        with _version_lock:
+            _write_versions["all"] += 1
+            if history:
+                _write_versions["history"] += 1
+
+@event.listens_for(Session, "after_rollback")
+def _discard_writes(session):
+    session.info.pop("forecast_writes", None)
+
+def add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    year = day.year + month // 12
+    month = month % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+def day_number(column, dialect_name: str):
+    # Days since 1970-01-01 computed in SQL, so rows arrive as plain integers.
+    if dialect_name == "sqlite":
+        return cast(func.julianday(column) - 2440587.5, Integer)
+    return cast(column - EPOCH, Integer)
+
+def expand_intervals(np, slots, offsets, deltas, n_slots: int, days: int):
+    # Interval-to-day expansion: +n on the first day, -n after the last, then cumsum per slot.
+    offsets = np.clip(offsets, 0, days)
+    width = days + 1
+    totals = np.bincount(slots * width + offsets, weights=deltas, minlength=n_slots * width)
+    return totals.reshape(n_slots, width)[:, :-1].cumsum(axis=1).astype(np.int64)
+
+class ForecastCache:
+    def __init__(self, ttl: float = FORECAST_CACHE_TTL, max_entries: int = FORECAST_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Tuple[int, float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, version: int) -> Optional[object]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != version or time.monotonic() >= entry[1]:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def put(self, key: tuple, version: int, value: object, ttl: Optional[float] = None):
+        # The TTL bounds staleness from writes made by other worker processes.
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (version, expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+forecast_cache = ForecastCache()
+
+class ForecastService:
+    @staticmethod
+    def headcounts(db: Session, tenant_id: str) -> Dict[str, int]:
+        rows = db.query(Employee.department, func.count(Employee.id)).filter(
+            Employee.tenant_id == tenant_id
+        ).group_by(Employee.department).order_by(Employee.department).all()
+        return {department: count for department, count in rows}
+
+    @staticmethod
+    def employee_departments(np, db: Session, tenant_id: str, refresh: bool = False):
+        # Sorted employee IDs with a department code each, plus the code names. Only employee
+        # updates and deletes move the "history" version; new hires are caught by the caller.
+        key = ("employees", str(db.get_bind().url), tenant_id)
+        version = write_version("history")
+        departments = None if refresh else forecast_cache.get(key, version)
+        if departments is None:
+            rows = db.connection().execute(
+                select(Employee.id, Employee.department).where(Employee.tenant_id == tenant_id).order_by(Employee.id)
+            ).all()
+            names = sorted({department for _, department in rows})
+            codes = {name: i for i, name in enumerate(names)}
+            departments = (
+                np.fromiter((employee_id for employee_id, _ in rows), dtype=np.int64, count=len(rows)),
+                np.fromiter((codes[department] for _, department in rows), dtype=np.int64, count=len(rows)),
+                names
+            )
+            forecast_cache.put(key, version, departments)
+        return departments
+
+    @staticmethod
+    def department_slots(np, db: Session, tenant_id: str, names: List[str], employee_ids):
+        # Position of each employee's department in `names`, or -1 for unknown employees.
+        index = {name: i for i, name in enumerate(names)}
+        for refresh in (False, True):
+            ids, codes, code_names = ForecastService.employee_departments(np, db, tenant_id, refresh)
+            if not len(ids):
+                return np.full(len(employee_ids), -1, dtype=np.int64)
+            translate = np.array([index.get(name, -1) for name in code_names], dtype=np.int64)
+            positions = np.minimum(np.searchsorted(ids, employee_ids), len(ids) - 1)
+            found = ids[positions] == employee_ids
+            if found.all() or refresh:
+                return np.where(found, translate[codes[positions]], -1)
+
+    @staticmethod
+    def load_deltas(np, db: Session, tenant_id: str, names: List[str], first: date, last: date, statuses: List[LeaveStatus]):
+        # Intervals stream as (employee, start, end) rows and are mapped to departments in NumPy;
+        # joining employees in SQL made the database sort every interval by department name.
+        conn = db.connection()
+        approved = case((LeaveRequest.status == LeaveStatus.APPROVED, 1), else_=0)
+        stmt = select(
+            LeaveRequest.employee_id,
+            day_number(LeaveRequest.start_date, conn.dialect.name),
+            day_number(LeaveRequest.end_date, conn.dialect.name),
+            approved
+        ).where(
+            and_(
+                LeaveRequest.tenant_id == tenant_id,
+                LeaveRequest.end_date >= first,
+                LeaveRequest.start_date <= last,
+                LeaveRequest.status.in_(statuses)
+            )
+        )
+
+        # Rows go straight from the DBAPI cursor into NumPy; Result row objects cost more
+        # than the query itself at this size.
+        sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+        cursor = conn.connection.cursor()
+        chunks = []
+        try:
+            cursor.execute(sql)
+            while True:
+                rows = cursor.fetchmany(FORECAST_BATCH_SIZE)
+                if not rows:
+                    break
+                chunks.append(np.array(rows, dtype=np.int64))
+        finally:
+            cursor.close()
+        if not chunks:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        rows = np.concatenate(chunks)
+        base = (first - EPOCH).days
+        # An interval stops counting the day after its end date.
+        employee_ids, starts, ends, flags = rows[:, 0], rows[:, 1] - base, rows[:, 2] - base + 1, rows[:, 3]
+        departments = ForecastService.department_slots(np, db, tenant_id, names, employee_ids)
+        known = departments >= 0
+        slots = (flags * len(names) + departments)[known]
+        return (
+            np.concatenate([slots, slots]),
+            np.concatenate([starts[known], ends[known]]),
+            np.concatenate([np.ones(len(slots), dtype=np.int64), -np.ones(len(slots), dtype=np.int64)])
+        )
+
+    @staticmethod
+    def daily_counts(np, db: Session, tenant_id: str, names: List[str], first: date, last: date, statuses: List[LeaveStatus]):
+        # Rows 0..n-1 hold pending leave and n..2n-1 approved leave, one per department.
+        slots, offsets, deltas = ForecastService.load_deltas(np, db, tenant_id, names, first, last, statuses)
+        counts = expand_intervals(np, slots, offsets, deltas, 2 * len(names), (last - first).days + 1)
+        return counts[:len(names)], counts[len(names):]
+
+    @staticmethod
+    def compute_seasonal_profile(np, db: Session, tenant_id: str, month: date) -> Dict[str, List[float]]:
+        # Average approved absences per calendar month over the history window before `month`.
+        history_start = month - timedelta(days=365 * FORECAST_HISTORY_YEARS)
+        names = list(ForecastService.headcounts(db, tenant_id))
+        _, history = ForecastService.daily_counts(np, db, tenant_id, names, history_start, month - timedelta(days=1), [LeaveStatus.APPROVED])
+        months = (np.datetime64(history_start, "D") + np.arange(history.shape[1])).astype("datetime64[M]").astype(np.int64) % 12
+        month_days = np.eye(12)[months]
+        by_month = (history @ month_days) / np.maximum(month_days.sum(axis=0), 1)
+        return {name: np.round(by_month[i], 4).tolist() for i, name in enumerate(names)}
+
+    @staticmethod
+    def store_seasonal_profile(db: Session, tenant_id: str, month: date) -> SeasonalProfile:
+        import numpy as np
+
+        month = month.replace(day=1)
+        profile = ForecastService.compute_seasonal_profile(np, db, tenant_id, month)
+        row = db.get(SeasonalProfile, (tenant_id, month)) or SeasonalProfile(tenant_id=tenant_id, month=month)
+        row.profile = json.dumps(profile)
+        row.computed_at = datetime.utcnow()
+        db.add(row)
+        db.commit()
+        return row
+
+    @staticmethod
+    def request_profile(db: Session, tenant_id: str, day: date, suffix: str = ""):
+        # Replicas are read-only, so the job is queued through a primary session instead.
+        month = day.replace(day=1).isoformat()
+        key = f"{PROFILE_JOB}:{tenant_id}:{month}" + (f":{suffix}" if suffix else "")
+        payload = {"tenant_id": tenant_id, "month": month}
+        if not db.info.get("replica"):
+            return enqueue_job(db, PROFILE_JOB, payload, idempotency_key=key)
+        from app.database import open_session
+
+        primary = open_session(tenant_id)
+        try:
+            enqueue_job(primary, PROFILE_JOB, payload, idempotency_key=key)
+            primary.commit()
+        finally:
+            primary.close()
+
+    @staticmethod
+    def seasonal_profile(db: Session, tenant_id: str, start: date) -> Tuple[Optional[date], Dict[str, List[float]]]:
+        # Reads the persisted profile; the route never computes it. Until this month's profile
+        # has been built, the latest earlier one is used and a build is queued.
+        month = start.replace(day=1)
+        row = db.query(SeasonalProfile).filter(
+            SeasonalProfile.tenant_id == tenant_id,
+            SeasonalProfile.month <= month
+        ).order_by(SeasonalProfile.month.desc()).first()
+        if row is None or row.month != month:
+            ForecastService.request_profile(db, tenant_id, month)
+            db.commit()
+        if row is None:
+            return None, {}
+        return row.month, json.loads(row.profile)
+
+    @staticmethod
+    def build(db: Session, start: date, months: int) -> dict:
+        # NumPy is only needed for reports, so importing it here keeps API startup lean.
+        import numpy as np
+
+        tenant_id = current_tenant(db)
+        end = add_months(start, months) - timedelta(days=1)
+        headcounts = ForecastService.headcounts(db, tenant_id)
+        names = list(headcounts)
+        booked_pending, booked_approved = ForecastService.daily_counts(np, db, tenant_id, names, start, end, [LeaveStatus.APPROVED, LeaveStatus.PENDING])
+
+        days = np.datetime64(start, "D") + np.arange((end - start).days + 1)
+        profile_month, profile = ForecastService.seasonal_profile(db, tenant_id, start)
+        by_month = np.array([profile.get(name, [0.0] * 12) for name in names], dtype=np.float64).reshape(len(names), 12)
+        seasonal = by_month[:, days.astype("datetime64[M]").astype(np.int64) % 12]
+
+        headcount = np.array([headcounts[name] for name in names], dtype=np.float64).reshape(len(names), 1)
+        expected = np.maximum(booked_approved + booked_pending, seasonal)
+        available = np.maximum(headcount - expected, 0)
+        availability = available / np.maximum(headcount, 1)
+        risk = np.select([availability < FORECAST_HIGH_RISK, availability < FORECAST_MEDIUM_RISK], ["high", "medium"], "low")
+
+        return {
+            "start_date": start,
+            "end_date": end,
+            "seasonal_profile_month": profile_month,
+            "dates": days.astype(object).tolist(),
+            "departments": [
+                {
+                    "department": name,
+                    "headcount": headcounts[name],
+                    "approved": booked_approved[i].tolist(),
+                    "pending": booked_pending[i].tolist(),
+                    "seasonal": np.round(seasonal[i], 2).tolist(),
+                    "available": np.round(available[i], 2).tolist(),
+                    "availability": np.round(availability[i], 4).tolist(),
+                    "risk": risk[i].tolist(),
+                    "min_availability": round(float(availability[i].min()), 4),
+                    "high_risk_days": int((risk[i] == "high").sum())
+                }
+                for i, name in enumerate(names)
+            ]
+        }
+
+    @staticmethod
+    def get_forecast(db: Session, months: int = 6, department: Optional[str] = None, start: Optional[date] = None) -> dict:
+        start = start or date.today()
+        key = ("forecast", str(db.get_bind().url), current_tenant(db), start, months)
+        version = write_version()
+        report = forecast_cache.get(key, version)
+        if report is None:
+            report = ForecastService.build(db, start, months)
+            forecast_cache.put(key, version, report)
+        if department is None:
+            return report
+        return {**report, "departments": [d for d in report["departments"] if d["department"] == department]}
+
+@register_handler(PROFILE_JOB)
+def build_seasonal_profile(payload: dict):
+    from app.database import open_session
+
+    db = open_session(payload["tenant_id"])
+    try:
+        ForecastService.store_seasonal_profile(db, payload["tenant_id"], date.fromisoformat(payload["month"]))
+    finally:
+        db.close()
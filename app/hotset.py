@@ -0,0 +1,207 @@
+import os
+import threading
+from array import array
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import and_, event, select
+from sqlalchemy.orm import Session
+from app.models import Employee, LeaveRequest, LeaveStatus
+from app.tenancy import current_tenant
+
+HOTSET_ENABLED = os.getenv("HOTSET_ENABLED", "false").lower() == "true"
+HOTSET_MAX_INTERVALS = int(os.getenv("HOTSET_MAX_INTERVALS", "32"))
+HOTSET_WARM_BATCH_SIZE = int(os.getenv("HOTSET_WARM_BATCH_SIZE", "10000"))
+
+ACTIVE_STATUSES = (LeaveStatus.PENDING, LeaveStatus.APPROVED)
+
+class EmployeeLeave:
+    # One record per employee: about 600 bytes with its key, plus 13 bytes per current or
+    # future interval (three int32 arrays and an int8 flag array). Past the interval cap
+    # only the totals are kept, so a record stays around 1 KB with the default cap of 32.
+    __slots__ = ("ids", "starts", "ends", "approved", "since", "overflow", "used_days", "pending_days")
+
+    def __init__(self, since: int):
+        self.ids = array("i")
+        self.starts = array("i")
+        self.ends = array("i")
+        self.approved = array("b")
+        # Intervals ending before this ordinal are not held; earlier queries go to the DB.
+        self.since = since
+        self.overflow = False
+        self.used_days = 0.0
+        self.pending_days = 0.0
+
+    def add(self, leave_id: int, start: date, end: date, status: LeaveStatus, days: float, max_intervals: int):
+        if status == LeaveStatus.APPROVED:
+            self.used_days += days
+        else:
+            self.pending_days += days
+        if self.overflow or end.toordinal() < self.since:
+            return
+        if len(self.ids) >= max_intervals:
+            self.prune(date.today().toordinal())
+        if len(self.ids) >= max_intervals:
+            self.overflow = True
+            for column in (self.ids, self.starts, self.ends, self.approved):
+                del column[:]
+            return
+        self.ids.append(leave_id)
+        self.starts.append(start.toordinal())
+        self.ends.append(end.toordinal())
+        self.approved.append(status == LeaveStatus.APPROVED)
+
+    def remove_at(self, i: int):
+        for column in (self.ids, self.starts, self.ends, self.approved):
+            del column[i]
+
+    def prune(self, today: int):
+        for i in reversed(range(len(self.ids))):
+            if self.ends[i] < today:
+                self.remove_at(i)
+        self.since = max(self.since, today)
+
+    def set_status(self, leave_id: int, old: LeaveStatus, new: LeaveStatus, days: float):
+        if old == LeaveStatus.APPROVED:
+            self.used_days -= days
+        elif old == LeaveStatus.PENDING:
+            self.pending_days -= days
+        if new == LeaveStatus.APPROVED:
+            self.used_days += days
+        elif new == LeaveStatus.PENDING:
+            self.pending_days += days
+
+        if leave_id in self.ids:
+            i = self.ids.index(leave_id)
+            if new in ACTIVE_STATUSES:
+                self.approved[i] = new == LeaveStatus.APPROVED
+            else:
+                self.remove_at(i)
+
+    def overlaps(self, start: date, end: date, exclude_id: Optional[int] = None) -> Optional[bool]:
+        # None means the record cannot answer and the caller should ask the DB.
+        start, end = start.toordinal(), end.toordinal()
+        if self.overflow or start < self.since:
+            return None
+        starts, ends, ids = self.starts, self.ends, self.ids
+        for i in range(len(ids)):
+            if starts[i] <= end and ends[i] >= start and ids[i] != exclude_id:
+                return True
+        return False
+
+class HotSetStore:
+    def __init__(self, enabled: bool = HOTSET_ENABLED, max_intervals: int = HOTSET_MAX_INTERVALS):
+        self.enabled = enabled
+        self.max_intervals = max_intervals
+        self._records: Dict[Tuple[str, int], EmployeeLeave] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def query():
+        # Employees outer-joined to their pending/approved leave, so employees without
+        # any leave still get an (empty) record.
+        return select(
+            Employee.tenant_id,
+            Employee.id,
+            LeaveRequest.id,
+            LeaveRequest.start_date,
+            LeaveRequest.end_date,
+            LeaveRequest.status,
+            LeaveRequest.days_requested
+        ).outerjoin(
+            LeaveRequest,
+            and_(
+                LeaveRequest.tenant_id == Employee.tenant_id,
+                LeaveRequest.employee_id == Employee.id,
+                LeaveRequest.status.in_(ACTIVE_STATUSES)
+            )
+        )
+
+    def build(self, rows: Iterable) -> Dict[Tuple[str, int], EmployeeLeave]:
+        since = date.today().toordinal()
+        records: Dict[Tuple[str, int], EmployeeLeave] = {}
+        for tenant_id, employee_id, leave_id, start, end, status, days in rows:
+            record = records.get((tenant_id, employee_id))
+            if record is None:
+                record = records[(tenant_id, employee_id)] = EmployeeLeave(since)
+            if leave_id is not None:
+                record.add(leave_id, start, end, status, days, self.max_intervals)
+        return records
+
+    def warm(self, db: Session) -> int:
+        # One streamed query for every employee in the database, run once at startup.
+        rows = db.execute(self.query().execution_options(yield_per=HOTSET_WARM_BATCH_SIZE))
+        records = self.build(rows)
+        with self._lock:
+            self._records.update(records)
+        return len(records)
+
+    def get(self, db: Session, employee_id: int) -> Optional[EmployeeLeave]:
+        if not self.enabled:
+            return None
+        key = (current_tenant(db), employee_id)
+        with self._lock:
+            record = self._records.get(key)
+        if record is not None:
+            return record
+
+        record = self.build(db.execute(self.query().where(
+            and_(Employee.tenant_id == key[0], Employee.id == employee_id)
+        ))).get(key)
+        # Replicas may lag the primary, so only primary reads fill the store.
+        if record is not None and not db.info.get("replica"):
+            with self._lock:
+                record = self._records.setdefault(key, record)
+        return record
+
+    def leave_added(self, db: Session, leave_request: LeaveRequest):
+        if self.enabled:
+            db.info.setdefault("hot_set_writes", []).append((self._add, (
+                (leave_request.tenant_id, leave_request.employee_id), leave_request.id,
+                leave_request.start_date, leave_request.end_date, leave_request.status, leave_request.days_requested
+            )))
+
+    def status_changed(self, db: Session, leave_request: LeaveRequest, old_status: LeaveStatus):
+        if self.enabled:
+            db.info.setdefault("hot_set_writes", []).append((self._set_status, (
+                (leave_request.tenant_id, leave_request.employee_id), leave_request.id,
+                old_status, leave_request.status, leave_request.days_requested
+            )))
+
+    def _add(self, key: Tuple[str, int], leave_id: int, start: date, end: date, status: LeaveStatus, days: float):
+        # Employees not held yet are loaded from the DB on first use.
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None:
+                record.add(leave_id, start, end, status, days, self.max_intervals)
+
+    def _set_status(self, key: Tuple[str, int], leave_id: int, old: LeaveStatus, new: LeaveStatus, days: float):
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None:
+                record.set_status(leave_id, old, new, days)
+
+    def stats(self) -> dict:
+        with self._lock:
+            records = list(self._records.values())
+        return {
+            "employees": len(records),
+            "intervals": sum(len(record.ids) for record in records),
+            "overflowed": sum(record.overflow for record in records)
+        }
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+hot_set = HotSetStore()
+
+# Service write paths queue their updates on the session; records change once the commit
+# is durable, whoever issues it, and a rollback discards them.
+@event.listens_for(Session, "after_commit")
+def _apply_writes(session):
+    for apply, args in session.info.pop("hot_set_writes", ()):
+        apply(*args)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_writes(session):
+    session.info.pop("hot_set_writes", None)
@@ -0,0 +1,161 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models import IdempotencyRecord
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "2048"))
+IDEMPOTENCY_PURGE_BATCH = int(os.getenv("IDEMPOTENCY_PURGE_BATCH", "500"))
+IDEMPOTENCY_PURGE_INTERVAL = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL", "300"))
+
+class IdempotencyConflict(Exception):
+    pass
+
+@dataclass
+class StoredResponse:
+    fingerprint: str
+    status_code: int
+    body: str
+    expires_at: datetime
+
+class IdempotencyStore:
+    def __init__(self, ttl_seconds: int = IDEMPOTENCY_TTL_SECONDS, cache_size: int = IDEMPOTENCY_CACHE_SIZE):
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, str], StoredResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(payload) -> str:
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def _remember(self, cache_key: Tuple[str, str], stored: StoredResponse):
+        with self._lock:
+            self._cache[cache_key] = stored
+            self._cache.move_to_end(cache_key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def get(self, db: Session, scope: str, key: str) -> Optional[StoredResponse]:
+        now = datetime.utcnow()
+        cache_key = (scope, key)
+        with self._lock:
+            stored = self._cache.get(cache_key)
+            if stored and stored.expires_at <= now:
+                del self._cache[cache_key]
+                stored = None
+        if stored:
+            return stored
+
+        record = db.query(IdempotencyRecord).filter(
+            IdempotencyRecord.scope == scope,
+            IdempotencyRecord.key == key,
+            IdempotencyRecord.expires_at > now
+        ).first()
+        if not record:
+            return None
+
+        stored = StoredResponse(record.fingerprint, record.status_code, record.response_body, record.expires_at)
+        self._remember(cache_key, stored)
+        return stored
+
+    def claim(self, db: Session, scope: str, key: str) -> Optional[StoredResponse]:
+        # Inserts the key in the caller's transaction before any work is done, so it commits
+        # or rolls back with the request's own writes. A concurrent request with the same key
+        # waits on that transaction and then replays the stored response.
+        stored = self.get(db, scope, key)
+        if stored:
+            return stored
+        now = datetime.utcnow()
+        db.query(IdempotencyRecord).filter(
+            IdempotencyRecord.scope == scope,
+            IdempotencyRecord.key == key,
+            IdempotencyRecord.expires_at <= now
+        ).delete(synchronize_session=False)
+        record = IdempotencyRecord(scope=scope, key=key, fingerprint="", status_code=0, response_body="", expires_at=now + self.ttl)
+        db.add(record)
+        try:
+            db.flush()
+        except IntegrityError:
+            db.rollback()
+            stored = self.get(db, scope, key)
+            if stored is None:
+                raise IdempotencyConflict(f"A request with Idempotency-Key '{key}' is still in progress")
+            return stored
+        db.info["idempotency_claim"] = (scope, key, record)
+        return None
+
+    def save(self, db: Session, scope: str, key: str, fingerprint: str, status_code: int, body: str) -> StoredResponse:
+        stored = StoredResponse(fingerprint, status_code, body, datetime.utcnow() + self.ttl)
+        claim = db.info.pop("idempotency_claim", None)
+        if claim is not None and claim[:2] == (scope, key):
+            record = claim[2]
+        else:
+            record = IdempotencyRecord(scope=scope, key=key)
+            db.add(record)
+        record.fingerprint = fingerprint
+        record.status_code = status_code
+        record.response_body = body
+        record.expires_at = stored.expires_at
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return self.get(db, scope, key) or stored
+        self._remember((scope, key), stored)
+        return stored
+
+    def purge_expired(self, db: Session, batch_size: int = IDEMPOTENCY_PURGE_BATCH) -> int:
+        now = datetime.utcnow()
+        purged = 0
+        while True:
+            ids = [row.id for row in db.query(IdempotencyRecord.id).filter(
+                IdempotencyRecord.expires_at <= now
+            ).limit(batch_size).all()]
+            if not ids:
+                break
+            db.query(IdempotencyRecord).filter(IdempotencyRecord.id.in_(ids)).delete(synchronize_session=False)
+            db.commit()
+            purged += len(ids)
+            if len(ids) < batch_size:
+                break
+
+        with self._lock:
+            for cache_key in [k for k, v in self._cache.items() if v.expires_at <= now]:
+                del self._cache[cache_key]
+        return purged
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+idempotency_store = IdempotencyStore()
+
+async def run_purge_loop(session_factory, interval: float = IDEMPOTENCY_PURGE_INTERVAL):
+    def purge():
+        db = session_factory()
+        try:
+            return idempotency_store.purge_expired(db)
+        finally:
+            db.close()
+
+    while True:
+        try:
+            purged = await asyncio.to_thread(purge)
+            if purged:
+                logger.info("Purged %s expired idempotency keys", purged)
+        except Exception:
+            logger.exception("Failed to purge idempotency keys")
+        await asyncio.sleep(interval)
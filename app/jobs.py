@@ -0,0 +1,210 @@
+import asyncio
+import json
+import logging
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+from sqlalchemy import and_, update
+from sqlalchemy.orm import Session
+from app.models import OutboxJob, JobStatus
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKER_ENABLED = os.getenv("JOB_WORKER_ENABLED", "true").lower() == "true"
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "4"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+# How often a worker renews the lease on its running jobs and requeues other workers' expired ones.
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", str(JOB_LEASE_SECONDS / 3)))
+JOB_BACKOFF_BASE = float(os.getenv("JOB_BACKOFF_BASE", "2.0"))
+JOB_BACKOFF_MAX = float(os.getenv("JOB_BACKOFF_MAX", "600"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+
+LEAVE_STATUS_JOBS = ("leave.notify", "leave.payroll_sync", "leave.calendar_sync")
+
+_handlers: Dict[str, Callable[[dict], None]] = {}
+
+def register_handler(job_type: str):
+    def decorator(func: Callable[[dict], None]) -> Callable[[dict], None]:
+        _handlers[job_type] = func
+        return func
+    return decorator
+
+def get_handler(job_type: str) -> Optional[Callable[[dict], None]]:
+    return _handlers.get(job_type)
+
+def enqueue_job(db: Session, job_type: str, payload: dict, idempotency_key: str, max_attempts: int = JOB_MAX_ATTEMPTS) -> Optional[OutboxJob]:
+    # Added to the caller's session so the job commits atomically with the state change.
+    if db.query(OutboxJob.id).filter(OutboxJob.idempotency_key == idempotency_key).first():
+        return None
+
+    job = OutboxJob(
+        job_type=job_type,
+        payload=json.dumps(payload, default=str),
+        idempotency_key=idempotency_key,
+        max_attempts=max_attempts,
+        next_run_at=datetime.utcnow()
+    )
+    db.add(job)
+    return job
+
+def backoff_delay(attempts: int) -> float:
+    delay = min(JOB_BACKOFF_BASE ** attempts, JOB_BACKOFF_MAX)
+    return delay + random.uniform(0, delay * 0.1)
+
+class JobWorker:
+    def __init__(self, session_factory, concurrency: int = JOB_CONCURRENCY, poll_interval: float = JOB_POLL_INTERVAL, lease_seconds: int = JOB_LEASE_SECONDS, heartbeat_interval: float = JOB_HEARTBEAT_SECONDS):
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self._inflight: Set[asyncio.Task] = set()
+        self._running: Set[int] = set()
+        self._stopping: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._stopping = asyncio.Event()
+        await asyncio.to_thread(self.recover_stale_jobs)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self._task:
+            return
+        self._stopping.set()
+        await self._task
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_heartbeat = loop.time() + self.heartbeat_interval
+        while not self._stopping.is_set():
+            # Long jobs keep their lease while this worker is alive; jobs of a worker that
+            # died mid-run are requeued by whichever worker notices the expired lease first.
+            if loop.time() >= next_heartbeat:
+                try:
+                    await asyncio.to_thread(self.renew_leases, list(self._running))
+                    recovered = await asyncio.to_thread(self.recover_stale_jobs)
+                    if recovered:
+                        logger.warning("Requeued %s outbox jobs with expired leases", recovered)
+                except Exception:
+                    logger.exception("Failed to renew outbox job leases")
+                next_heartbeat = loop.time() + self.heartbeat_interval
+
+            free_slots = self.concurrency - len(self._inflight)
+            claimed = []
+            if free_slots > 0:
+                try:
+                    claimed = await asyncio.to_thread(self.claim_jobs, free_slots)
+                except Exception:
+                    logger.exception("Failed to claim outbox jobs")
+
+            for job_id in claimed:
+                task = asyncio.create_task(asyncio.to_thread(self.run_job, job_id))
+                self._inflight.add(task)
+                self._running.add(job_id)
+                task.add_done_callback(self._inflight.discard)
+                task.add_done_callback(lambda _, job_id=job_id: self._running.discard(job_id))
+
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def recover_stale_jobs(self) -> int:
+        db = self.session_factory()
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+            result = db.execute(
+                update(OutboxJob)
+                .where(and_(OutboxJob.status == JobStatus.RUNNING, OutboxJob.locked_at < cutoff))
+                .values(status=JobStatus.PENDING, locked_at=None)
+            )
+            db.commit()
+            return result.rowcount
+        finally:
+            db.close()
+
+    def renew_leases(self, job_ids: List[int]) -> int:
+        if not job_ids:
+            return 0
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                update(OutboxJob)
+                .where(and_(OutboxJob.id.in_(job_ids), OutboxJob.status == JobStatus.RUNNING))
+                .values(locked_at=datetime.utcnow())
+            )
+            db.commit()
+            return result.rowcount
+        finally:
+            db.close()
+
+    def claim_jobs(self, limit: int) -> List[int]:
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            candidates = db.query(OutboxJob.id).filter(
+                and_(OutboxJob.status == JobStatus.PENDING, OutboxJob.next_run_at <= now)
+            ).order_by(OutboxJob.next_run_at).limit(limit).all()
+
+            claimed = []
+            for (job_id,) in candidates:
+                result = db.execute(
+                    update(OutboxJob)
+                    .where(and_(OutboxJob.id == job_id, OutboxJob.status == JobStatus.PENDING))
+                    .values(status=JobStatus.RUNNING, locked_at=now, attempts=OutboxJob.attempts + 1)
+                )
+                if result.rowcount == 1:
+                    claimed.append(job_id)
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    def run_job(self, job_id: int):
+        db = self.session_factory()
+        try:
+            job = db.query(OutboxJob).filter(OutboxJob.id == job_id).first()
+            if not job or job.status != JobStatus.RUNNING:
+                return
+
+            try:
+                handler = get_handler(job.job_type)
+                if not handler:
+                    raise LookupError(f"No handler registered for job type '{job.job_type}'")
+                payload = json.loads(job.payload)
+                payload["idempotency_key"] = job.idempotency_key
+                handler(payload)
+            except Exception as e:
+                logger.warning("Outbox job %s (%s) failed on attempt %s: %s", job.id, job.job_type, job.attempts, e)
+                job.last_error = str(e)[:500]
+                job.locked_at = None
+                if job.attempts >= job.max_attempts:
+                    job.status = JobStatus.FAILED
+                else:
+                    job.status = JobStatus.PENDING
+                    job.next_run_at = datetime.utcnow() + timedelta(seconds=backoff_delay(job.attempts))
+            else:
+                job.status = JobStatus.DONE
+                job.locked_at = None
+                job.completed_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+@register_handler("leave.notify")
+def notify_leave_status(payload: dict):
+    logger.info("Leave request %s %s by %s", payload["leave_id"], payload["status"], payload["processed_by"])
+
+@register_handler("leave.payroll_sync")
+def sync_leave_to_payroll(payload: dict):
+    logger.info("Payroll sync for leave request %s (%s)", payload["leave_id"], payload["status"])
+
+@register_handler("leave.calendar_sync")
+def sync_leave_to_calendar(payload: dict):
+    logger.info("Calendar sync for leave request %s (%s)", payload["leave_id"], payload["status"])
@@ -1,9 +1,17 @@
+import asyncio
 import os
+from functools import partial
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.exc import DBAPIError
 from app.routes import router
-from app.database import create_tables
+from app.database import ensure_schema, SessionLocal, read_router, shard_map
+from app.jobs import JobWorker, JOB_WORKER_ENABLED
+from app.idempotency import run_purge_loop
+from app.ratelimit import RateLimitMiddleware, rate_limiter, RATE_LIMIT_ENABLED
+from app.tenancy import MULTI_TENANT, run_eviction_loop
+from app.hotset import hot_set
 from datetime import datetime
 
 app = FastAPI(
@@ -14,9 +22,22 @@ app = FastAPI(
 
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
 
 allowed_origins = ["*"] if ENVIRONMENT == "development" else [FRONTEND_URL, "https://*.railway.app"]
 
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
+# Not imported or installed unless enabled, so unprofiled deployments pay nothing for it.
+if PROFILING_ENABLED:
+    from app.profiling import ProfilingMiddleware
+    app.add_middleware(ProfilingMiddleware)
+
+# Report generation (multiprocessing, CSV writers) only loads where the job worker runs it.
+if JOB_WORKER_ENABLED:
+    from app import reports  # noqa: F401  registers the reports.year_end job handler
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
@@ -36,18 +57,55 @@ async def value_error_handler(request: Request, exc: ValueError):
         }
     )
 
+# Database errors propagate through the session dependencies (so replicas can be marked
+# unhealthy) and are reported here in the same shape as the routes' own 500s.
+@app.exception_handler(DBAPIError)
+async def database_error_handler(request: Request, exc: DBAPIError):
+    return JSONResponse(status_code=500, content={"detail": "Internal server error"})
+
 @app.get("/api/v1/health")
 async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
         "version": "1.0.0",
-        "environment": ENVIRONMENT
+        "environment": ENVIRONMENT,
+        "read_replicas": read_router.status(),
+        "hot_set": hot_set.stats() if hot_set.enabled else None
     }
 
+if MULTI_TENANT:
+    session_factories = [partial(shard_map.background_session, shard) for shard in shard_map.shards]
+else:
+    session_factories = [SessionLocal]
+
+job_workers = [JobWorker(session_factory) for session_factory in session_factories]
+background_tasks = []
+
 @app.on_event("startup")
 async def startup_event():
-    create_tables()
+    if MULTI_TENANT:
+        background_tasks.append(asyncio.create_task(run_eviction_loop(shard_map)))
+    else:
+        ensure_schema()
+        # Tenant shards open lazily, so their employees are loaded into the hot set on first use.
+        if hot_set.enabled:
+            with SessionLocal() as db:
+                hot_set.warm(db)
+    # Idempotency keys expire whether or not this process runs the job worker.
+    for session_factory in session_factories:
+        background_tasks.append(asyncio.create_task(run_purge_loop(session_factory)))
+    if JOB_WORKER_ENABLED:
+        for job_worker in job_workers:
+            await job_worker.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    for job_worker in job_workers:
+        await job_worker.stop()
 
 app.include_router(router, prefix="/api/v1")
 
@@ -0,0 +1,402 @@
+import argparse
+import logging
+import os
+import re
+import time
+import warnings
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, List, Optional
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, Enum, Float, Index, Integer, MetaData, String, Table, Text, UniqueConstraint,
+    bindparam, inspect, insert, literal, select, text
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateIndex
+from app.models import Employee, EmployeeHierarchy, LeaveRequest, SchemaMigration, DEFAULT_TENANT
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_CHUNK_SIZE = int(os.getenv("BACKFILL_CHUNK_SIZE", "1000"))
+BACKFILL_PAUSE = float(os.getenv("BACKFILL_PAUSE", "0.05"))
+MIGRATION_LOCK_ID = 72_410_001
+
+def index_ddl(index: Index, dialect, online: bool = True) -> str:
+    ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=dialect))
+    if online and dialect.name == "postgresql":
+        ddl = re.sub(r"^CREATE (UNIQUE )?INDEX", r"CREATE \1INDEX CONCURRENTLY", ddl)
+    return ddl
+
+class MigrationContext:
+    def __init__(self, engine: Engine, chunk_size: int = BACKFILL_CHUNK_SIZE, pause: float = BACKFILL_PAUSE):
+        self.engine = engine
+        self.dialect = engine.dialect
+        self.chunk_size = chunk_size
+        self.pause = pause
+
+    def columns(self, table_name: str) -> List[str]:
+        return [column["name"] for column in inspect(self.engine).get_columns(table_name)]
+
+    def indexes(self, table_name: str) -> List[str]:
+        inspector = inspect(self.engine)
+        with warnings.catch_warnings():
+            # SQLite cannot reflect expression indexes; their DDL uses IF NOT EXISTS instead.
+            warnings.filterwarnings("ignore", "Skipped unsupported reflection of expression-based index")
+            names = [index["name"] for index in inspector.get_indexes(table_name)]
+            return names + [constraint["name"] for constraint in inspector.get_unique_constraints(table_name)]
+
+    def execute(self, statement: str, **params):
+        with self.engine.begin() as conn:
+            conn.execute(text(statement), params)
+
+    def create_tables(self, metadata: MetaData):
+        metadata.create_all(bind=self.engine)
+
+    def add_column(self, table: Table, name: str, default: Any = None) -> bool:
+        if name in self.columns(table.name):
+            return False
+        column = table.c[name]
+        quote = self.dialect.identifier_preparer.quote
+        ddl = f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(name)} {column.type.compile(dialect=self.dialect)}"
+        if default is not None:
+            ddl += " DEFAULT " + str(literal(default).compile(dialect=self.dialect, compile_kwargs={"literal_binds": True}))
+        if not column.nullable:
+            ddl += " NOT NULL"
+        self.execute(ddl)
+        return True
+
+    def create_index(self, table: Table, name: str, online: bool = True) -> bool:
+        index = next(index for index in table.indexes if index.name == name)
+        if self.dialect.name == "postgresql" and online:
+            self.create_index_concurrently(name, index_ddl(index, self.dialect, online=True))
+            return True
+        if name in self.indexes(table.name):
+            return False
+        self.execute(index_ddl(index, self.dialect, online=False))
+        return True
+
+    def create_index_concurrently(self, name: str, ddl: str):
+        # CONCURRENTLY cannot run inside a transaction, and a failed build leaves an
+        # invalid index behind that IF NOT EXISTS would otherwise treat as done.
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            invalid = conn.execute(text(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ), {"name": name}).first()
+            if invalid:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {self.dialect.identifier_preparer.quote(name)}"))
+            conn.execute(text(ddl))
+
+    def drop_index(self, name: str):
+        self.execute(f"DROP INDEX IF EXISTS {self.dialect.identifier_preparer.quote(name)}")
+
+    def backfill(self, name: str, next_keys: Callable[[Connection, Any, int], List], apply: Callable[[Connection, List], Any]) -> int:
+        # Keyset-paginated chunks, each in its own short transaction, with a pause in between so
+        # a large backfill never holds locks for long or starves the live workload.
+        last, chunks = None, 0
+        while True:
+            with self.engine.begin() as conn:
+                keys = next_keys(conn, last, self.chunk_size)
+                if not keys:
+                    break
+                apply(conn, keys)
+            chunks += 1
+            last = keys[-1]
+            logger.info("Backfill %s: chunk %s up to key %s", name, chunks, last)
+            if len(keys) < self.chunk_size:
+                break
+            time.sleep(self.pause)
+        return chunks
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[MigrationContext], None]
+
+# Steps must be idempotent: online DDL cannot share a transaction with the ledger row,
+# so a migration that fails halfway is simply re-run from the top.
+
+def base_schema() -> MetaData:
+    # The schema as of version 1, spelled out instead of read from app.models so that model
+    # edits cannot change what this migration creates. Never edit it; add a migration instead.
+    metadata = MetaData()
+    leave_status = Enum("PENDING", "APPROVED", "REJECTED", name="leavestatus")
+    job_status = Enum("PENDING", "RUNNING", "DONE", "FAILED", name="jobstatus")
+    Table(
+        "employees", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("tenant_id", String(64), nullable=False),
+        Column("name", String(100), nullable=False),
+        Column("email", String(100), nullable=False),
+        Column("department", String(50), nullable=False),
+        Column("manager_id", Integer, index=True),
+        Column("joining_date", Date, nullable=False),
+        Column("annual_leave_entitlement", Float),
+        Column("created_at", DateTime),
+        UniqueConstraint("tenant_id", "email", name="uq_employees_tenant_email"),
+        Index("ix_employees_tenant_department", "tenant_id", "department"),
+    )
+    Table(
+        "leave_requests", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("tenant_id", String(64), nullable=False),
+        Column("employee_id", Integer, nullable=False, index=True),
+        Column("start_date", Date, nullable=False),
+        Column("end_date", Date, nullable=False),
+        Column("days_requested", Float, nullable=False),
+        Column("reason", String(500)),
+        Column("status", leave_status),
+        Column("applied_date", DateTime),
+        Column("processed_date", DateTime),
+        Column("processed_by", String(100)),
+        Column("approval_steps", Integer, nullable=False),
+        Index("ix_leave_requests_tenant_employee_status", "tenant_id", "employee_id", "status"),
+        Index("ix_leave_requests_tenant_window", "tenant_id", "end_date", "start_date", "status", "employee_id"),
+    )
+    Table(
+        "employee_hierarchy", metadata,
+        Column("ancestor_id", Integer, primary_key=True),
+        Column("descendant_id", Integer, primary_key=True),
+        Column("tenant_id", String(64), nullable=False),
+        Column("depth", Integer, nullable=False),
+        Index("ix_employee_hierarchy_tenant_ancestor_depth", "tenant_id", "ancestor_id", "depth"),
+        Index("ix_employee_hierarchy_descendant", "descendant_id"),
+    )
+    Table(
+        "approval_steps", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("tenant_id", String(64), nullable=False),
+        Column("leave_request_id", Integer, nullable=False),
+        Column("step", Integer, nullable=False),
+        Column("approver_id", Integer, nullable=False),
+        Column("status", leave_status, nullable=False),
+        Column("acted_by", Integer),
+        Column("acted_at", DateTime),
+        Index("ix_approval_steps_tenant_approver_status", "tenant_id", "approver_id", "status"),
+        Index("ix_approval_steps_leave_request", "leave_request_id", "step"),
+    )
+    Table(
+        "delegations", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("tenant_id", String(64), nullable=False),
+        Column("delegator_id", Integer, nullable=False),
+        Column("delegate_id", Integer, nullable=False),
+        Column("start_date", Date, nullable=False),
+        Column("end_date", Date, nullable=False),
+        Column("created_at", DateTime),
+        Index("ix_delegations_tenant_delegate_dates", "tenant_id", "delegate_id", "start_date", "end_date"),
+    )
+    Table(
+        "outbox_jobs", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("job_type", String(100), nullable=False),
+        Column("payload", Text, nullable=False),
+        Column("idempotency_key", String(200), unique=True, nullable=False),
+        Column("status", job_status, nullable=False),
+        Column("attempts", Integer, nullable=False),
+        Column("max_attempts", Integer, nullable=False),
+        Column("next_run_at", DateTime, nullable=False),
+        Column("locked_at", DateTime),
+        Column("last_error", String(500)),
+        Column("created_at", DateTime),
+        Column("completed_at", DateTime),
+        Index("ix_outbox_jobs_status_next_run_at", "status", "next_run_at"),
+    )
+    Table(
+        "idempotency_keys", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("scope", String(100), nullable=False),
+        Column("key", String(200), nullable=False),
+        Column("fingerprint", String(64), nullable=False),
+        Column("status_code", Integer, nullable=False),
+        Column("response_body", Text, nullable=False),
+        Column("expires_at", DateTime, nullable=False, index=True),
+        UniqueConstraint("scope", "key", name="uq_idempotency_keys_scope_key"),
+    )
+    Table(
+        "leave_policies", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("tenant_id", String(64), nullable=False),
+        Column("department", String(50)),
+        Column("rule_type", String(50), nullable=False),
+        Column("params", Text, nullable=False),
+        Column("enabled", Boolean, nullable=False),
+        Column("updated_at", DateTime),
+        Index("ix_leave_policies_tenant_department", "tenant_id", "department"),
+    )
+    return metadata
+
+def create_base_tables(ctx: MigrationContext):
+    ctx.create_tables(base_schema())
+
+def add_tenant_columns(ctx: MigrationContext):
+    ctx.add_column(Employee.__table__, "tenant_id", default=DEFAULT_TENANT)
+    ctx.add_column(LeaveRequest.__table__, "tenant_id", default=DEFAULT_TENANT)
+    # Emails were globally unique before tenancy; uniqueness is now per tenant.
+    ctx.drop_index("ix_employees_email")
+    if "uq_employees_tenant_email" not in ctx.indexes("employees"):
+        ctx.execute("CREATE UNIQUE INDEX uq_employees_tenant_email ON employees (tenant_id, email)")
+    ctx.create_index(Employee.__table__, "ix_employees_tenant_department")
+    ctx.create_index(LeaveRequest.__table__, "ix_leave_requests_tenant_employee_status")
+
+def employees_without_closure(conn: Connection, last: Optional[int], limit: int) -> List[int]:
+    has_self_row = select(EmployeeHierarchy.descendant_id).where(
+        EmployeeHierarchy.ancestor_id == Employee.id,
+        EmployeeHierarchy.descendant_id == Employee.id
+    ).exists()
+    query = select(Employee.id).where(~has_self_row)
+    if last is not None:
+        query = query.where(Employee.id > last)
+    return list(conn.execute(query.order_by(Employee.id).limit(limit)).scalars())
+
+def insert_closure_self_rows(conn: Connection, ids: List[int]):
+    conn.execute(insert(EmployeeHierarchy).from_select(
+        ["ancestor_id", "descendant_id", "tenant_id", "depth"],
+        select(Employee.id, Employee.id, Employee.tenant_id, literal(0)).where(Employee.id.in_(ids))
+    ))
+
+def add_manager_hierarchy(ctx: MigrationContext):
+    ctx.add_column(Employee.__table__, "manager_id")
+    ctx.create_index(Employee.__table__, "ix_employees_manager_id")
+    # Employees created before the hierarchy existed have no managers, only their self row.
+    ctx.backfill("employee_hierarchy", employees_without_closure, insert_closure_self_rows)
+
+def add_approval_steps(ctx: MigrationContext):
+    ctx.add_column(LeaveRequest.__table__, "approval_steps", default=0)
+
+def add_leave_window_index(ctx: MigrationContext):
+    ctx.create_index(LeaveRequest.__table__, "ix_leave_requests_tenant_window")
+
+def drop_legacy_schema_version(ctx: MigrationContext):
+    ctx.execute("DROP TABLE IF EXISTS schema_version")
+
+def add_employee_search_indexes(ctx: MigrationContext):
+    ctx.create_index(Employee.__table__, "ix_employees_tenant_lower_name")
+    ctx.create_index(Employee.__table__, "ix_employees_tenant_lower_email")
+
+def add_seasonal_profiles(ctx: MigrationContext):
+    metadata = MetaData()
+    Table(
+        "seasonal_profiles", metadata,
+        Column("tenant_id", String(64), primary_key=True),
+        Column("month", Date, primary_key=True),
+        Column("profile", Text, nullable=False),
+        Column("computed_at", DateTime, nullable=False),
+    )
+    ctx.create_tables(metadata)
+
+def employees_without_search_row(conn: Connection, last: Optional[int], limit: int) -> List[int]:
+    return list(conn.execute(text(
+        "SELECT id FROM employees WHERE id > :last AND id NOT IN (SELECT rowid FROM employees_search) ORDER BY id LIMIT :limit"
+    ), {"last": last or 0, "limit": limit}).scalars())
+
+def insert_search_rows(conn: Connection, ids: List[int]):
+    conn.execute(text(
+        "INSERT INTO employees_search(rowid, name, email, department, tenant_id) "
+        "SELECT id, name, email, department, tenant_id FROM employees WHERE id IN :ids"
+    ).bindparams(bindparam("ids", expanding=True)), {"ids": ids})
+
+def add_employee_search_table(ctx: MigrationContext):
+    # SQLite's trigram tokenizer arrived in 3.34; older builds search with the in-memory index.
+    if ctx.dialect.name != "sqlite" or ctx.dialect.dbapi.sqlite_version_info < (3, 34, 0):
+        return
+    ctx.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS employees_search "
+        "USING fts5(name, email, department UNINDEXED, tenant_id UNINDEXED, tokenize='trigram')"
+    )
+    ctx.backfill("employees_search", employees_without_search_row, insert_search_rows)
+
+def add_employee_trigram_indexes(ctx: MigrationContext):
+    if ctx.dialect.name != "postgresql":
+        return
+    try:
+        ctx.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DBAPIError as e:
+        # Managed databases may reserve extensions for superusers; search then uses the in-memory index.
+        logger.warning("pg_trgm is unavailable, skipping trigram search indexes: %s", e)
+        return
+    for column in ("name", "email"):
+        ctx.create_index_concurrently(
+            f"ix_employees_{column}_trgm",
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_employees_{column}_trgm ON employees USING gin (lower({column}) gin_trgm_ops)"
+        )
+
+MIGRATIONS = [
+    Migration(1, "create_base_tables", create_base_tables),
+    Migration(2, "add_tenant_columns", add_tenant_columns),
+    Migration(3, "add_manager_hierarchy", add_manager_hierarchy),
+    Migration(4, "add_approval_steps", add_approval_steps),
+    Migration(5, "add_leave_window_index", add_leave_window_index),
+    Migration(6, "drop_legacy_schema_version", drop_legacy_schema_version),
+    Migration(7, "add_employee_search_indexes", add_employee_search_indexes),
+    Migration(8, "add_seasonal_profiles", add_seasonal_profiles),
+    Migration(9, "add_employee_search_table", add_employee_search_table),
+    Migration(10, "add_employee_trigram_indexes", add_employee_trigram_indexes),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+def current_version(engine: Engine) -> Optional[int]:
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(SchemaMigration.version).order_by(SchemaMigration.version.desc()).limit(1)).scalar()
+    except DBAPIError:
+        return None
+
+def pending_migrations(engine: Engine) -> List[Migration]:
+    version = current_version(engine) or 0
+    return [migration for migration in MIGRATIONS if migration.version > version]
+
+def upgrade(engine: Engine, chunk_size: int = BACKFILL_CHUNK_SIZE, pause: float = BACKFILL_PAUSE) -> List[Migration]:
+    ctx = MigrationContext(engine, chunk_size=chunk_size, pause=pause)
+    lock = None
+    if engine.dialect.name == "postgresql":
+        # Serialises concurrent deploys; the session-level lock is held until this connection closes.
+        lock = engine.connect()
+        lock.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+    try:
+        SchemaMigration.__table__.create(bind=engine, checkfirst=True)
+        applied = []
+        for migration in pending_migrations(engine):
+            started = time.perf_counter()
+            migration.upgrade(ctx)
+            with engine.begin() as conn:
+                conn.execute(insert(SchemaMigration).values(version=migration.version, name=migration.name, applied_at=datetime.utcnow()))
+            logger.info("Applied migration %s %s in %.1fs", migration.version, migration.name, time.perf_counter() - started)
+            applied.append(migration)
+        return applied
+    finally:
+        if lock is not None:
+            lock.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+            lock.close()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from app.database import DATABASE_URL, make_engine, normalize_url
+    from app.tenancy import MULTI_TENANT, TENANT_SHARD_URLS
+
+    parser = argparse.ArgumentParser(description="Apply database migrations; run once per deploy, before starting workers")
+    parser.add_argument("command", choices=["upgrade", "status"])
+    parser.add_argument("--database-url", action="append", help="Database to migrate (repeatable); defaults to DATABASE_URL and every tenant shard")
+    parser.add_argument("--chunk-size", type=int, default=BACKFILL_CHUNK_SIZE)
+    parser.add_argument("--pause", type=float, default=BACKFILL_PAUSE)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    urls = args.database_url or ([normalize_url(url) for url in TENANT_SHARD_URLS] if MULTI_TENANT and TENANT_SHARD_URLS else [DATABASE_URL])
+    for url in urls:
+        engine = make_engine(normalize_url(url))
+        label = engine.url.render_as_string(hide_password=True)
+        try:
+            if args.command == "status":
+                print(f"{label}: version {current_version(engine) or 0} of {LATEST_VERSION}, {len(pending_migrations(engine))} pending")
+            else:
+                applied = upgrade(engine, chunk_size=args.chunk_size, pause=args.pause)
+                print(f"{label}: applied {len(applied)} migration(s), now at version {LATEST_VERSION}")
+        finally:
+            engine.dispose()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
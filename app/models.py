@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Float, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Date, Float, DateTime, Text, Boolean, Index, UniqueConstraint, Enum as SQLEnum, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -6,6 +6,8 @@ import enum
 
 Base = declarative_base()
 
+DEFAULT_TENANT = "default"
+
 class LeaveStatus(str, enum.Enum):
     PENDING = "pending"
     APPROVED = "approved"
@@ -13,19 +15,34 @@ class LeaveStatus(str, enum.Enum):
 
 class Employee(Base):
     __tablename__ = "employees"
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "email", name="uq_employees_tenant_email"),
+        Index("ix_employees_tenant_department", "tenant_id", "department"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(String(64), nullable=False, default=DEFAULT_TENANT)
     name = Column(String(100), nullable=False)
-    email = Column(String(100), unique=True, nullable=False, index=True)
+    email = Column(String(100), nullable=False)
     department = Column(String(50), nullable=False)
+    manager_id = Column(Integer, index=True)
     joining_date = Column(Date, nullable=False)
     annual_leave_entitlement = Column(Float, default=25.0)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+# Range scans for typeahead prefix search.
+Index("ix_employees_tenant_lower_name", Employee.tenant_id, func.lower(Employee.name))
+Index("ix_employees_tenant_lower_email", Employee.tenant_id, func.lower(Employee.email))
+
 class LeaveRequest(Base):
     __tablename__ = "leave_requests"
+    __table_args__ = (
+        Index("ix_leave_requests_tenant_employee_status", "tenant_id", "employee_id", "status"),
+        Index("ix_leave_requests_tenant_window", "tenant_id", "end_date", "start_date", "status", "employee_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(String(64), nullable=False, default=DEFAULT_TENANT)
     employee_id = Column(Integer, nullable=False, index=True)
     start_date = Column(Date, nullable=False)
     end_date = Column(Date, nullable=False)
@@ -35,3 +52,108 @@ class LeaveRequest(Base):
     applied_date = Column(DateTime, default=datetime.utcnow)
     processed_date = Column(DateTime)
     processed_by = Column(String(100))
+    approval_steps = Column(Integer, default=0, nullable=False)
+
+class EmployeeHierarchy(Base):
+    __tablename__ = "employee_hierarchy"
+    __table_args__ = (
+        Index("ix_employee_hierarchy_tenant_ancestor_depth", "tenant_id", "ancestor_id", "depth"),
+        Index("ix_employee_hierarchy_descendant", "descendant_id"),
+    )
+
+    ancestor_id = Column(Integer, primary_key=True)
+    descendant_id = Column(Integer, primary_key=True)
+    tenant_id = Column(String(64), nullable=False, default=DEFAULT_TENANT)
+    depth = Column(Integer, nullable=False)
+
+class ApprovalStep(Base):
+    __tablename__ = "approval_steps"
+    __table_args__ = (
+        Index("ix_approval_steps_tenant_approver_status", "tenant_id", "approver_id", "status"),
+        Index("ix_approval_steps_leave_request", "leave_request_id", "step"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(String(64), nullable=False, default=DEFAULT_TENANT)
+    leave_request_id = Column(Integer, nullable=False)
+    step = Column(Integer, nullable=False)
+    approver_id = Column(Integer, nullable=False)
+    status = Column(SQLEnum(LeaveStatus), default=LeaveStatus.PENDING, nullable=False)
+    acted_by = Column(Integer)
+    acted_at = Column(DateTime)
+
+class Delegation(Base):
+    __tablename__ = "delegations"
+    __table_args__ = (
+        Index("ix_delegations_tenant_delegate_dates", "tenant_id", "delegate_id", "start_date", "end_date"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(String(64), nullable=False, default=DEFAULT_TENANT)
+    delegator_id = Column(Integer, nullable=False)
+    delegate_id = Column(Integer, nullable=False)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class JobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+class OutboxJob(Base):
+    __tablename__ = "outbox_jobs"
+    __table_args__ = (Index("ix_outbox_jobs_status_next_run_at", "status", "next_run_at"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_type = Column(String(100), nullable=False)
+    payload = Column(Text, nullable=False)
+    idempotency_key = Column(String(200), unique=True, nullable=False)
+    status = Column(SQLEnum(JobStatus), default=JobStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=5, nullable=False)
+    next_run_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = Column(DateTime)
+    last_error = Column(String(500))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime)
+
+class IdempotencyRecord(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("scope", "key", name="uq_idempotency_keys_scope_key"),)
+
+    id = Column(Integer, primary_key=True)
+    scope = Column(String(100), nullable=False)
+    key = Column(String(200), nullable=False)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+
+    version = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
+class LeavePolicy(Base):
+    __tablename__ = "leave_policies"
+    __table_args__ = (Index("ix_leave_policies_tenant_department", "tenant_id", "department"),)
+
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(String(64), nullable=False, default=DEFAULT_TENANT)
+    department = Column(String(50))
+    rule_type = Column(String(50), nullable=False)
+    params = Column(Text, nullable=False)
+    enabled = Column(Boolean, default=True, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class SeasonalProfile(Base):
+    __tablename__ = "seasonal_profiles"
+
+    tenant_id = Column(String(64), primary_key=True)
+    month = Column(Date, primary_key=True)
+    profile = Column(Text, nullable=False)
+    computed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,248 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from app.models import Employee, LeavePolicy, LeaveRequest, LeaveStatus
+from app.schemas import LeavePolicyCreate, LeavePolicyUpdate
+from app.tenancy import current_tenant
+
+POLICY_CACHE_TTL = float(os.getenv("POLICY_CACHE_TTL", "60"))
+POLICY_CACHE_SIZE = int(os.getenv("POLICY_CACHE_SIZE", "1024"))
+
+@dataclass
+class LeaveContext:
+    employee: Employee
+    start_date: date
+    end_date: date
+    days_requested: float
+    today: date
+    team_absences: Optional[List[int]] = None
+
+Check = Callable[[LeaveContext], Optional[str]]
+
+@dataclass
+class PolicyPlan:
+    checks: List[Check] = field(default_factory=list)
+    needs_team_absences: bool = False
+
+def parse_date(value, name: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Policy parameter '{name}' must be an ISO date")
+
+def positive_int(params: dict, name: str) -> int:
+    value = params.get(name)
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        raise ValueError(f"Policy parameter '{name}' must be a non-negative integer")
+    return value
+
+def compile_max_consecutive_days(params: dict, plan: PolicyPlan) -> Check:
+    limit = positive_int(params, "days")
+    def check(ctx: LeaveContext) -> Optional[str]:
+        if ctx.days_requested > limit:
+            return f"Leave cannot exceed {limit} consecutive days"
+    return check
+
+def compile_blackout_period(params: dict, plan: PolicyPlan) -> Check:
+    start, end = parse_date(params.get("start"), "start"), parse_date(params.get("end"), "end")
+    if end < start:
+        raise ValueError("Blackout period end must be after start")
+    label = params.get("reason") or f"{start.isoformat()} to {end.isoformat()}"
+    def check(ctx: LeaveContext) -> Optional[str]:
+        if ctx.start_date <= end and ctx.end_date >= start:
+            return f"Leave overlaps a blackout period ({label})"
+    return check
+
+def compile_min_notice_days(params: dict, plan: PolicyPlan) -> Check:
+    notice = positive_int(params, "days")
+    def check(ctx: LeaveContext) -> Optional[str]:
+        if (ctx.start_date - ctx.today).days < notice:
+            return f"Leave must be requested at least {notice} days in advance"
+    return check
+
+def compile_max_concurrent_absences(params: dict, plan: PolicyPlan) -> Check:
+    limit = positive_int(params, "limit")
+    plan.needs_team_absences = True
+    def check(ctx: LeaveContext) -> Optional[str]:
+        busiest = max(ctx.team_absences) if ctx.team_absences else 0
+        if busiest + 1 > limit:
+            return f"Too many team members already on leave (limit {limit})"
+    return check
+
+RULE_COMPILERS = {
+    "max_consecutive_days": compile_max_consecutive_days,
+    "blackout_period": compile_blackout_period,
+    "min_notice_days": compile_min_notice_days,
+    "max_concurrent_absences": compile_max_concurrent_absences,
+}
+
+def compile_policies(policies: List[LeavePolicy]) -> PolicyPlan:
+    plan = PolicyPlan()
+    for policy in policies:
+        plan.checks.append(RULE_COMPILERS[policy.rule_type](json.loads(policy.params), plan))
+    return plan
+
+class PolicyPlanCache:
+    def __init__(self, ttl: float = POLICY_CACHE_TTL, max_entries: int = POLICY_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._plans: "OrderedDict[Tuple[str, str], Tuple[PolicyPlan, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+    def get(self, tenant_id: str, department: str) -> Optional[PolicyPlan]:
+        key = (tenant_id, department)
+        with self._lock:
+            entry = self._plans.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() >= entry[1]:
+                del self._plans[key]
+                return None
+            self._plans.move_to_end(key)
+            return entry[0]
+
+    def put(self, tenant_id: str, department: str, plan: PolicyPlan):
+        key, now = (tenant_id, department), time.monotonic()
+        with self._lock:
+            # Puts only follow misses, so sweeping expired plans here stays cheap.
+            for expired in [k for k, entry in self._plans.items() if now >= entry[1]]:
+                del self._plans[expired]
+            self._plans[key] = (plan, now + self.ttl)
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+
+    def invalidate(self, tenant_id: str, department: Optional[str] = None):
+        with self._lock:
+            for key in [k for k in self._plans if k[0] == tenant_id and (department is None or k[1] == department)]:
+                del self._plans[key]
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+
+policy_cache = PolicyPlanCache()
+
+class PolicyService:
+    @staticmethod
+    def get_plan(db: Session, department: str) -> PolicyPlan:
+        tenant_id = current_tenant(db)
+        plan = policy_cache.get(tenant_id, department)
+        if plan is None:
+            policies = db.query(LeavePolicy).filter(
+                and_(
+                    LeavePolicy.tenant_id == tenant_id,
+                    LeavePolicy.enabled == True,
+                    or_(LeavePolicy.department == department, LeavePolicy.department.is_(None))
+                )
+            ).order_by(LeavePolicy.id).all()
+            plan = compile_policies(policies)
+            policy_cache.put(tenant_id, department, plan)
+        return plan
+
+    @staticmethod
+    def team_absences(db: Session, employee: Employee, start_date: date, end_date: date) -> List[int]:
+        # One query for every overlapping team interval, folded into per-day counts.
+        rows = db.query(LeaveRequest.start_date, LeaveRequest.end_date).join(
+            Employee, Employee.id == LeaveRequest.employee_id
+        ).filter(
+            and_(
+                Employee.tenant_id == employee.tenant_id,
+                Employee.department == employee.department,
+                LeaveRequest.tenant_id == employee.tenant_id,
+                LeaveRequest.employee_id != employee.id,
+                LeaveRequest.status.in_([LeaveStatus.PENDING, LeaveStatus.APPROVED]),
+                LeaveRequest.start_date <= end_date,
+                LeaveRequest.end_date >= start_date
+            )
+        ).all()
+
+        span = (end_date - start_date).days + 1
+        deltas = [0] * (span + 1)
+        for row_start, row_end in rows:
+            deltas[max((row_start - start_date).days, 0)] += 1
+            deltas[min((row_end - start_date).days, span - 1) + 1] -= 1
+
+        counts, running = [], 0
+        for delta in deltas[:span]:
+            running += delta
+            counts.append(running)
+        return counts
+
+    @staticmethod
+    def check_leave(db: Session, employee: Employee, start_date: date, end_date: date, days_requested: float):
+        plan = PolicyService.get_plan(db, employee.department)
+        if not plan.checks:
+            return
+
+        context = LeaveContext(employee, start_date, end_date, days_requested, date.today())
+        if plan.needs_team_absences:
+            context.team_absences = PolicyService.team_absences(db, employee, start_date, end_date)
+
+        for check in plan.checks:
+            violation = check(context)
+            if violation:
+                raise ValueError(violation)
+
+    @staticmethod
+    def create_policy(db: Session, policy_data: LeavePolicyCreate) -> LeavePolicy:
+        RULE_COMPILERS[policy_data.rule_type](policy_data.params, PolicyPlan())
+        policy = LeavePolicy(
+            tenant_id=current_tenant(db),
+            department=policy_data.department,
+            rule_type=policy_data.rule_type,
+            params=json.dumps(policy_data.params),
+            enabled=policy_data.enabled
+        )
+        db.add(policy)
+        db.commit()
+        db.refresh(policy)
+        policy_cache.invalidate(policy.tenant_id, policy.department)
+        return policy
+
+    @staticmethod
+    def get_policy(db: Session, policy_id: int) -> Optional[LeavePolicy]:
+        return db.query(LeavePolicy).filter(
+            and_(LeavePolicy.tenant_id == current_tenant(db), LeavePolicy.id == policy_id)
+        ).first()
+
+    @staticmethod
+    def list_policies(db: Session, department: Optional[str] = None) -> List[LeavePolicy]:
+        query = db.query(LeavePolicy).filter(LeavePolicy.tenant_id == current_tenant(db))
+        if department is not None:
+            query = query.filter(LeavePolicy.department == department)
+        return query.order_by(LeavePolicy.id).all()
+
+    @staticmethod
+    def update_policy(db: Session, policy_id: int, policy_data: LeavePolicyUpdate) -> LeavePolicy:
+        policy = PolicyService.get_policy(db, policy_id)
+        if not policy:
+            raise ValueError("Policy not found")
+        if policy_data.params is not None:
+            RULE_COMPILERS[policy.rule_type](policy_data.params, PolicyPlan())
+            policy.params = json.dumps(policy_data.params)
+        if policy_data.enabled is not None:
+            policy.enabled = policy_data.enabled
+        db.commit()
+        db.refresh(policy)
+        policy_cache.invalidate(policy.tenant_id, policy.department)
+        return policy
+
+    @staticmethod
+    def delete_policy(db: Session, policy_id: int):
+        policy = PolicyService.get_policy(db, policy_id)
+        if not policy:
+            raise ValueError("Policy not found")
+        db.delete(policy)
+        db.commit()
+        policy_cache.invalidate(policy.tenant_id, policy.department)
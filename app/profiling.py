@@ -0,0 +1,203 @@
+import contextvars
+import cProfile
+import io
+import itertools
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.auth import is_admin_token
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
+PROFILER = os.getenv("PROFILER", "auto")
+PROFILE_SQL_MAX_LENGTH = 500
+
+current_profile: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("current_profile", default=None)
+
+class RequestProfile:
+    def __init__(self, profile_id: int, method: str, path: str, reason: str):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.started_at = datetime.utcnow()
+        self.started = time.perf_counter()
+        self.duration_ms = 0.0
+        self.status_code: Optional[int] = None
+        self.profiler = ""
+        self.report = ""
+        self.html: Optional[str] = None
+        self.sql: List[dict] = []
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "reason": self.reason,
+            "status_code": self.status_code,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration_ms, 2),
+            "profiler": self.profiler,
+            "sql_count": len(self.sql),
+            "sql_ms": round(sum(query["duration_ms"] for query in self.sql), 2)
+        }
+
+    def detail(self) -> dict:
+        return {**self.summary(), "sql": self.sql, "report": self.report, "has_flamegraph": self.html is not None}
+
+class ProfileStore:
+    def __init__(self, max_profiles: int = PROFILE_BUFFER_SIZE):
+        self._profiles: deque = deque(maxlen=max_profiles)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+    def add(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles.append(profile)
+
+    def get(self, profile_id: int) -> Optional[RequestProfile]:
+        with self._lock:
+            return next((profile for profile in self._profiles if profile.id == profile_id), None)
+
+    def list(self) -> List[dict]:
+        with self._lock:
+            profiles = list(self._profiles)
+        return [profile.summary() for profile in reversed(profiles)]
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+profile_store = ProfileStore()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_profile.get() is not None:
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    if profile is None or not conn.info.get("profile_query_start"):
+        return
+    started = conn.info["profile_query_start"].pop()
+    profile.sql.append({
+        "statement": statement[:PROFILE_SQL_MAX_LENGTH],
+        "offset_ms": round((started - profile.started) * 1000, 3),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3)
+    })
+
+def install_sql_timeline():
+    # Engine-wide listeners are only attached once profiling is switched on.
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+def uninstall_sql_timeline():
+    if event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.remove(Engine, "after_cursor_execute", _after_cursor_execute)
+
+class PyinstrumentBackend:
+    name = "pyinstrument"
+
+    def __init__(self):
+        from pyinstrument import Profiler
+        self.profiler = Profiler(async_mode="enabled")
+
+    def start(self):
+        self.profiler.start()
+
+    def stop(self, profile: RequestProfile):
+        self.profiler.stop()
+        profile.report = self.profiler.output_text(unicode=True)
+        profile.html = self.profiler.output_html()
+
+class CProfileBackend:
+    name = "cprofile"
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        self.profiler.enable()
+
+    def stop(self, profile: RequestProfile):
+        self.profiler.disable()
+        output = io.StringIO()
+        pstats.Stats(self.profiler, stream=output).sort_stats("cumulative").print_stats(40)
+        profile.report = output.getvalue()
+
+def make_backend(name: str = PROFILER):
+    if name in ("auto", "pyinstrument"):
+        try:
+            return PyinstrumentBackend()
+        except ImportError:
+            if name == "pyinstrument":
+                logger.warning("pyinstrument is not installed, falling back to cProfile")
+    return CProfileBackend()
+
+def get_header(scope, header: bytes) -> Optional[str]:
+    for name, value in scope.get("headers", []):
+        if name == header:
+            return value.decode("latin-1")
+    return None
+
+class ProfilingMiddleware:
+    def __init__(self, app, store: ProfileStore = profile_store, sample_rate: float = PROFILE_SAMPLE_RATE, profiler: str = PROFILER):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.profiler = profiler
+        # Profilers hook the interpreter globally, so only one request is profiled at a time.
+        self._busy = threading.Lock()
+        install_sql_timeline()
+
+    def reason(self, scope) -> Optional[str]:
+        if get_header(scope, b"x-profile") and is_admin_token(get_header(scope, b"x-admin-token")):
+            return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        reason = self.reason(scope) if scope["type"] == "http" else None
+        if not reason or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(self.store.next_id(), scope["method"], scope["path"], reason)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", str(profile.id).encode())]
+            await send(message)
+
+        backend = make_backend(self.profiler)
+        profile.profiler = backend.name
+        token = current_profile.set(profile)
+        backend.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.duration_ms = (time.perf_counter() - profile.started) * 1000
+            try:
+                backend.stop(profile)
+            finally:
+                current_profile.reset(token)
+                self._busy.release()
+            self.store.add(profile)
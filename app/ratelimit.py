@@ -0,0 +1,229 @@
+import asyncio
+import math
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional
+from starlette.responses import JSONResponse
+
+# Off by default: clients are keyed by peer address, which behind a proxy is the proxy itself
+# unless RATE_LIMIT_TRUSTED_PROXIES names it.
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "false").lower() == "true"
+RATE_LIMIT_CLIENT_RATE = float(os.getenv("RATE_LIMIT_CLIENT_RATE", "5"))
+RATE_LIMIT_CLIENT_BURST = float(os.getenv("RATE_LIMIT_CLIENT_BURST", "20"))
+RATE_LIMIT_ROUTE_RATE = float(os.getenv("RATE_LIMIT_ROUTE_RATE", "50"))
+RATE_LIMIT_ROUTE_BURST = float(os.getenv("RATE_LIMIT_ROUTE_BURST", "100"))
+WRITE_CONCURRENCY_LIMIT = int(os.getenv("WRITE_CONCURRENCY_LIMIT", "8"))
+WRITE_QUEUE_MAX = int(os.getenv("WRITE_QUEUE_MAX", "64"))
+WRITE_QUEUE_TIMEOUT = float(os.getenv("WRITE_QUEUE_TIMEOUT", "5"))
+# Peer addresses of reverse proxies/gateways allowed to say who the client is.
+RATE_LIMIT_TRUSTED_PROXIES = frozenset(
+    ip.strip() for ip in os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "").split(",") if ip.strip()
+)
+
+@dataclass
+class RateLimitRule:
+    name: str
+    method: str
+    pattern: re.Pattern
+    client_rate: float = RATE_LIMIT_CLIENT_RATE
+    client_burst: float = RATE_LIMIT_CLIENT_BURST
+    route_rate: float = RATE_LIMIT_ROUTE_RATE
+    route_burst: float = RATE_LIMIT_ROUTE_BURST
+
+WRITE_RULES = [
+    RateLimitRule("apply_leave", "POST", re.compile(r"^/api/v1/leave-requests/?$")),
+    RateLimitRule("approve_leave", "PUT", re.compile(r"^/api/v1/leave-requests/\d+/approve/?$")),
+    RateLimitRule("reject_leave", "PUT", re.compile(r"^/api/v1/leave-requests/\d+/reject/?$")),
+]
+
+# Token bucket store; subclass to share buckets across workers (e.g. Redis).
+class RateLimitBackend(ABC):
+    @abstractmethod
+    def take(self, key: str, rate: float, burst: float) -> float:
+        ...
+
+    @abstractmethod
+    def reset(self):
+        ...
+
+class InMemoryBackend(RateLimitBackend):
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [burst, now]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / rate
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+class ConcurrencyLimiter:
+    def __init__(self, limit: int = WRITE_CONCURRENCY_LIMIT, max_waiting: int = WRITE_QUEUE_MAX, timeout: float = WRITE_QUEUE_TIMEOUT):
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.limit)
+            self._loop = loop
+            self.active = 0
+            self.waiting = 0
+        return self._semaphore
+
+    async def acquire(self) -> bool:
+        semaphore = self._get_semaphore()
+        if semaphore.locked() and self.waiting >= self.max_waiting:
+            return False
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+class RateLimiter:
+    def __init__(self, rules: List[RateLimitRule], backend: Optional[RateLimitBackend] = None, concurrency: Optional[ConcurrencyLimiter] = None):
+        self.rules = rules
+        self.backend = backend or InMemoryBackend()
+        self.concurrency = concurrency or ConcurrencyLimiter()
+        self.counters: Counter = Counter()
+
+    def match(self, method: str, path: str) -> Optional[RateLimitRule]:
+        for rule in self.rules:
+            if rule.method == method and rule.pattern.match(path):
+                return rule
+        return None
+
+    def check(self, rule: RateLimitRule, client_id: str) -> float:
+        retry_after = self.backend.take(f"client:{rule.name}:{client_id}", rule.client_rate, rule.client_burst)
+        if retry_after:
+            self.counters[f"{rule.name}.client_limited"] += 1
+            return retry_after
+
+        retry_after = self.backend.take(f"route:{rule.name}", rule.route_rate, rule.route_burst)
+        if retry_after:
+            self.counters[f"{rule.name}.route_limited"] += 1
+        return retry_after
+
+    def stats(self) -> dict:
+        return {
+            "counters": dict(self.counters),
+            "concurrency": {
+                "limit": self.concurrency.limit,
+                "active": self.concurrency.active,
+                "waiting": self.concurrency.waiting,
+                "max_waiting": self.concurrency.max_waiting
+            },
+            "rules": [
+                {
+                    "name": rule.name,
+                    "method": rule.method,
+                    "client_rate": rule.client_rate,
+                    "client_burst": rule.client_burst,
+                    "route_rate": rule.route_rate,
+                    "route_burst": rule.route_burst
+                }
+                for rule in self.rules
+            ]
+        }
+
+    def reset(self):
+        self.backend.reset()
+        self.counters.clear()
+
+rate_limiter = RateLimiter(WRITE_RULES)
+
+def get_client_id(scope, trusted_proxies: frozenset = RATE_LIMIT_TRUSTED_PROXIES) -> str:
+    # Buckets are keyed on the peer address. Only a trusted proxy may name the client, via
+    # X-Client-ID (set after authentication) or the address it appended to X-Forwarded-For.
+    client = scope.get("client")
+    peer = client[0] if client else "anonymous"
+    if peer not in trusted_proxies:
+        return peer
+    headers = dict(scope.get("headers", []))
+    if b"x-client-id" in headers:
+        return headers[b"x-client-id"].decode("latin-1")
+    forwarded = [ip.strip() for ip in headers.get(b"x-forwarded-for", b"").decode("latin-1").split(",") if ip.strip()]
+    for ip in reversed(forwarded):
+        if ip not in trusted_proxies:
+            return ip
+    return peer
+
+class RateLimitMiddleware:
+    def __init__(self, app, limiter: RateLimiter = rate_limiter, trusted_proxies: frozenset = RATE_LIMIT_TRUSTED_PROXIES):
+        self.app = app
+        self.limiter = limiter
+        self.trusted_proxies = trusted_proxies
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rule = self.limiter.match(scope["method"], scope["path"])
+        if not rule:
+            await self.app(scope, receive, send)
+            return
+
+        self.limiter.counters[f"{rule.name}.requests"] += 1
+        retry_after = self.limiter.check(rule, get_client_id(scope, self.trusted_proxies))
+        if retry_after:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded"},
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+            await response(scope, receive, send)
+            return
+
+        if not await self.limiter.concurrency.acquire():
+            self.limiter.counters[f"{rule.name}.shed"] += 1
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server is busy, please retry"},
+                headers={"Retry-After": str(math.ceil(self.limiter.concurrency.timeout))}
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.concurrency.release()
@@ -0,0 +1,273 @@
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import and_, func, select
+from app.jobs import register_handler
+from app.models import Employee, LeaveRequest, LeaveStatus, DEFAULT_TENANT
+
+logger = logging.getLogger(__name__)
+
+REPORTS_DIR = os.getenv("REPORTS_DIR", "./reports")
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", str(min(os.cpu_count() or 1, 4))))
+REPORT_CHUNK_SIZE = int(os.getenv("REPORT_CHUNK_SIZE", "5000"))
+CARRY_OVER_MAX_DAYS = float(os.getenv("CARRY_OVER_MAX_DAYS", "5"))
+
+STATEMENT_COLUMNS = [
+    "employee_id", "name", "email", "department", "joining_date", "entitlement_days",
+    "used_days", "pending_days", "remaining_days", "carry_over_days", "approved_requests", "pending_requests"
+]
+DEPARTMENT_COLUMNS = [
+    "department", "employees", "entitlement_days", "used_days", "pending_days", "carry_over_days", "utilization"
+]
+TOTAL_FIELDS = ("employees", "entitlement_days", "used_days", "pending_days", "carry_over_days")
+
+def entitlement_for_year(joining_date: date, annual_leave: float, year: int) -> float:
+    if joining_date.year > year:
+        return 0.0
+    if joining_date.year == year:
+        return round(annual_leave / 12 * (13 - joining_date.month), 2)
+    return annual_leave
+
+def days_in_year(start: date, end: date, year: int) -> int:
+    first, last = max(start, date(year, 1, 1)), min(end, date(year, 12, 31))
+    return max((last - first).days + 1, 0)
+
+def partition_file(output_dir: str, lo: int, hi: int) -> str:
+    return os.path.join(output_dir, "partitions", f"statements-{lo:010d}-{hi:010d}.csv")
+
+def build_partition(database_url: str, tenant_id: str, year: int, lo: int, hi: int, output_dir: str) -> dict:
+    # Runs in a worker process: one query per table for the whole ID range, then a streaming write.
+    from app.database import make_engine
+
+    engine = make_engine(database_url)
+    try:
+        with engine.connect() as conn:
+            employees = conn.execute(select(
+                Employee.id, Employee.name, Employee.email, Employee.department,
+                Employee.joining_date, Employee.annual_leave_entitlement
+            ).where(
+                and_(Employee.tenant_id == tenant_id, Employee.id >= lo, Employee.id < hi)
+            ).order_by(Employee.id)).all()
+            leaves = conn.execute(select(
+                LeaveRequest.employee_id, LeaveRequest.start_date, LeaveRequest.end_date, LeaveRequest.status
+            ).where(
+                and_(
+                    LeaveRequest.tenant_id == tenant_id,
+                    LeaveRequest.employee_id >= lo,
+                    LeaveRequest.employee_id < hi,
+                    LeaveRequest.status.in_([LeaveStatus.APPROVED, LeaveStatus.PENDING]),
+                    LeaveRequest.start_date <= date(year, 12, 31),
+                    LeaveRequest.end_date >= date(year, 1, 1)
+                )
+            )).all()
+    finally:
+        engine.dispose()
+
+    # [used days, pending days, approved requests, pending requests] per employee.
+    booked: Dict[int, List[float]] = {}
+    for employee_id, start, end, status in leaves:
+        totals = booked.setdefault(employee_id, [0, 0, 0, 0])
+        offset = 0 if status == LeaveStatus.APPROVED else 1
+        totals[offset] += days_in_year(start, end, year)
+        totals[offset + 2] += 1
+
+    departments: Dict[str, Dict[str, float]] = {}
+    path = partition_file(output_dir, lo, hi)
+    with open(path + ".part", "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(STATEMENT_COLUMNS)
+        for employee_id, name, email, department, joining_date, annual_leave in employees:
+            used, pending, approved_count, pending_count = booked.get(employee_id, (0, 0, 0, 0))
+            entitlement = entitlement_for_year(joining_date, annual_leave if annual_leave is not None else 25.0, year)
+            remaining = round(entitlement - used, 2)
+            carry_over = min(max(remaining, 0), CARRY_OVER_MAX_DAYS)
+            writer.writerow([
+                employee_id, name, email, department, joining_date.isoformat(), entitlement,
+                used, pending, remaining, carry_over, approved_count, pending_count
+            ])
+
+            summary = departments.setdefault(department, dict.fromkeys(TOTAL_FIELDS, 0))
+            summary["employees"] += 1
+            summary["entitlement_days"] += entitlement
+            summary["used_days"] += used
+            summary["pending_days"] += pending
+            summary["carry_over_days"] += carry_over
+    os.replace(path + ".part", path)
+    return {"rows": len(employees), "departments": departments}
+
+class YearEndReport:
+    def __init__(self, database_url: str, year: int, output_dir: str, tenant_id: str = DEFAULT_TENANT, workers: int = REPORT_WORKERS, chunk_size: int = REPORT_CHUNK_SIZE, run_id: Optional[str] = None):
+        self.database_url = database_url
+        self.year = year
+        self.output_dir = output_dir
+        self.tenant_id = tenant_id
+        self.workers = workers
+        self.chunk_size = chunk_size
+        # None resumes whatever run the manifest holds; a different id starts a fresh run.
+        self.run_id = run_id
+        self.manifest_path = os.path.join(output_dir, "manifest.json")
+
+    def partitions(self) -> List[Tuple[int, int]]:
+        from app.database import make_engine
+
+        engine = make_engine(self.database_url)
+        try:
+            with engine.connect() as conn:
+                low, high = conn.execute(
+                    select(func.min(Employee.id), func.max(Employee.id)).where(Employee.tenant_id == self.tenant_id)
+                ).one()
+        finally:
+            engine.dispose()
+        if low is None:
+            return []
+        # A fixed grid keeps partition keys stable across re-runs even if new employees were added.
+        start = low - low % self.chunk_size
+        return [(lo, lo + self.chunk_size) for lo in range(start, high + 1, self.chunk_size)]
+
+    def load_manifest(self) -> dict:
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as handle:
+                manifest = json.load(handle)
+            if (manifest["year"], manifest["tenant_id"], manifest["chunk_size"]) != (self.year, self.tenant_id, self.chunk_size):
+                raise ValueError(f"{self.output_dir} holds a different report; choose another output directory")
+            if self.run_id is None or manifest.get("run_id") == self.run_id:
+                return manifest
+        return {"year": self.year, "tenant_id": self.tenant_id, "chunk_size": self.chunk_size, "run_id": self.run_id, "completed": False, "partitions": {}}
+
+    def save_manifest(self, manifest: dict):
+        with open(self.manifest_path + ".tmp", "w") as handle:
+            json.dump(manifest, handle, indent=2)
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
+
+    def run(self, progress: Optional[Callable[[int, int], None]] = None) -> dict:
+        os.makedirs(os.path.join(self.output_dir, "partitions"), exist_ok=True)
+        manifest = self.load_manifest()
+        ranges = self.partitions()
+        manifest["total_partitions"] = len(ranges)
+
+        # Partitions recorded in the manifest with their file in place are skipped on a re-run.
+        todo = [
+            (lo, hi) for lo, hi in ranges
+            if f"{lo}-{hi}" not in manifest["partitions"] or not os.path.exists(partition_file(self.output_dir, lo, hi))
+        ]
+        done = len(ranges) - len(todo)
+        if progress:
+            progress(done, len(ranges))
+
+        def record(lo: int, hi: int, result: dict):
+            nonlocal done
+            manifest["partitions"][f"{lo}-{hi}"] = result
+            self.save_manifest(manifest)
+            done += 1
+            logger.info("Year-end report %s: %s/%s partitions", self.year, done, len(ranges))
+            if progress:
+                progress(done, len(ranges))
+
+        args = (self.database_url, self.tenant_id, self.year)
+        if self.workers <= 1:
+            for lo, hi in todo:
+                record(lo, hi, build_partition(*args, lo, hi, self.output_dir))
+        else:
+            # Spawned workers avoid forking a process that already runs threads and an event loop.
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+                futures = {pool.submit(build_partition, *args, lo, hi, self.output_dir): (lo, hi) for lo, hi in todo}
+                for future in as_completed(futures):
+                    record(*futures[future], future.result())
+
+        self.write_outputs(manifest, ranges)
+        manifest["completed"] = True
+        self.save_manifest(manifest)
+        return manifest
+
+    def write_outputs(self, manifest: dict, ranges: List[Tuple[int, int]]):
+        with open(os.path.join(self.output_dir, "statements.csv"), "w", newline="") as output:
+            output.write(",".join(STATEMENT_COLUMNS) + "\r\n")
+            for lo, hi in ranges:
+                with open(partition_file(self.output_dir, lo, hi), newline="") as part:
+                    part.readline()
+                    shutil.copyfileobj(part, output)
+
+        departments: Dict[str, Dict[str, float]] = {}
+        for lo, hi in ranges:
+            for department, totals in manifest["partitions"][f"{lo}-{hi}"]["departments"].items():
+                merged = departments.setdefault(department, dict.fromkeys(TOTAL_FIELDS, 0))
+                for field in TOTAL_FIELDS:
+                    merged[field] += totals[field]
+
+        with open(os.path.join(self.output_dir, "departments.csv"), "w", newline="") as output:
+            writer = csv.writer(output)
+            writer.writerow(DEPARTMENT_COLUMNS)
+            for department in sorted(departments):
+                totals = departments[department]
+                utilization = totals["used_days"] / totals["entitlement_days"] if totals["entitlement_days"] else 0
+                writer.writerow([department] + [round(totals[field], 2) for field in TOTAL_FIELDS] + [round(utilization, 4)])
+
+def report_dir(tenant_id: str, year: int) -> str:
+    return os.path.join(REPORTS_DIR, tenant_id, str(year))
+
+def report_status(tenant_id: str, year: int) -> Optional[dict]:
+    path = os.path.join(report_dir(tenant_id, year), "manifest.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as handle:
+        manifest = json.load(handle)
+    return {
+        "year": year,
+        "run_id": manifest.get("run_id"),
+        "completed": manifest["completed"],
+        "partitions_done": len(manifest["partitions"]),
+        "total_partitions": manifest.get("total_partitions"),
+        "employees": sum(result["rows"] for result in manifest["partitions"].values()),
+        "output_dir": report_dir(tenant_id, year)
+    }
+
+def database_url_for(tenant_id: str) -> str:
+    from app.database import DATABASE_URL, shard_map
+    from app.tenancy import MULTI_TENANT
+
+    return shard_map.shard_for(tenant_id).url if MULTI_TENANT else DATABASE_URL
+
+@register_handler("reports.year_end")
+def generate_year_end_report(payload: dict):
+    # Retries of a failed job resume from the manifest instead of starting over.
+    tenant_id, year = payload["tenant_id"], payload["year"]
+    YearEndReport(database_url_for(tenant_id), year, report_dir(tenant_id, year), tenant_id=tenant_id, run_id=payload.get("run_id")).run()
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate year-end leave statements and department summaries")
+    parser.add_argument("year", type=int)
+    parser.add_argument("--tenant", default=DEFAULT_TENANT)
+    parser.add_argument("--output", help="Output directory (default: REPORTS_DIR/<tenant>/<year>)")
+    parser.add_argument("--database-url", help="Defaults to DATABASE_URL or the tenant's shard")
+    parser.add_argument("--workers", type=int, default=REPORT_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=REPORT_CHUNK_SIZE)
+    parser.add_argument("--force", action="store_true", help="Discard a previous or partial run and regenerate every partition")
+    args = parser.parse_args(argv)
+
+    report = YearEndReport(
+        args.database_url or database_url_for(args.tenant),
+        args.year,
+        args.output or report_dir(args.tenant, args.year),
+        tenant_id=args.tenant,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        run_id=new_run_id() if args.force else None
+    )
+    manifest = report.run(progress=lambda done, total: print(f"\r{done}/{total} partitions", end="", flush=True))
+    print(f"\nWrote {sum(result['rows'] for result in manifest['partitions'].values())} statements to {report.output_dir}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,15 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import HTMLResponse
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.services import EmployeeService, LeaveService
+from app.auth import require_admin
+from app.database import get_db, get_read_db, read_with_fallback, shard_map
+from app.services import EmployeeService, LeaveService, HierarchyService, ApprovalService
 from app.schemas import (
     EmployeeCreate, EmployeeResponse, LeaveRequestCreate, 
-    LeaveRequestResponse, LeaveRequestUpdate, LeaveBalance, ErrorResponse
+    LeaveRequestResponse, LeaveRequestUpdate, LeaveBalance, ErrorResponse,
+    DelegationCreate, DelegationResponse, LeavePolicyCreate, LeavePolicyUpdate, LeavePolicyResponse,
+    ForecastResponse
 )
-from typing import List
+from app.ratelimit import rate_limiter
+from app.idempotency import IdempotencyConflict, idempotency_store
+from app.tenancy import current_tenant
+from app.policies import PolicyService
+from app.forecasting import ForecastService
+from app.jobs import enqueue_job
+from typing import List, Optional
 
 router = APIRouter()
 
+def claim_idempotency_key(db: Session, scope: str, key: str, fingerprint: str) -> Optional[Response]:
+    try:
+        stored = idempotency_store.claim(db, scope, key)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if not stored:
+        return None
+    if stored.fingerprint != fingerprint:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request"
+        )
+    return Response(
+        content=stored.body,
+        status_code=stored.status_code,
+        media_type="application/json",
+        headers={"Idempotent-Replayed": "true"}
+    )
+
+def store_idempotent_response(db: Session, scope: str, key: str, fingerprint: str, leave_request, status_code: int):
+    # Commits the stored response in the same transaction as the leave request itself.
+    body = LeaveRequestResponse.model_validate(leave_request).model_dump_json()
+    idempotency_store.save(db, scope, key, fingerprint, status_code, body)
+
 @router.post("/employees", response_model=EmployeeResponse, status_code=status.HTTP_201_CREATED)
 async def create_employee(employee_data: EmployeeCreate, db: Session = Depends(get_db)):
     try:
@@ -21,21 +56,42 @@ async def create_employee(employee_data: EmployeeCreate, db: Session = Depends(g
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
 
 @router.get("/employees", response_model=List[EmployeeResponse])
-async def get_employees(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    employees = EmployeeService.get_all_employees(db, skip=skip, limit=limit)
-    return employees
+async def get_employees(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
+    return read_with_fallback(db, lambda session: EmployeeService.get_all_employees(session, skip=skip, limit=limit))
+
+@router.get("/employees/search", response_model=List[EmployeeResponse])
+async def search_employees(
+    q: Optional[str] = Query(None, max_length=100),
+    department: Optional[str] = None,
+    mode: str = Query("auto", pattern="^(auto|prefix|substring|fuzzy)$"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    return EmployeeService.search_employees(db, query=q, department=department, mode=mode, limit=limit)
 
 @router.get("/employees/{employee_id}", response_model=EmployeeResponse)
-async def get_employee(employee_id: int, db: Session = Depends(get_db)):
-    employee = EmployeeService.get_employee_by_id(db, employee_id)
+async def get_employee(employee_id: int, db: Session = Depends(get_read_db)):
+    employee = read_with_fallback(db, lambda session: EmployeeService.get_employee_by_id(session, employee_id))
     if not employee:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Employee not found")
     return employee
 
 @router.post("/leave-requests", response_model=LeaveRequestResponse, status_code=status.HTTP_201_CREATED)
-async def apply_leave(leave_data: LeaveRequestCreate, db: Session = Depends(get_db)):
+async def apply_leave(
+    leave_data: LeaveRequestCreate,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=200)
+):
+    scope = f"{current_tenant(db)}:apply_leave"
+    if idempotency_key:
+        fingerprint = idempotency_store.fingerprint(leave_data.model_dump(mode="json"))
+        replayed = claim_idempotency_key(db, scope, idempotency_key, fingerprint)
+        if replayed:
+            return replayed
     try:
-        leave_request = LeaveService.apply_leave(db, leave_data)
+        leave_request = LeaveService.apply_leave(db, leave_data, commit=not idempotency_key)
+        if idempotency_key:
+            store_idempotent_response(db, scope, idempotency_key, fingerprint, leave_request, status.HTTP_201_CREATED)
         return leave_request
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -43,10 +99,24 @@ async def apply_leave(leave_data: LeaveRequestCreate, db: Session = Depends(get_
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
 
 @router.put("/leave-requests/{leave_id}/approve", response_model=LeaveRequestResponse)
-async def approve_leave(leave_id: int, processed_by: str, db: Session = Depends(get_db)):
+async def approve_leave(
+    leave_id: int,
+    processed_by: str,
+    approver_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=200)
+):
+    scope = f"{current_tenant(db)}:approve_leave:{leave_id}"
+    if idempotency_key:
+        fingerprint = idempotency_store.fingerprint({"processed_by": processed_by, "approver_id": approver_id})
+        replayed = claim_idempotency_key(db, scope, idempotency_key, fingerprint)
+        if replayed:
+            return replayed
     try:
-        update_data = LeaveRequestUpdate(status="approved", processed_by=processed_by)
-        leave_request = LeaveService.update_leave_status(db, leave_id, update_data)
+        update_data = LeaveRequestUpdate(status="approved", processed_by=processed_by, approver_id=approver_id)
+        leave_request = LeaveService.update_leave_status(db, leave_id, update_data, commit=not idempotency_key)
+        if idempotency_key:
+            store_idempotent_response(db, scope, idempotency_key, fingerprint, leave_request, status.HTTP_200_OK)
         return leave_request
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -54,10 +124,24 @@ async def approve_leave(leave_id: int, processed_by: str, db: Session = Depends(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
 
 @router.put("/leave-requests/{leave_id}/reject", response_model=LeaveRequestResponse)
-async def reject_leave(leave_id: int, processed_by: str, db: Session = Depends(get_db)):
+async def reject_leave(
+    leave_id: int,
+    processed_by: str,
+    approver_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=200)
+):
+    scope = f"{current_tenant(db)}:reject_leave:{leave_id}"
+    if idempotency_key:
+        fingerprint = idempotency_store.fingerprint({"processed_by": processed_by, "approver_id": approver_id})
+        replayed = claim_idempotency_key(db, scope, idempotency_key, fingerprint)
+        if replayed:
+            return replayed
     try:
-        update_data = LeaveRequestUpdate(status="rejected", processed_by=processed_by)
-        leave_request = LeaveService.update_leave_status(db, leave_id, update_data)
+        update_data = LeaveRequestUpdate(status="rejected", processed_by=processed_by, approver_id=approver_id)
+        leave_request = LeaveService.update_leave_status(db, leave_id, update_data, commit=not idempotency_key)
+        if idempotency_key:
+            store_idempotent_response(db, scope, idempotency_key, fingerprint, leave_request, status.HTTP_200_OK)
         return leave_request
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -65,19 +149,144 @@ async def reject_leave(leave_id: int, processed_by: str, db: Session = Depends(g
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
 
 @router.get("/employees/{employee_id}/leave-balance", response_model=LeaveBalance)
-async def get_leave_balance(employee_id: int, db: Session = Depends(get_db)):
+async def get_leave_balance(employee_id: int, db: Session = Depends(get_read_db)):
     try:
-        balance = LeaveService.get_leave_balance(db, employee_id)
-        return balance
+        return read_with_fallback(db, lambda session: LeaveService.get_leave_balance(session, employee_id))
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except DBAPIError:
+        # Errors left after the primary retry are reported by the app's database error handler.
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
 
 @router.get("/employees/{employee_id}/leave-requests", response_model=List[LeaveRequestResponse])
-async def get_employee_leave_requests(employee_id: int, db: Session = Depends(get_db)):
+async def get_employee_leave_requests(employee_id: int, db: Session = Depends(get_read_db)):
+    try:
+        return read_with_fallback(db, lambda session: LeaveService.get_employee_leave_requests(session, employee_id))
+    except DBAPIError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+@router.put("/employees/{employee_id}/manager", response_model=EmployeeResponse)
+async def set_employee_manager(employee_id: int, manager_id: Optional[int] = None, db: Session = Depends(get_db)):
+    try:
+        return HierarchyService.set_manager(db, employee_id, manager_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+@router.get("/employees/{employee_id}/reports", response_model=List[EmployeeResponse])
+async def get_employee_reports(employee_id: int, include_indirect: bool = False, db: Session = Depends(get_read_db)):
+    return read_with_fallback(db, lambda session: HierarchyService.get_reports(session, employee_id, include_indirect=include_indirect))
+
+@router.get("/employees/{employee_id}/pending-approvals", response_model=List[LeaveRequestResponse])
+async def get_pending_approvals(employee_id: int, include_indirect: bool = False, db: Session = Depends(get_read_db)):
+    return read_with_fallback(db, lambda session: ApprovalService.get_pending_approvals(session, employee_id, include_indirect=include_indirect))
+
+@router.post("/delegations", response_model=DelegationResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_admin)])
+async def create_delegation(delegation_data: DelegationCreate, db: Session = Depends(get_db)):
+    try:
+        return ApprovalService.create_delegation(db, delegation_data)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+@router.post("/policies", response_model=LeavePolicyResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_admin)])
+async def create_policy(policy_data: LeavePolicyCreate, db: Session = Depends(get_db)):
+    try:
+        return PolicyService.create_policy(db, policy_data)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+@router.get("/policies", response_model=List[LeavePolicyResponse])
+async def get_policies(department: Optional[str] = None, db: Session = Depends(get_db)):
+    return PolicyService.list_policies(db, department=department)
+
+@router.put("/policies/{policy_id}", response_model=LeavePolicyResponse, dependencies=[Depends(require_admin)])
+async def update_policy(policy_id: int, policy_data: LeavePolicyUpdate, db: Session = Depends(get_db)):
     try:
-        requests = LeaveService.get_employee_leave_requests(db, employee_id)
-        return requests
+        return PolicyService.update_policy(db, policy_id, policy_data)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+@router.delete("/policies/{policy_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(require_admin)])
+async def delete_policy(policy_id: int, db: Session = Depends(get_db)):
+    try:
+        PolicyService.delete_policy(db, policy_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+# A plain def runs in the threadpool, so a cold build never blocks the event loop.
+@router.get("/reports/forecast", response_model=ForecastResponse)
+def get_leave_forecast(
+    months: int = Query(6, ge=1, le=24),
+    department: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    return read_with_fallback(db, lambda session: ForecastService.get_forecast(session, months=months, department=department))
+
+@router.get("/admin/rate-limits", dependencies=[Depends(require_admin)])
+async def get_rate_limit_stats():
+    return rate_limiter.stats()
+
+@router.get("/admin/shards", dependencies=[Depends(require_admin)])
+async def get_shard_stats():
+    return shard_map.stats()
+
+@router.post("/admin/reports/year-end/{year}", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(require_admin)])
+async def start_year_end_report(year: int, force: bool = False, db: Session = Depends(get_db)):
+    from app.reports import new_run_id, report_status
+
+    tenant_id = current_tenant(db)
+    payload = {"tenant_id": tenant_id, "year": year}
+    idempotency_key = f"reports.year_end:{tenant_id}:{year}"
+    if force:
+        # A fresh run id gets its own job and resets the manifest when it runs.
+        payload["run_id"] = new_run_id()
+        idempotency_key += f":{payload['run_id']}"
+    job = enqueue_job(db, "reports.year_end", payload, idempotency_key)
+    db.commit()
+    return {"year": year, "queued": job is not None, "run_id": payload.get("run_id"), "status": report_status(tenant_id, year)}
+
+@router.get("/admin/reports/year-end/{year}", dependencies=[Depends(require_admin)])
+async def get_year_end_report(year: int, db: Session = Depends(get_db)):
+    from app.reports import report_status
+
+    report = report_status(current_tenant(db), year)
+    if not report:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report not found")
+    return report
+
+@router.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def get_profiles():
+    from app.profiling import profile_store
+
+    return profile_store.list()
+
+@router.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_profile(profile_id: int):
+    from app.profiling import profile_store
+
+    profile = profile_store.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return profile.detail()
+
+@router.get("/admin/profiles/{profile_id}/flamegraph", response_class=HTMLResponse, dependencies=[Depends(require_admin)])
+async def get_profile_flamegraph(profile_id: int):
+    from app.profiling import profile_store
+
+    profile = profile_store.get(profile_id)
+    if not profile or profile.html is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Flamegraph not available")
+    return HTMLResponse(profile.html)
@@ -1,6 +1,7 @@
+import json
 from pydantic import BaseModel, EmailStr, validator, Field
 from datetime import date, datetime
-from typing import Optional
+from typing import Any, Dict, List, Literal, Optional
 from enum import Enum
 
 class LeaveStatus(str, Enum):
@@ -14,6 +15,7 @@ class EmployeeCreate(BaseModel):
     department: str = Field(..., min_length=2, max_length=50)
     joining_date: date
     annual_leave_entitlement: Optional[float] = Field(default=25.0, ge=0, le=365)
+    manager_id: Optional[int] = None
 
 class EmployeeResponse(BaseModel):
     id: int
@@ -22,6 +24,7 @@ class EmployeeResponse(BaseModel):
     department: str
     joining_date: date
     annual_leave_entitlement: float
+    manager_id: Optional[int] = None
     created_at: datetime
 
     class Config:
@@ -32,6 +35,7 @@ class LeaveRequestCreate(BaseModel):
     start_date: date
     end_date: date
     reason: Optional[str] = Field(None, max_length=500)
+    delegate_id: Optional[int] = None
 
     @validator('end_date')
     def validate_date_range(cls, v, values):
@@ -50,6 +54,7 @@ class LeaveRequestResponse(BaseModel):
     applied_date: datetime
     processed_date: Optional[datetime]
     processed_by: Optional[str]
+    approval_steps: int = 0
 
     class Config:
         from_attributes = True
@@ -57,6 +62,29 @@ class LeaveRequestResponse(BaseModel):
 class LeaveRequestUpdate(BaseModel):
     status: LeaveStatus
     processed_by: str = Field(..., min_length=2, max_length=100)
+    approver_id: Optional[int] = None
+
+class DelegationCreate(BaseModel):
+    delegator_id: int
+    delegate_id: int
+    start_date: date
+    end_date: date
+
+    @validator('end_date')
+    def validate_date_range(cls, v, values):
+        if 'start_date' in values and v < values['start_date']:
+            raise ValueError('End date must be after start date')
+        return v
+
+class DelegationResponse(BaseModel):
+    id: int
+    delegator_id: int
+    delegate_id: int
+    start_date: date
+    end_date: date
+
+    class Config:
+        from_attributes = True
 
 class LeaveBalance(BaseModel):
     employee_id: int
@@ -65,6 +93,52 @@ class LeaveBalance(BaseModel):
     pending_days: float
     annual_entitlement: float
 
+PolicyRuleType = Literal["max_consecutive_days", "blackout_period", "min_notice_days", "max_concurrent_absences"]
+
+class LeavePolicyCreate(BaseModel):
+    department: Optional[str] = Field(None, min_length=2, max_length=50)
+    rule_type: PolicyRuleType
+    params: Dict[str, Any]
+    enabled: bool = True
+
+class LeavePolicyUpdate(BaseModel):
+    params: Optional[Dict[str, Any]] = None
+    enabled: Optional[bool] = None
+
+class LeavePolicyResponse(BaseModel):
+    id: int
+    department: Optional[str]
+    rule_type: str
+    params: Dict[str, Any]
+    enabled: bool
+    updated_at: datetime
+
+    @validator('params', pre=True)
+    def parse_params(cls, v):
+        return json.loads(v) if isinstance(v, str) else v
+
+    class Config:
+        from_attributes = True
+
+class DepartmentForecast(BaseModel):
+    department: str
+    headcount: int
+    approved: List[int]
+    pending: List[int]
+    seasonal: List[float]
+    available: List[float]
+    availability: List[float]
+    risk: List[Literal["low", "medium", "high"]]
+    min_availability: float
+    high_risk_days: int
+
+class ForecastResponse(BaseModel):
+    start_date: date
+    end_date: date
+    seasonal_profile_month: Optional[date] = None
+    dates: List[date]
+    departments: List[DepartmentForecast]
+
 class ErrorResponse(BaseModel):
     error: str
     detail: str
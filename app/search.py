@@ -0,0 +1,298 @@
+import bisect
+import os
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from sqlalchemy import DDL, event, text
+from sqlalchemy.orm import Session
+from app.models import Employee
+from app.tenancy import current_tenant
+
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+SEARCH_FUZZY_THRESHOLD = float(os.getenv("SEARCH_FUZZY_THRESHOLD", "0.4"))
+SEARCH_MAX_MEMORY_INDEXES = int(os.getenv("SEARCH_MAX_MEMORY_INDEXES", "256"))
+SEARCH_MODES = ("auto", "prefix", "substring", "fuzzy")
+
+SQLITE_FTS_TABLE = "employees_search"
+SQLITE_FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} "
+    "USING fts5(name, email, department UNINDEXED, tenant_id UNINDEXED, tokenize='trigram')"
+)
+
+def sqlite_supports_trigram(ddl, target, bind, **kw) -> bool:
+    return bind.dialect.name == "sqlite" and bind.dialect.dbapi.sqlite_version_info >= (3, 34, 0)
+
+event.listen(Employee.__table__, "after_create", DDL(SQLITE_FTS_DDL).execute_if(callable_=sqlite_supports_trigram))
+event.listen(Employee.__table__, "before_drop", DDL(f"DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}").execute_if(callable_=sqlite_supports_trigram))
+
+def trigrams(value: str) -> Set[str]:
+    padded = f"  {value} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+class TrigramIndex:
+    def __init__(self):
+        self.max_id = 0
+        self._docs: Dict[int, Tuple[str, str, str]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._departments: Dict[str, Set[int]] = {}
+        self._sorted_keys: List[Tuple[str, int]] = []
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _insert(self, employee_id: int, name: str, email: str, department: str) -> bool:
+        if employee_id in self._docs:
+            return False
+        self._docs[employee_id] = (name, email, department)
+        for gram in trigrams(name) | trigrams(email):
+            self._postings.setdefault(gram, set()).add(employee_id)
+        self._departments.setdefault(department, set()).add(employee_id)
+        self.max_id = max(self.max_id, employee_id)
+        return True
+
+    def add(self, employee_id: int, name: str, email: str, department: str):
+        name, email = name.lower(), email.lower()
+        with self._lock:
+            if self._insert(employee_id, name, email, department):
+                bisect.insort(self._sorted_keys, (name, employee_id))
+                bisect.insort(self._sorted_keys, (email, employee_id))
+
+    def add_many(self, rows: Iterable[Tuple[int, str, str, str]]):
+        with self._lock:
+            for employee_id, name, email, department in rows:
+                name, email = name.lower(), email.lower()
+                if self._insert(employee_id, name, email, department):
+                    self._sorted_keys.append((name, employee_id))
+                    self._sorted_keys.append((email, employee_id))
+            self._sorted_keys.sort()
+
+    def _prefix(self, query: str) -> Iterator[int]:
+        position = bisect.bisect_left(self._sorted_keys, (query, 0))
+        while position < len(self._sorted_keys) and self._sorted_keys[position][0].startswith(query):
+            yield self._sorted_keys[position][1]
+            position += 1
+
+    def _substring(self, query: str) -> List[int]:
+        if len(query) < 3:
+            candidates = self._docs.keys()
+        else:
+            postings = sorted(
+                (self._postings.get(query[i:i + 3], set()) for i in range(len(query) - 2)),
+                key=len
+            )
+            candidates = set.intersection(*postings) if postings else set()
+        matches = [i for i in candidates if query in self._docs[i][0] or query in self._docs[i][1]]
+        return sorted(matches, key=lambda i: self._docs[i][0])
+
+    def _fuzzy(self, query: str) -> List[int]:
+        query_grams = trigrams(query)
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self._postings.get(gram, ()))
+        scored = []
+        for employee_id, count in shared.items():
+            # Share of the query's trigrams found in the document, like pg_trgm's word_similarity.
+            similarity = count / len(query_grams)
+            if similarity >= SEARCH_FUZZY_THRESHOLD:
+                scored.append((-similarity, self._docs[employee_id][0], employee_id))
+        return [employee_id for _, _, employee_id in sorted(scored)]
+
+    def search(self, query: str, mode: str = "auto", department: Optional[str] = None, limit: int = 20) -> List[int]:
+        query = query.lower().strip()
+        with self._lock:
+            allowed = self._departments.get(department, set()) if department is not None else None
+            modes = ("prefix", "substring", "fuzzy") if mode == "auto" else (mode,)
+            results: List[int] = []
+            seen: Set[int] = set()
+            for current in modes:
+                for employee_id in getattr(self, f"_{current}")(query):
+                    if employee_id in seen or (allowed is not None and employee_id not in allowed):
+                        continue
+                    seen.add(employee_id)
+                    results.append(employee_id)
+                    if len(results) >= limit:
+                        return results
+            return results
+
+class EmployeeSearchService:
+    _memory_indexes: "OrderedDict[Tuple[str, str], TrigramIndex]" = OrderedDict()
+    _postgres_ready: Dict[str, bool] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _bind_key(db: Session) -> str:
+        return str(db.get_bind().url)
+
+    @staticmethod
+    def backend(db: Session) -> str:
+        dialect = db.get_bind().dialect
+        if SEARCH_BACKEND != "auto":
+            return SEARCH_BACKEND
+        if dialect.name == "sqlite" and dialect.dbapi.sqlite_version_info >= (3, 34, 0):
+            return "sqlite_fts"
+        if dialect.name == "postgresql" and EmployeeSearchService._postgres_ready.get(EmployeeSearchService._bind_key(db)) is not False:
+            return "postgres"
+        return "memory"
+
+    @staticmethod
+    def _postgres_available(db: Session) -> bool:
+        # pg_trgm and its indexes come from migration 10; without the extension search stays in memory.
+        key = EmployeeSearchService._bind_key(db)
+        if key not in EmployeeSearchService._postgres_ready:
+            installed = db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first()
+            EmployeeSearchService._postgres_ready[key] = installed is not None
+        return EmployeeSearchService._postgres_ready[key]
+
+    @staticmethod
+    def memory_index(db: Session) -> TrigramIndex:
+        key = (EmployeeSearchService._bind_key(db), current_tenant(db))
+        with EmployeeSearchService._lock:
+            index = EmployeeSearchService._memory_indexes.get(key)
+            if index is None:
+                index = EmployeeSearchService._memory_indexes[key] = TrigramIndex()
+                if len(EmployeeSearchService._memory_indexes) > SEARCH_MAX_MEMORY_INDEXES:
+                    EmployeeSearchService._memory_indexes.popitem(last=False)
+            EmployeeSearchService._memory_indexes.move_to_end(key)
+
+        # Employees are append-only, so catching up on new ids keeps workers coherent.
+        tenant_filter = Employee.tenant_id == key[1]
+        newest = db.query(Employee.id).filter(tenant_filter).order_by(Employee.id.desc()).limit(1).scalar() or 0
+        if newest > index.max_id:
+            index.add_many(db.query(Employee.id, Employee.name, Employee.email, Employee.department).filter(
+                tenant_filter, Employee.id > index.max_id
+            ).yield_per(5000))
+        return index
+
+    @staticmethod
+    def reset():
+        with EmployeeSearchService._lock:
+            EmployeeSearchService._memory_indexes.clear()
+            EmployeeSearchService._postgres_ready.clear()
+
+    @staticmethod
+    def index_employee(db: Session, employee: Employee):
+        backend = EmployeeSearchService.backend(db)
+        if backend == "sqlite_fts":
+            db.execute(text(f"DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = :id"), {"id": employee.id})
+            db.execute(
+                text(
+                    f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, name, email, department, tenant_id) "
+                    "VALUES (:id, :name, :email, :department, :tenant_id)"
+                ),
+                {
+                    "id": employee.id,
+                    "name": employee.name,
+                    "email": employee.email,
+                    "department": employee.department,
+                    "tenant_id": employee.tenant_id
+                }
+            )
+        elif backend == "memory":
+            key = (EmployeeSearchService._bind_key(db), employee.tenant_id)
+            index = EmployeeSearchService._memory_indexes.get(key)
+            if index is not None:
+                index.add(employee.id, employee.name, employee.email, employee.department)
+
+    @staticmethod
+    def _sqlite_prefix(db: Session, query: str, department: Optional[str], limit: int) -> List[int]:
+        # Two range scans over the lower(name)/lower(email) indexes, merged by matched key like
+        # the in-memory index; LIKE against the FTS table scanned it in full.
+        params = {"tenant_id": current_tenant(db), "department": department, "limit": limit, "low": query}
+        department_filter = " AND department = :department" if department is not None else ""
+        range_filter = ""
+        if query:
+            params["high"] = query[:-1] + chr(ord(query[-1]) + 1)
+            range_filter = " AND {key} < :high"
+        scans = [
+            f"SELECT * FROM (SELECT id, {key} AS key FROM employees WHERE tenant_id = :tenant_id "
+            f"AND {key} >= :low{range_filter.format(key=key)}{department_filter} ORDER BY {key} LIMIT :limit)"
+            for key in ("lower(name)", "lower(email)")
+        ]
+        rows = db.execute(text(" UNION ALL ".join(scans) + " ORDER BY key"), params)
+        results: List[int] = []
+        for employee_id, _ in rows:
+            if employee_id not in results:
+                results.append(employee_id)
+        return results[:limit]
+
+    @staticmethod
+    def _sqlite_query(db: Session, query: str, mode: str, department: Optional[str], limit: int) -> List[int]:
+        if mode == "prefix":
+            return EmployeeSearchService._sqlite_prefix(db, query, department, limit)
+        params = {"department": department, "limit": limit, "tenant_id": current_tenant(db)}
+        filter_clause = "AND tenant_id = :tenant_id"
+        if department is not None:
+            filter_clause += " AND department = :department"
+        if mode == "substring" and len(query) < 3:
+            params["pattern"] = "%" + escape_like(query) + "%"
+            where = "(name LIKE :pattern ESCAPE '\\' OR email LIKE :pattern ESCAPE '\\')"
+            order = "name"
+        elif mode == "substring":
+            params["match"] = '"' + query.replace('"', '""') + '"'
+            where = f"{SQLITE_FTS_TABLE} MATCH :match"
+            order = "name"
+        else:
+            grams = {query[i:i + 3] for i in range(len(query) - 2)}
+            if not grams:
+                return []
+            params["match"] = " OR ".join('"' + gram.replace('"', '""') + '"' for gram in grams)
+            where = f"{SQLITE_FTS_TABLE} MATCH :match"
+            order = "rank"
+        rows = db.execute(
+            text(f"SELECT rowid FROM {SQLITE_FTS_TABLE} WHERE {where} {filter_clause} ORDER BY {order} LIMIT :limit"),
+            params
+        )
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def _postgres_query(db: Session, query: str, mode: str, department: Optional[str], limit: int) -> List[int]:
+        params = {"department": department, "limit": limit, "query": query, "tenant_id": current_tenant(db)}
+        filter_clause = "AND tenant_id = :tenant_id"
+        if department is not None:
+            filter_clause += " AND department = :department"
+        if mode == "fuzzy":
+            where = "(:query <% lower(name) OR :query <% lower(email))"
+            order = "greatest(word_similarity(:query, lower(name)), word_similarity(:query, lower(email))) DESC"
+        else:
+            pattern = escape_like(query) + "%"
+            params["pattern"] = pattern if mode == "prefix" else "%" + pattern
+            where = "(lower(name) LIKE :pattern OR lower(email) LIKE :pattern)"
+            order = "name"
+        rows = db.execute(
+            text(f"SELECT id FROM employees WHERE {where} {filter_clause} ORDER BY {order} LIMIT :limit"),
+            params
+        )
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def search_ids(db: Session, query: str, mode: str = "auto", department: Optional[str] = None, limit: int = 20) -> List[int]:
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unsupported search mode '{mode}'")
+        query = query.lower().strip()
+        backend = EmployeeSearchService.backend(db)
+        if backend == "postgres" and not EmployeeSearchService._postgres_available(db):
+            backend = "memory"
+        if backend == "memory":
+            return EmployeeSearchService.memory_index(db).search(query, mode, department, limit)
+
+        run_query = EmployeeSearchService._sqlite_query if backend == "sqlite_fts" else EmployeeSearchService._postgres_query
+        results: List[int] = []
+        for current in (("prefix", "substring", "fuzzy") if mode == "auto" else (mode,)):
+            for employee_id in run_query(db, query, current, department, limit):
+                if employee_id not in results:
+                    results.append(employee_id)
+            if len(results) >= limit:
+                break
+        return results[:limit]
+
+    @staticmethod
+    def search(db: Session, query: str, mode: str = "auto", department: Optional[str] = None, limit: int = 20) -> List[Employee]:
+        ids = EmployeeSearchService.search_ids(db, query, mode, department, limit)
+        if not ids:
+            return []
+        employees = {e.id: e for e in db.query(Employee).filter(Employee.id.in_(ids)).all()}
+        return [employees[i] for i in ids if i in employees]
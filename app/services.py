@@ -1,11 +1,18 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from app.models import Employee, LeaveRequest, LeaveStatus
-from app.schemas import EmployeeCreate, LeaveRequestCreate, LeaveRequestUpdate
+import os
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import and_, or_, insert, literal, select, true
+from app.models import Employee, LeaveRequest, LeaveStatus, EmployeeHierarchy, ApprovalStep, Delegation
+from app.schemas import EmployeeCreate, LeaveRequestCreate, LeaveRequestUpdate, DelegationCreate
+from app.jobs import enqueue_job, LEAVE_STATUS_JOBS
+from app.search import EmployeeSearchService
+from app.tenancy import current_tenant
+from app.policies import PolicyService
+from app.hotset import hot_set
 from datetime import date, datetime, timedelta
-from dateutil.relativedelta import relativedelta
 from typing import Optional, List
 
+APPROVAL_CHAIN_LEVELS = int(os.getenv("APPROVAL_CHAIN_LEVELS", "1"))
+
 class EmployeeService:
     @staticmethod
     def create_employee(db: Session, employee_data: EmployeeCreate) -> Employee:
@@ -15,23 +22,42 @@ class EmployeeService:
         if employee_data.joining_date > date.today():
             raise ValueError("Joining date cannot be in the future")
         
-        employee = Employee(**employee_data.model_dump())
+        if employee_data.manager_id is not None and not EmployeeService.get_employee_by_id(db, employee_data.manager_id):
+            raise ValueError("Manager not found")
+        
+        employee = Employee(tenant_id=current_tenant(db), **employee_data.model_dump())
         db.add(employee)
+        db.flush()
+        HierarchyService.add_employee(db, employee)
+        EmployeeSearchService.index_employee(db, employee)
         db.commit()
         db.refresh(employee)
         return employee
     
     @staticmethod
     def get_employee_by_email(db: Session, email: str) -> Optional[Employee]:
-        return db.query(Employee).filter(Employee.email == email).first()
+        return db.query(Employee).filter(
+            and_(Employee.tenant_id == current_tenant(db), Employee.email == email)
+        ).first()
     
     @staticmethod
     def get_employee_by_id(db: Session, employee_id: int) -> Optional[Employee]:
-        return db.query(Employee).filter(Employee.id == employee_id).first()
+        return db.query(Employee).filter(
+            and_(Employee.tenant_id == current_tenant(db), Employee.id == employee_id)
+        ).first()
     
     @staticmethod
     def get_all_employees(db: Session, skip: int = 0, limit: int = 100) -> List[Employee]:
-        return db.query(Employee).offset(skip).limit(limit).all()
+        return db.query(Employee).filter(Employee.tenant_id == current_tenant(db)).offset(skip).limit(limit).all()
+    
+    @staticmethod
+    def search_employees(db: Session, query: Optional[str] = None, department: Optional[str] = None, mode: str = "auto", limit: int = 20) -> List[Employee]:
+        if not query:
+            employees = db.query(Employee).filter(Employee.tenant_id == current_tenant(db))
+            if department is not None:
+                employees = employees.filter(Employee.department == department)
+            return employees.order_by(Employee.name).limit(limit).all()
+        return EmployeeSearchService.search(db, query, mode=mode, department=department, limit=limit)
 
 class LeaveService:
     @staticmethod
@@ -59,22 +85,28 @@ class LeaveService:
             employee.joining_date, employee.annual_leave_entitlement
         )
         
-        approved_requests = db.query(LeaveRequest).filter(
-            and_(
-                LeaveRequest.employee_id == employee_id,
-                LeaveRequest.status == LeaveStatus.APPROVED
-            )
-        ).all()
-        
-        pending_requests = db.query(LeaveRequest).filter(
-            and_(
-                LeaveRequest.employee_id == employee_id,
-                LeaveRequest.status == LeaveStatus.PENDING
-            )
-        ).all()
-        
-        used_days = sum(req.days_requested for req in approved_requests)
-        pending_days = sum(req.days_requested for req in pending_requests)
+        record = hot_set.get(db, employee_id)
+        if record is not None:
+            used_days, pending_days = record.used_days, record.pending_days
+        else:
+            approved_requests = db.query(LeaveRequest).filter(
+                and_(
+                    LeaveRequest.tenant_id == current_tenant(db),
+                    LeaveRequest.employee_id == employee_id,
+                    LeaveRequest.status == LeaveStatus.APPROVED
+                )
+            ).all()
+            
+            pending_requests = db.query(LeaveRequest).filter(
+                and_(
+                    LeaveRequest.tenant_id == current_tenant(db),
+                    LeaveRequest.employee_id == employee_id,
+                    LeaveRequest.status == LeaveStatus.PENDING
+                )
+            ).all()
+            
+            used_days = sum(req.days_requested for req in approved_requests)
+            pending_days = sum(req.days_requested for req in pending_requests)
         available_days = max(annual_entitlement - used_days, 0)
         
         return {
@@ -87,8 +119,14 @@ class LeaveService:
     
     @staticmethod
     def check_overlapping_requests(db: Session, employee_id: int, start_date: date, end_date: date, exclude_id: Optional[int] = None) -> bool:
+        record = hot_set.get(db, employee_id)
+        overlaps = record.overlaps(start_date, end_date, exclude_id or None) if record is not None else None
+        if overlaps is not None:
+            return overlaps
+        
         query = db.query(LeaveRequest).filter(
             and_(
+                LeaveRequest.tenant_id == current_tenant(db),
                 LeaveRequest.employee_id == employee_id,
                 LeaveRequest.status.in_([LeaveStatus.PENDING, LeaveStatus.APPROVED]),
                 or_(
@@ -105,7 +143,7 @@ class LeaveService:
         return query.first() is not None
     
     @staticmethod
-    def apply_leave(db: Session, leave_data: LeaveRequestCreate) -> LeaveRequest:
+    def apply_leave(db: Session, leave_data: LeaveRequestCreate, commit: bool = True) -> LeaveRequest:
         employee = EmployeeService.get_employee_by_id(db, leave_data.employee_id)
         if not employee:
             raise ValueError("Employee not found")
@@ -128,7 +166,10 @@ class LeaveService:
         if days_requested > leave_balance["available_days"]:
             raise ValueError(f"Insufficient leave balance. Available: {leave_balance['available_days']}, Requested: {days_requested}")
         
+        PolicyService.check_leave(db, employee, leave_data.start_date, leave_data.end_date, days_requested)
+        
         leave_request = LeaveRequest(
+            tenant_id=current_tenant(db),
             employee_id=leave_data.employee_id,
             start_date=leave_data.start_date,
             end_date=leave_data.end_date,
@@ -137,27 +178,297 @@ class LeaveService:
         )
         
         db.add(leave_request)
-        db.commit()
-        db.refresh(leave_request)
+        db.flush()
+        ApprovalService.start_chain(db, leave_request)
+        
+        if leave_data.delegate_id is not None:
+            ApprovalService.create_delegation(db, DelegationCreate(
+                delegator_id=leave_data.employee_id,
+                delegate_id=leave_data.delegate_id,
+                start_date=leave_data.start_date,
+                end_date=leave_data.end_date
+            ), commit=False)
+        
+        db.flush()
+        hot_set.leave_added(db, leave_request)
+        if commit:
+            db.commit()
+            db.refresh(leave_request)
         return leave_request
     
     @staticmethod
-    def update_leave_status(db: Session, leave_id: int, update_data: LeaveRequestUpdate) -> LeaveRequest:
-        leave_request = db.query(LeaveRequest).filter(LeaveRequest.id == leave_id).first()
+    def update_leave_status(db: Session, leave_id: int, update_data: LeaveRequestUpdate, commit: bool = True) -> LeaveRequest:
+        leave_request = db.query(LeaveRequest).filter(
+            and_(LeaveRequest.tenant_id == current_tenant(db), LeaveRequest.id == leave_id)
+        ).first()
         if not leave_request:
             raise ValueError("Leave request not found")
         
         if leave_request.status != LeaveStatus.PENDING:
             raise ValueError("Can only update pending leave requests")
         
+        step = ApprovalService.current_step(db, leave_request.id)
+        if step is not None and not ApprovalService.record_decision(db, leave_request, step, update_data):
+            if commit:
+                db.commit()
+                db.refresh(leave_request)
+            else:
+                db.flush()
+            return leave_request
+        
         leave_request.status = update_data.status
         leave_request.processed_by = update_data.processed_by
         leave_request.processed_date = datetime.utcnow()
         
-        db.commit()
-        db.refresh(leave_request)
+        for job_type in LEAVE_STATUS_JOBS:
+            enqueue_job(
+                db,
+                job_type,
+                {
+                    "tenant_id": leave_request.tenant_id,
+                    "leave_id": leave_request.id,
+                    "employee_id": leave_request.employee_id,
+                    "status": leave_request.status.value,
+                    "start_date": leave_request.start_date,
+                    "end_date": leave_request.end_date,
+                    "processed_by": leave_request.processed_by
+                },
+                idempotency_key=f"{job_type}:{leave_request.tenant_id}:{leave_request.id}:{leave_request.status.value}"
+            )
+        
+        db.flush()
+        hot_set.status_changed(db, leave_request, LeaveStatus.PENDING)
+        if commit:
+            db.commit()
+            db.refresh(leave_request)
         return leave_request
     
     @staticmethod
     def get_employee_leave_requests(db: Session, employee_id: int) -> List[LeaveRequest]:
-        return db.query(LeaveRequest).filter(LeaveRequest.employee_id == employee_id).all()
+        return db.query(LeaveRequest).filter(
+            and_(LeaveRequest.tenant_id == current_tenant(db), LeaveRequest.employee_id == employee_id)
+        ).all()
+
+class HierarchyService:
+    @staticmethod
+    def add_employee(db: Session, employee: Employee):
+        db.add(EmployeeHierarchy(
+            tenant_id=employee.tenant_id,
+            ancestor_id=employee.id,
+            descendant_id=employee.id,
+            depth=0
+        ))
+        if employee.manager_id is not None:
+            db.execute(insert(EmployeeHierarchy).from_select(
+                ["tenant_id", "ancestor_id", "descendant_id", "depth"],
+                select(
+                    EmployeeHierarchy.tenant_id,
+                    EmployeeHierarchy.ancestor_id,
+                    literal(employee.id),
+                    EmployeeHierarchy.depth + 1
+                ).where(EmployeeHierarchy.descendant_id == employee.manager_id)
+            ))
+    
+    @staticmethod
+    def set_manager(db: Session, employee_id: int, manager_id: Optional[int]) -> Employee:
+        employee = EmployeeService.get_employee_by_id(db, employee_id)
+        if not employee:
+            raise ValueError("Employee not found")
+        
+        if manager_id is not None:
+            if not EmployeeService.get_employee_by_id(db, manager_id):
+                raise ValueError("Manager not found")
+            if db.query(EmployeeHierarchy).filter(
+                and_(EmployeeHierarchy.ancestor_id == employee_id, EmployeeHierarchy.descendant_id == manager_id)
+            ).first():
+                raise ValueError("An employee cannot report to someone in their own reporting line")
+        
+        subtree = select(EmployeeHierarchy.descendant_id).where(EmployeeHierarchy.ancestor_id == employee_id)
+        db.query(EmployeeHierarchy).filter(
+            and_(EmployeeHierarchy.descendant_id.in_(subtree), EmployeeHierarchy.ancestor_id.not_in(subtree))
+        ).delete(synchronize_session=False)
+        
+        if manager_id is not None:
+            supertree = aliased(EmployeeHierarchy)
+            subtree_links = aliased(EmployeeHierarchy)
+            db.execute(insert(EmployeeHierarchy).from_select(
+                ["tenant_id", "ancestor_id", "descendant_id", "depth"],
+                select(
+                    supertree.tenant_id,
+                    supertree.ancestor_id,
+                    subtree_links.descendant_id,
+                    supertree.depth + subtree_links.depth + 1
+                ).select_from(supertree).join(subtree_links, true()).where(and_(supertree.descendant_id == manager_id, subtree_links.ancestor_id == employee_id))
+            ))
+        
+        HierarchyService.reassign_open_steps(db, employee.tenant_id, subtree)
+        employee.manager_id = manager_id
+        db.commit()
+        db.refresh(employee)
+        return employee
+    
+    @staticmethod
+    def reassign_open_steps(db: Session, tenant_id: str, subtree):
+        # Open steps go to whoever now sits at their level of the reporting line. Where the new
+        # line is shorter the step is dropped and the chain shortened, as start_chain would size it.
+        open_steps = db.query(ApprovalStep, LeaveRequest).join(
+            LeaveRequest, LeaveRequest.id == ApprovalStep.leave_request_id
+        ).filter(
+            and_(
+                ApprovalStep.tenant_id == tenant_id,
+                ApprovalStep.status == LeaveStatus.PENDING,
+                LeaveRequest.employee_id.in_(subtree)
+            )
+        ).all()
+        if not open_steps:
+            return
+        
+        approvers = {
+            (row.descendant_id, row.depth): row.ancestor_id
+            for row in db.query(EmployeeHierarchy).filter(
+                and_(
+                    EmployeeHierarchy.descendant_id.in_({leave.employee_id for _, leave in open_steps}),
+                    EmployeeHierarchy.depth > 0
+                )
+            )
+        }
+        for step, leave in open_steps:
+            approver_id = approvers.get((leave.employee_id, step.step))
+            if approver_id is None:
+                leave.approval_steps = step.step - 1
+                db.delete(step)
+            else:
+                step.approver_id = approver_id
+    
+    @staticmethod
+    def get_reports(db: Session, manager_id: int, include_indirect: bool = False) -> List[Employee]:
+        depth_filter = EmployeeHierarchy.depth > 0 if include_indirect else EmployeeHierarchy.depth == 1
+        return db.query(Employee).join(
+            EmployeeHierarchy, EmployeeHierarchy.descendant_id == Employee.id
+        ).filter(
+            and_(
+                EmployeeHierarchy.tenant_id == current_tenant(db),
+                EmployeeHierarchy.ancestor_id == manager_id,
+                depth_filter
+            )
+        ).order_by(EmployeeHierarchy.depth, Employee.name).all()
+
+class ApprovalService:
+    @staticmethod
+    def start_chain(db: Session, leave_request: LeaveRequest):
+        approvers = db.query(EmployeeHierarchy.ancestor_id).filter(
+            and_(
+                EmployeeHierarchy.descendant_id == leave_request.employee_id,
+                EmployeeHierarchy.depth.between(1, APPROVAL_CHAIN_LEVELS)
+            )
+        ).order_by(EmployeeHierarchy.depth).all()
+        
+        leave_request.approval_steps = len(approvers)
+        if approvers:
+            db.add(ApprovalStep(
+                tenant_id=leave_request.tenant_id,
+                leave_request_id=leave_request.id,
+                step=1,
+                approver_id=approvers[0].ancestor_id
+            ))
+    
+    @staticmethod
+    def current_step(db: Session, leave_id: int) -> Optional[ApprovalStep]:
+        return db.query(ApprovalStep).filter(
+            and_(ApprovalStep.leave_request_id == leave_id, ApprovalStep.status == LeaveStatus.PENDING)
+        ).order_by(ApprovalStep.step).first()
+    
+    @staticmethod
+    def delegators_for(db: Session, delegate_id: int, on_date: Optional[date] = None) -> List[int]:
+        on_date = on_date or date.today()
+        return [row.delegator_id for row in db.query(Delegation.delegator_id).filter(
+            and_(
+                Delegation.tenant_id == current_tenant(db),
+                Delegation.delegate_id == delegate_id,
+                Delegation.start_date <= on_date,
+                Delegation.end_date >= on_date
+            )
+        ).all()]
+    
+    @staticmethod
+    def can_act(db: Session, leave_request: LeaveRequest, approver_id: int, actor_id: int) -> bool:
+        # Nobody decides their own leave, even when holding a delegation from their approver.
+        if actor_id == leave_request.employee_id:
+            return False
+        return actor_id == approver_id or approver_id in ApprovalService.delegators_for(db, actor_id)
+    
+    @staticmethod
+    def record_decision(db: Session, leave_request: LeaveRequest, step: ApprovalStep, update_data: LeaveRequestUpdate) -> bool:
+        if update_data.approver_id is None:
+            raise ValueError("approver_id is required for leave requests with an approval chain")
+        if not ApprovalService.can_act(db, leave_request, step.approver_id, update_data.approver_id):
+            raise ValueError("Approver is not authorized to act on this leave request")
+        
+        step.status = update_data.status
+        step.acted_by = update_data.approver_id
+        step.acted_at = datetime.utcnow()
+        
+        if update_data.status == LeaveStatus.REJECTED or step.step >= leave_request.approval_steps:
+            return True
+        
+        next_approver = db.query(EmployeeHierarchy.ancestor_id).filter(
+            and_(
+                EmployeeHierarchy.descendant_id == leave_request.employee_id,
+                EmployeeHierarchy.depth == step.step + 1
+            )
+        ).scalar()
+        if next_approver is None:
+            return True
+        
+        db.add(ApprovalStep(
+            tenant_id=leave_request.tenant_id,
+            leave_request_id=leave_request.id,
+            step=step.step + 1,
+            approver_id=next_approver
+        ))
+        return False
+    
+    @staticmethod
+    def get_pending_approvals(db: Session, manager_id: int, include_indirect: bool = False) -> List[LeaveRequest]:
+        tenant_id = current_tenant(db)
+        approvers = [manager_id] + ApprovalService.delegators_for(db, manager_id)
+        actionable = db.query(LeaveRequest).join(
+            ApprovalStep, ApprovalStep.leave_request_id == LeaveRequest.id
+        ).filter(
+            and_(
+                ApprovalStep.tenant_id == tenant_id,
+                ApprovalStep.status == LeaveStatus.PENDING,
+                ApprovalStep.approver_id.in_(approvers)
+            )
+        )
+        if not include_indirect:
+            return actionable.order_by(LeaveRequest.applied_date).all()
+        
+        # One indexed closure-table join covers every transitive report, however deep.
+        tree = db.query(LeaveRequest).join(
+            EmployeeHierarchy, EmployeeHierarchy.descendant_id == LeaveRequest.employee_id
+        ).filter(
+            and_(
+                EmployeeHierarchy.tenant_id == tenant_id,
+                EmployeeHierarchy.ancestor_id == manager_id,
+                EmployeeHierarchy.depth > 0,
+                LeaveRequest.tenant_id == tenant_id,
+                LeaveRequest.status == LeaveStatus.PENDING
+            )
+        )
+        return actionable.union(tree).order_by(LeaveRequest.applied_date).all()
+    
+    @staticmethod
+    def create_delegation(db: Session, delegation_data: DelegationCreate, commit: bool = True) -> Delegation:
+        if delegation_data.delegator_id == delegation_data.delegate_id:
+            raise ValueError("An employee cannot delegate to themselves")
+        for employee_id in (delegation_data.delegator_id, delegation_data.delegate_id):
+            if not EmployeeService.get_employee_by_id(db, employee_id):
+                raise ValueError("Employee not found")
+        
+        delegation = Delegation(tenant_id=current_tenant(db), **delegation_data.model_dump())
+        db.add(delegation)
+        if commit:
+            db.commit()
+            db.refresh(delegation)
+        return delegation
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, Optional
+from fastapi import Header, HTTPException, status
+from sqlalchemy.orm import Session, sessionmaker
+from app.models import DEFAULT_TENANT
+
+logger = logging.getLogger(__name__)
+
+MULTI_TENANT = os.getenv("MULTI_TENANT", "false").lower() == "true"
+TENANT_SHARD_URLS = [url.strip() for url in os.getenv("TENANT_SHARD_URLS", "").split(",") if url.strip()]
+TENANT_SHARD_MAP = os.getenv("TENANT_SHARD_MAP", "")
+SHARD_IDLE_SECONDS = float(os.getenv("SHARD_IDLE_SECONDS", "300"))
+SHARD_POOL_SIZE = int(os.getenv("SHARD_POOL_SIZE", "5"))
+
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+def parse_shard_map(value: str) -> Dict[str, int]:
+    overrides = {}
+    for entry in value.split(","):
+        if "=" in entry:
+            tenant_id, shard = entry.split("=", 1)
+            overrides[tenant_id.strip()] = int(shard)
+    return overrides
+
+def get_tenant_id(x_tenant_id: Optional[str] = Header(None)) -> str:
+    if not MULTI_TENANT:
+        return DEFAULT_TENANT
+    if not x_tenant_id or not TENANT_ID_PATTERN.match(x_tenant_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="A valid X-Tenant-ID header is required")
+    return x_tenant_id
+
+def current_tenant(db: Session) -> str:
+    return db.info.get("tenant_id", DEFAULT_TENANT)
+
+class Shard:
+    def __init__(self, index: int, url: str):
+        self.index = index
+        self.url = url
+        self.engine = None
+        self.sessionmaker = None
+        self.background_sessionmaker = None
+        self.last_used = 0.0
+
+class ShardMap:
+    def __init__(self, urls: List[str], engine_factory: Callable, overrides: Optional[Dict[str, int]] = None, idle_seconds: float = SHARD_IDLE_SECONDS, on_engine_created: Optional[Callable] = None, background_engine_factory: Optional[Callable] = None):
+        self.shards = [Shard(index, url) for index, url in enumerate(urls)]
+        self.engine_factory = engine_factory
+        self.background_engine_factory = background_engine_factory or engine_factory
+        self.overrides = overrides or {}
+        self.idle_seconds = idle_seconds
+        self.on_engine_created = on_engine_created
+        self._lock = threading.Lock()
+
+    def shard_for(self, tenant_id: str) -> Shard:
+        if not self.shards:
+            raise RuntimeError("No tenant shards configured")
+        index = self.overrides.get(tenant_id)
+        if index is None:
+            index = zlib.crc32(tenant_id.encode()) % len(self.shards)
+        return self.shards[index]
+
+    def _open(self, shard: Shard):
+        # Pools are created on first use so idle shards cost no connections.
+        with self._lock:
+            if shard.engine is None:
+                engine = self.engine_factory(shard.url)
+                if self.on_engine_created:
+                    self.on_engine_created(engine)
+                shard.engine = engine
+                shard.sessionmaker = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            shard.last_used = time.monotonic()
+        return shard.sessionmaker
+
+    def session_for_shard(self, shard: Shard) -> Session:
+        return self._open(shard)()
+
+    def background_session(self, shard: Shard) -> Session:
+        # Job polling and purges use a separate unpooled engine and never touch last_used,
+        # so they hold no idle connections and do not keep an unused shard's pool alive.
+        with self._lock:
+            if shard.background_sessionmaker is None:
+                engine = self.background_engine_factory(shard.url)
+                if self.on_engine_created:
+                    self.on_engine_created(engine)
+                shard.background_sessionmaker = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        return shard.background_sessionmaker()
+
+    def session(self, tenant_id: str) -> Session:
+        db = self.session_for_shard(self.shard_for(tenant_id))
+        db.info["tenant_id"] = tenant_id
+        return db
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        now = now if now is not None else time.monotonic()
+        evicted = 0
+        with self._lock:
+            for shard in self.shards:
+                if shard.engine is not None and now - shard.last_used >= self.idle_seconds:
+                    shard.engine.dispose()
+                    shard.engine = None
+                    shard.sessionmaker = None
+                    evicted += 1
+        if evicted:
+            logger.info("Evicted %s idle shard connection pools", evicted)
+        return evicted
+
+    def stats(self) -> List[dict]:
+        return [
+            {"shard": shard.index, "open": shard.engine is not None, "last_used": shard.last_used}
+            for shard in self.shards
+        ]
+
+async def run_eviction_loop(shards: ShardMap, interval: float = 60):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(shards.evict_idle)
+        except Exception:
+            logger.exception("Failed to evict idle shard pools")
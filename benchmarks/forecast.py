@@ -0,0 +1,88 @@
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from app.models import Base, Employee, LeaveRequest, LeaveStatus, DEFAULT_TENANT
+from app.forecasting import ForecastService, forecast_cache
+
+EMPLOYEES = 100_000
+DEPARTMENTS = 40
+LEAVES_PER_EMPLOYEE_YEAR = 4
+HISTORY_DAYS = 730
+FUTURE_DAYS = 183
+RUNS = 5
+
+def populate(db):
+    db.execute(insert(Employee), [
+        {
+            "id": employee_id,
+            "tenant_id": DEFAULT_TENANT,
+            "name": f"Employee {employee_id}",
+            "email": f"employee{employee_id}@company.com",
+            "department": f"Department {employee_id % DEPARTMENTS}",
+            "joining_date": date(2020, 1, 1),
+            "annual_leave_entitlement": 25.0,
+        }
+        for employee_id in range(1, EMPLOYEES + 1)
+    ])
+
+    today = date.today()
+    rows = []
+    leaves = int(EMPLOYEES * LEAVES_PER_EMPLOYEE_YEAR * (HISTORY_DAYS + FUTURE_DAYS) / 365)
+    for _ in range(leaves):
+        start = today + timedelta(days=random.randint(-HISTORY_DAYS, FUTURE_DAYS))
+        days = random.randint(1, 10)
+        rows.append({
+            "tenant_id": DEFAULT_TENANT,
+            "employee_id": random.randint(1, EMPLOYEES),
+            "start_date": start,
+            "end_date": start + timedelta(days=days - 1),
+            "days_requested": days,
+            "status": LeaveStatus.APPROVED if start < today or random.random() < 0.7 else LeaveStatus.PENDING,
+            "applied_date": datetime.utcnow(),
+            "approval_steps": 0,
+        })
+    db.execute(insert(LeaveRequest), rows)
+    db.commit()
+    return len(rows)
+
+if __name__ == "__main__":
+    random.seed(7)
+    path = os.path.join(tempfile.mkdtemp(), "forecast.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    start = time.perf_counter()
+    leaves = populate(db)
+    print(f"Loaded {EMPLOYEES} employees and {leaves} leave requests in {time.perf_counter() - start:.1f}s")
+
+    # The seasonal profile is built by the background job; the route only reads it.
+    start = time.perf_counter()
+    ForecastService.store_seasonal_profile(db, DEFAULT_TENANT, date.today())
+    print(f"Built seasonal profile in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def timed(label, func):
+        timings = []
+        for _ in range(RUNS):
+            if label == "cold":
+                forecast_cache.clear()
+            start = time.perf_counter()
+            report = func()
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"{label:>12}: {len(report['departments'])} departments, median {statistics.median(timings):8.2f} ms over {RUNS} runs")
+
+    def after_write():
+        # A new booking invalidates the report but not the persisted seasonal profile.
+        start = date.today() + timedelta(days=random.randint(1, FUTURE_DAYS))
+        db.add(LeaveRequest(employee_id=random.randint(1, EMPLOYEES), start_date=start, end_date=start, days_requested=1))
+        db.commit()
+        return ForecastService.get_forecast(db, months=6)
+
+    timed("cold", lambda: ForecastService.get_forecast(db, months=6))
+    timed("after write", after_write)
+    timed("cached", lambda: ForecastService.get_forecast(db, months=6))
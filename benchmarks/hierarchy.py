@@ -0,0 +1,109 @@
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from app.models import Base, Employee, EmployeeHierarchy, LeaveRequest, LeaveStatus, DEFAULT_TENANT
+from app.services import ApprovalService
+
+EMPLOYEES = 50_000
+LEVELS = 8
+PENDING_SHARE = 0.1
+RUNS = 20
+
+def build_org():
+    sizes = [1]
+    growth = (EMPLOYEES / 1) ** (1 / (LEVELS - 1))
+    for level in range(1, LEVELS):
+        sizes.append(max(1, round(growth ** level)))
+    sizes[-1] += EMPLOYEES - sum(sizes)
+
+    parents = {}
+    levels = []
+    next_id = 1
+    for level, size in enumerate(sizes):
+        ids = list(range(next_id, next_id + size))
+        next_id += size
+        for employee_id in ids:
+            parents[employee_id] = random.choice(levels[-1]) if levels else None
+        levels.append(ids)
+    return parents, levels
+
+def populate(db, parents):
+    db.execute(insert(Employee), [
+        {
+            "id": employee_id,
+            "tenant_id": DEFAULT_TENANT,
+            "name": f"Employee {employee_id}",
+            "email": f"employee{employee_id}@company.com",
+            "department": "Engineering",
+            "manager_id": manager_id,
+            "joining_date": date(2024, 1, 1),
+            "annual_leave_entitlement": 25.0,
+        }
+        for employee_id, manager_id in parents.items()
+    ])
+
+    closure = []
+    for employee_id in parents:
+        ancestor, depth = employee_id, 0
+        while ancestor is not None:
+            closure.append({"tenant_id": DEFAULT_TENANT, "ancestor_id": ancestor, "descendant_id": employee_id, "depth": depth})
+            ancestor, depth = parents[ancestor], depth + 1
+    db.execute(insert(EmployeeHierarchy), closure)
+
+    start = date.today() + timedelta(days=7)
+    db.execute(insert(LeaveRequest), [
+        {
+            "tenant_id": DEFAULT_TENANT,
+            "employee_id": employee_id,
+            "start_date": start,
+            "end_date": start + timedelta(days=2),
+            "days_requested": 3,
+            "status": LeaveStatus.PENDING,
+            "applied_date": datetime.utcnow(),
+            "approval_steps": 0,
+        }
+        for employee_id in random.sample(list(parents), int(EMPLOYEES * PENDING_SHARE))
+    ])
+    db.commit()
+    return len(closure)
+
+def per_level_lookup(db, manager_id):
+    reports, frontier = [], [manager_id]
+    while frontier:
+        frontier = [row.id for row in db.query(Employee.id).filter(Employee.manager_id.in_(frontier)).all()]
+        reports.extend(frontier)
+    return db.query(LeaveRequest).filter(
+        LeaveRequest.employee_id.in_(reports),
+        LeaveRequest.status == LeaveStatus.PENDING
+    ).all()
+
+def timed(func, *args):
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), len(result)
+
+if __name__ == "__main__":
+    random.seed(7)
+    path = os.path.join(tempfile.mkdtemp(), "hierarchy.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    parents, levels = build_org()
+    start = time.perf_counter()
+    closure_rows = populate(db, parents)
+    print(f"Loaded {len(parents)} employees over {LEVELS} levels ({closure_rows} closure rows) in {time.perf_counter() - start:.1f}s")
+
+    for label, manager_id in (("top", levels[0][0]), ("level 2", levels[2][0]), ("level 5", levels[5][0])):
+        closure_ms, closure_count = timed(lambda m: ApprovalService.get_pending_approvals(db, m, include_indirect=True), manager_id)
+        recursive_ms, recursive_count = timed(per_level_lookup, db, manager_id)
+        assert closure_count == recursive_count
+        print(f"{label:>8}: {closure_count:5d} pending  closure {closure_ms:7.2f} ms  per-level {recursive_ms:7.2f} ms")
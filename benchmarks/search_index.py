@@ -0,0 +1,90 @@
+import os
+import random
+import string
+import tempfile
+import time
+from datetime import date
+from unittest.mock import patch
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+from app.models import Base, Employee, DEFAULT_TENANT
+from app.search import TrigramIndex, EmployeeSearchService, SQLITE_FTS_TABLE
+
+EMPLOYEES = 100_000
+QUERIES = 200
+DEPARTMENTS = ["Engineering", "Marketing", "Sales", "HR", "Finance", "Operations"]
+
+def random_word(length):
+    return "".join(random.choices(string.ascii_lowercase, k=length))
+
+def make_rows():
+    rows = []
+    for employee_id in range(1, EMPLOYEES + 1):
+        first, last = random_word(random.randint(3, 9)), random_word(random.randint(4, 10))
+        rows.append((employee_id, f"{first} {last}", f"{first}.{last}{employee_id}@company.com", random.choice(DEPARTMENTS)))
+    return rows
+
+def build_index(rows):
+    index = TrigramIndex()
+    index.add_many(rows)
+    return index
+
+def build_sqlite(rows):
+    path = os.path.join(tempfile.mkdtemp(), "search.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Employee), [
+            {
+                "id": employee_id,
+                "tenant_id": DEFAULT_TENANT,
+                "name": name,
+                "email": email,
+                "department": department,
+                "joining_date": date(2024, 1, 1)
+            }
+            for employee_id, name, email, department in rows
+        ])
+        conn.execute(text(
+            f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, name, email, department, tenant_id) "
+            "SELECT id, name, email, department, tenant_id FROM employees"
+        ))
+    db = sessionmaker(bind=engine)()
+    db.info["tenant_id"] = DEFAULT_TENANT
+    return db
+
+def time_queries(search, mode, queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query, mode)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.95)]
+
+if __name__ == "__main__":
+    random.seed(42)
+    rows = make_rows()
+    start = time.perf_counter()
+    index = build_index(rows)
+    print(f"Indexed {len(index)} employees in {time.perf_counter() - start:.2f}s")
+    db = build_sqlite(rows)
+
+    names = [rows[random.randint(0, EMPLOYEES - 1)][1] for _ in range(QUERIES)]
+    workloads = {
+        "prefix": [name[:random.randint(1, 4)] for name in names],
+        "substring": [name[1:5] for name in names],
+        "fuzzy": [name[:3] + random.choice(string.ascii_lowercase) + name[4:8] for name in names],
+        "auto": [name[:random.randint(2, 6)] for name in names],
+    }
+    backends = {
+        "memory": lambda query, mode: index.search(query, mode=mode, limit=20),
+        # The full service call, including loading the matched employees.
+        "sqlite_fts": lambda query, mode: EmployeeSearchService.search(db, query, mode=mode, limit=20),
+    }
+    with patch("app.search.SEARCH_BACKEND", "sqlite_fts"):
+        for backend, search in backends.items():
+            for mode, queries in workloads.items():
+                search(queries[0], mode)
+                p50, p95 = time_queries(search, mode, queries)
+                print(f"{backend:>10} {mode:>9}: p50 {p50:.2f} ms  p95 {p95:.2f} ms")
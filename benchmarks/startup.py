@@ -0,0 +1,63 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+import app.main
+print((time.perf_counter() - start) * 1000)
+"""
+
+FIRST_REQUEST_SCRIPT = """
+import time
+start = time.perf_counter()
+from fastapi.testclient import TestClient
+import app.main
+with TestClient(app.main.app) as client:
+    assert client.get("/health").status_code == 200
+    print((time.perf_counter() - start) * 1000)
+"""
+
+def run(script: str, env: dict) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+def measure(script: str, env: dict, runs: int) -> float:
+    return statistics.median(run(script, env) for _ in range(runs))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure app import time and time to first request")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--database-url", default=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'startup.db')}")
+    parser.add_argument("--max-import-ms", type=float, help="Exit non-zero if median import time exceeds this")
+    parser.add_argument("--max-first-request-ms", type=float, help="Exit non-zero if median time to first request exceeds this")
+    args = parser.parse_args()
+
+    env = dict(os.environ, DATABASE_URL=args.database_url, JOB_WORKER_ENABLED="false", AUTO_MIGRATE="false")
+    subprocess.run([sys.executable, "-m", "app.migrations", "upgrade"], cwd=ROOT, env=env, capture_output=True, check=True)
+    results = {
+        "import_ms": measure(IMPORT_SCRIPT, env, args.runs),
+        "first_request_ms": measure(FIRST_REQUEST_SCRIPT, env, args.runs)
+    }
+
+    print(json.dumps({key: round(value, 1) for key, value in results.items()}, indent=2))
+
+    failed = (
+        (args.max_import_ms and results["import_ms"] > args.max_import_ms)
+        or (args.max_first_request_ms and results["first_request_ms"] > args.max_first_request_ms)
+    )
+    sys.exit(1 if failed else 0)
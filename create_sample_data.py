@@ -1,10 +1,11 @@
 from datetime import date, timedelta
-from app.database import SessionLocal, create_tables
+from app.database import SessionLocal, engine
+from app.migrations import upgrade
 from app.services import EmployeeService, LeaveService
 from app.schemas import EmployeeCreate, LeaveRequestCreate
 
 def create_sample_data():
-    create_tables()
+    upgrade(engine)
     
     db = SessionLocal()
     
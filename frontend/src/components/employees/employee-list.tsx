@@ -1,7 +1,9 @@
 'use client'
 
-import { useEmployees } from '@/hooks/use-employees'
+import { useEffect, useState } from 'react'
+import { useEmployees, useEmployeeSearch } from '@/hooks/use-employees'
 import { Card, CardContent } from '@/components/ui/card'
+import { Input } from '@/components/ui/input'
 import { Badge } from '@/components/ui/badge'
 import { Button } from '@/components/ui/button'
 import { 
@@ -17,12 +19,32 @@ import {
   Calendar, 
   Building, 
   Eye, 
+  Search,
   User 
 } from 'lucide-react'
 import Link from 'next/link'
 
+const SEARCH_DEBOUNCE_MS = 300
+
+function useDebouncedValue<T>(value: T, delay: number): T {
+  const [debounced, setDebounced] = useState(value)
+
+  useEffect(() => {
+    const timer = setTimeout(() => setDebounced(value), delay)
+    return () => clearTimeout(timer)
+  }, [value, delay])
+
+  return debounced
+}
+
 export function EmployeeList() {
-  const { data: employees = [], isLoading, error } = useEmployees()
+  const [query, setQuery] = useState('')
+  const debouncedQuery = useDebouncedValue(query.trim(), SEARCH_DEBOUNCE_MS)
+  const allEmployees = useEmployees()
+  // Typed queries are matched by the server's search index instead of filtering every employee here
+  const searchResults = useEmployeeSearch(debouncedQuery)
+  const { data: employees = [], error } = debouncedQuery ? searchResults : allEmployees
+  const isSearching = !!debouncedQuery && searchResults.isLoading
 
   const formatDate = (dateString: string) => {
     return new Date(dateString).toLocaleDateString('en-US', {
@@ -44,7 +66,7 @@ export function EmployeeList() {
     return colors[department] || 'bg-gray-100 text-gray-800'
   }
 
-  if (isLoading) {
+  if (allEmployees.isLoading) {
     return (
       <div className="space-y-4">
         {[...Array(5)].map((_, i) => (
@@ -68,7 +90,7 @@ export function EmployeeList() {
     )
   }
 
-  if (employees.length === 0) {
+  if (employees.length === 0 && !debouncedQuery) {
     return (
       <Card>
         <CardContent className="p-6">
@@ -92,74 +114,91 @@ export function EmployeeList() {
   return (
     <Card>
       <CardContent className="p-0">
-        <div className="overflow-x-auto">
-          <Table>
-            <TableHeader>
-              <TableRow>
-                <TableHead>Employee</TableHead>
-                <TableHead className="hidden md:table-cell">Department</TableHead>
-                <TableHead className="hidden lg:table-cell">Joining Date</TableHead>
-                <TableHead className="hidden lg:table-cell">Leave Balance</TableHead>
-                <TableHead className="text-right">Actions</TableHead>
-              </TableRow>
-            </TableHeader>
-            <TableBody>
-              {employees.map((employee) => (
-                <TableRow key={employee.id} className="hover:bg-gray-50">
-                  <TableCell>
-                    <div className="flex items-center space-x-3">
-                      <div className="w-10 h-10 bg-blue-500 rounded-full flex items-center justify-center text-white text-sm font-medium">
-                        {employee.name.charAt(0).toUpperCase()}
-                      </div>
-                      <div>
-                        <div className="font-medium text-gray-900">
-                          {employee.name}
-                        </div>
-                        <div className="flex items-center space-x-1 text-sm text-gray-500">
-                          <Mail className="h-3 w-3" />
-                          <span>{employee.email}</span>
+        <div className="p-4 border-b">
+          <div className="relative max-w-sm">
+            <Search className="absolute left-3 top-1/2 h-4 w-4 -translate-y-1/2 text-gray-400" />
+            <Input
+              value={query}
+              onChange={(event) => setQuery(event.target.value)}
+              placeholder="Search by name or email"
+              className="pl-9"
+            />
+          </div>
+        </div>
+        {employees.length === 0 ? (
+          <div className="text-center py-12 text-gray-500">
+            {isSearching ? 'Searching...' : <>No employees match &quot;{debouncedQuery}&quot;</>}
+          </div>
+        ) : (
+          <div className="overflow-x-auto">
+            <Table>
+              <TableHeader>
+                <TableRow>
+                  <TableHead>Employee</TableHead>
+                  <TableHead className="hidden md:table-cell">Department</TableHead>
+                  <TableHead className="hidden lg:table-cell">Joining Date</TableHead>
+                  <TableHead className="hidden lg:table-cell">Leave Balance</TableHead>
+                  <TableHead className="text-right">Actions</TableHead>
+                </TableRow>
+              </TableHeader>
+              <TableBody>
+                {employees.map((employee) => (
+                  <TableRow key={employee.id} className="hover:bg-gray-50">
+                    <TableCell>
+                      <div className="flex items-center space-x-3">
+                        <div className="w-10 h-10 bg-blue-500 rounded-full flex items-center justify-center text-white text-sm font-medium">
+                          {employee.name.charAt(0).toUpperCase()}
                         </div>
-                        <div className="md:hidden mt-1">
-                          <Badge className={getDepartmentColor(employee.department)}>
-                            {employee.department}
-                          </Badge>
+                        <div>
+                          <div className="font-medium text-gray-900">
+                            {employee.name}
+                          </div>
+                          <div className="flex items-center space-x-1 text-sm text-gray-500">
+                            <Mail className="h-3 w-3" />
+                            <span>{employee.email}</span>
+                          </div>
+                          <div className="md:hidden mt-1">
+                            <Badge className={getDepartmentColor(employee.department)}>
+                              {employee.department}
+                            </Badge>
+                          </div>
                         </div>
                       </div>
-                    </div>
-                  </TableCell>
+                    </TableCell>
                   
-                  <TableCell className="hidden md:table-cell">
-                    <Badge className={getDepartmentColor(employee.department)}>
-                      {employee.department}
-                    </Badge>
-                  </TableCell>
+                    <TableCell className="hidden md:table-cell">
+                      <Badge className={getDepartmentColor(employee.department)}>
+                        {employee.department}
+                      </Badge>
+                    </TableCell>
                   
-                  <TableCell className="hidden lg:table-cell">
-                    <div className="flex items-center space-x-1 text-sm text-gray-600">
-                      <Calendar className="h-4 w-4" />
-                      <span>{formatDate(employee.joining_date)}</span>
-                    </div>
-                  </TableCell>
+                    <TableCell className="hidden lg:table-cell">
+                      <div className="flex items-center space-x-1 text-sm text-gray-600">
+                        <Calendar className="h-4 w-4" />
+                        <span>{formatDate(employee.joining_date)}</span>
+                      </div>
+                    </TableCell>
                   
-                  <TableCell className="hidden lg:table-cell">
-                    <span className="text-sm font-medium text-green-600">
-                      {employee.annual_leave_entitlement} days
-                    </span>
-                  </TableCell>
+                    <TableCell className="hidden lg:table-cell">
+                      <span className="text-sm font-medium text-green-600">
+                        {employee.annual_leave_entitlement} days
+                      </span>
+                    </TableCell>
                   
-                  <TableCell className="text-right">
-                    <Button asChild variant="ghost" size="sm">
-                      <Link href={`/employees/${employee.id}`}>
-                        <Eye className="h-4 w-4 mr-1" />
-                        View
-                      </Link>
-                    </Button>
-                  </TableCell>
-                </TableRow>
-              ))}
-            </TableBody>
-          </Table>
-        </div>
+                    <TableCell className="text-right">
+                      <Button asChild variant="ghost" size="sm">
+                        <Link href={`/employees/${employee.id}`}>
+                          <Eye className="h-4 w-4 mr-1" />
+                          View
+                        </Link>
+                      </Button>
+                    </TableCell>
+                  </TableRow>
+                ))}
+              </TableBody>
+            </Table>
+          </div>
+        )}
       </CardContent>
     </Card>
   )
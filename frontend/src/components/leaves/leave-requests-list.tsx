@@ -35,11 +35,13 @@ export function LeaveRequestsList() {
     request: LeaveRequest | null
     action: 'approve' | 'reject'
     processedBy: string
+    approverId: string
   }>({
     isOpen: false,
     request: null,
     action: 'approve',
-    processedBy: ''
+    processedBy: '',
+    approverId: ''
   })
 
   const formatDate = (dateString: string) => {
@@ -80,23 +82,36 @@ export function LeaveRequestsList() {
       isOpen: true,
       request,
       action,
-      processedBy: ''
+      processedBy: '',
+      approverId: ''
     })
   }
 
+  // Requests routed through a manager chain must name the approving employee
+  const needsApprover = (request: LeaveRequest | null) => (request?.approval_steps ?? 0) > 0
+
+  const canConfirm = approvalDialog.processedBy.trim() !== '' &&
+    (!needsApprover(approvalDialog.request) || approvalDialog.approverId.trim() !== '')
+
   const handleConfirmAction = async () => {
-    if (!approvalDialog.request || !approvalDialog.processedBy.trim()) return
+    if (!approvalDialog.request || !canConfirm) return
+
+    const approverId = approvalDialog.approverId.trim()
+      ? Number(approvalDialog.approverId)
+      : undefined
 
     try {
       if (approvalDialog.action === 'approve') {
         await approveLeave.mutateAsync({
           leaveId: approvalDialog.request.id,
-          processedBy: approvalDialog.processedBy
+          processedBy: approvalDialog.processedBy,
+          approverId
         })
       } else {
         await rejectLeave.mutateAsync({
           leaveId: approvalDialog.request.id,
-          processedBy: approvalDialog.processedBy
+          processedBy: approvalDialog.processedBy,
+          approverId
         })
       }
       
@@ -104,7 +119,8 @@ export function LeaveRequestsList() {
         isOpen: false,
         request: null,
         action: 'approve',
-        processedBy: ''
+        processedBy: '',
+        approverId: ''
       })
     } catch (error) {
       console.error('Error processing leave request:', error)
@@ -116,7 +132,8 @@ export function LeaveRequestsList() {
       isOpen: false,
       request: null,
       action: 'approve',
-      processedBy: ''
+      processedBy: '',
+      approverId: ''
     })
   }
 
@@ -282,6 +299,19 @@ export function LeaveRequestsList() {
                   placeholder="Enter your name"
                 />
               </div>
+
+              {needsApprover(approvalDialog.request) && (
+                <div className="space-y-2 mt-4">
+                  <Label htmlFor="approver-id">Approver Employee ID</Label>
+                  <Input
+                    id="approver-id"
+                    type="number"
+                    value={approvalDialog.approverId}
+                    onChange={(e) => setApprovalDialog(prev => ({ ...prev, approverId: e.target.value }))}
+                    placeholder="Enter your employee ID"
+                  />
+                </div>
+              )}
             </div>
           )}
 
@@ -291,7 +321,7 @@ export function LeaveRequestsList() {
             </Button>
             <Button 
               onClick={handleConfirmAction}
-              disabled={!approvalDialog.processedBy.trim() || approveLeave.isPending || rejectLeave.isPending}
+              disabled={!canConfirm || approveLeave.isPending || rejectLeave.isPending}
               className={approvalDialog.action === 'approve' ? 'bg-green-600 hover:bg-green-700' : 'bg-red-600 hover:bg-red-700'}
             >
               {(approveLeave.isPending || rejectLeave.isPending) && (
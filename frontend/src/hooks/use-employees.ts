@@ -1,4 +1,4 @@
-import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
+import { useQuery, useMutation, useQueryClient, keepPreviousData } from '@tanstack/react-query'
 import { api } from '@/lib/api'
 import type { Employee, CreateEmployeeData } from '@/lib/types'
 
@@ -13,6 +13,22 @@ export function useEmployees() {
   })
 }
 
+// Server-side employee search (typeahead)
+export function useEmployeeSearch(query: string, department?: string) {
+  return useQuery({
+    queryKey: ['employee-search', query, department],
+    queryFn: async (): Promise<Employee[]> => {
+      const response = await api.get('/employees/search', {
+        params: { q: query || undefined, department: department || undefined },
+      })
+      return response.data
+    },
+    enabled: !!query || !!department,
+    // Keep the previous results on screen while the next keystroke's search loads
+    placeholderData: keepPreviousData,
+  })
+}
+
 // Fetch single employee
 export function useEmployee(id: number) {
   return useQuery({
@@ -72,13 +72,17 @@ export function useApproveLeave() {
   return useMutation({
     mutationFn: async ({ 
       leaveId, 
-      processedBy 
+      processedBy,
+      approverId
     }: { 
       leaveId: number
-      processedBy: string 
+      processedBy: string
+      approverId?: number
     }): Promise<LeaveRequest> => {
       const response = await api.put(
-        `/leave-requests/${leaveId}/approve?processed_by=${encodeURIComponent(processedBy)}`
+        `/leave-requests/${leaveId}/approve`,
+        null,
+        { params: { processed_by: processedBy, approver_id: approverId } }
       )
       return response.data
     },
@@ -102,13 +106,17 @@ export function useRejectLeave() {
   return useMutation({
     mutationFn: async ({ 
       leaveId, 
-      processedBy 
+      processedBy,
+      approverId
     }: { 
       leaveId: number
-      processedBy: string 
+      processedBy: string
+      approverId?: number
     }): Promise<LeaveRequest> => {
       const response = await api.put(
-        `/leave-requests/${leaveId}/reject?processed_by=${encodeURIComponent(processedBy)}`
+        `/leave-requests/${leaveId}/reject`,
+        null,
+        { params: { processed_by: processedBy, approver_id: approverId } }
       )
       return response.data
     },
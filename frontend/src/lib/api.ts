@@ -1,6 +1,7 @@
 import axios from 'axios'
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api/v1'
+const TENANT_ID = process.env.NEXT_PUBLIC_TENANT_ID
 
 console.log('🔧 API_BASE_URL:', API_BASE_URL) 
 
@@ -9,6 +10,7 @@ export const api = axios.create({
   timeout: 10000,
   headers: {
     'Content-Type': 'application/json',
+    ...(TENANT_ID ? { 'X-Tenant-ID': TENANT_ID } : {}),
   },
 })
 
@@ -27,6 +27,7 @@ export interface LeaveRequest {
   applied_date: string
   processed_date?: string
   processed_by?: string
+  approval_steps?: number
   employee_name?: string
   employee_email?: string
   employee_department?: string
@@ -50,6 +51,7 @@ export interface LeaveBalance {
 export interface UpdateLeaveRequestData {
   status: 'approved' | 'rejected'
   processed_by: string
+  approver_id?: number
 }
 
 // UI State Types
@@ -30,11 +30,7 @@ uv pip install -e .
 uv pip install -e ".[dev]"
 
 echo "🗄️  Setting up database..."
-python -c "
-from app.database import create_tables
-create_tables()
-print('✅ Database tables created successfully!')
-"
+python -m app.migrations upgrade
 
 echo "🧪 Running tests to verify setup..."
 pytest -v
@@ -1,12 +1,22 @@
+import os
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+
+# The app's own database is migrated on startup in tests; production runs the migration CLI.
+os.environ.setdefault("AUTO_MIGRATE", "true")
+# The rate limiter is off by default; tests run the app with its middleware installed.
+os.environ.setdefault("RATE_LIMIT_ENABLED", "true")
 from app.main import app
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models import Base
+from app.ratelimit import rate_limiter
+from app.idempotency import idempotency_store
+from app.policies import policy_cache
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+ADMIN_TOKEN = "test-admin-token"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -18,10 +28,15 @@ def override_get_db():
         db.close()
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 
 @pytest.fixture
-def client():
+def client(monkeypatch):
+    monkeypatch.setattr("app.auth.ADMIN_TOKEN", ADMIN_TOKEN)
     Base.metadata.create_all(bind=engine)
-    with TestClient(app) as c:
+    rate_limiter.reset()
+    idempotency_store.clear_cache()
+    policy_cache.clear()
+    with TestClient(app, headers={"X-Admin-Token": ADMIN_TOKEN}) as c:
         yield c
     Base.metadata.drop_all(bind=engine)
@@ -0,0 +1,213 @@
+import pytest
+from datetime import date, timedelta
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.models import Base, EmployeeHierarchy, LeaveStatus, OutboxJob
+from app.services import EmployeeService, LeaveService, HierarchyService, ApprovalService
+from app.schemas import EmployeeCreate, LeaveRequestCreate, LeaveRequestUpdate, DelegationCreate
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_approvals.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+def add_employee(db, name, manager=None):
+    return EmployeeService.create_employee(db, EmployeeCreate(
+        name=name,
+        email=f"{name.lower()}@company.com",
+        department="Engineering",
+        joining_date=date(2024, 1, 1),
+        manager_id=manager.id if manager else None
+    ))
+
+@pytest.fixture
+def org(db_session):
+    ceo = add_employee(db_session, "Ceo")
+    vp = add_employee(db_session, "Vp", ceo)
+    manager = add_employee(db_session, "Manager", vp)
+    peer = add_employee(db_session, "Peer", vp)
+    engineer = add_employee(db_session, "Engineer", manager)
+    return {"ceo": ceo, "vp": vp, "manager": manager, "peer": peer, "engineer": engineer}
+
+def apply(db, employee, **kwargs):
+    tomorrow = date.today() + timedelta(days=1)
+    return LeaveService.apply_leave(db, LeaveRequestCreate(
+        employee_id=employee.id,
+        start_date=tomorrow,
+        end_date=tomorrow + timedelta(days=1),
+        **kwargs
+    ))
+
+def decide(db, leave, approver, status="approved"):
+    return LeaveService.update_leave_status(db, leave.id, LeaveRequestUpdate(
+        status=status,
+        processed_by=approver.name,
+        approver_id=approver.id
+    ))
+
+def test_closure_table_tracks_transitive_reports(db_session, org):
+    depths = {
+        row.descendant_id: row.depth
+        for row in db_session.query(EmployeeHierarchy).filter(EmployeeHierarchy.ancestor_id == org["ceo"].id)
+    }
+    assert depths == {org["ceo"].id: 0, org["vp"].id: 1, org["manager"].id: 2, org["peer"].id: 2, org["engineer"].id: 3}
+
+    direct = HierarchyService.get_reports(db_session, org["vp"].id)
+    assert [e.name for e in direct] == ["Manager", "Peer"]
+    indirect = HierarchyService.get_reports(db_session, org["vp"].id, include_indirect=True)
+    assert [e.name for e in indirect] == ["Manager", "Peer", "Engineer"]
+
+def test_set_manager_moves_subtree(db_session, org):
+    HierarchyService.set_manager(db_session, org["manager"].id, org["peer"].id)
+    assert [e.name for e in HierarchyService.get_reports(db_session, org["peer"].id, include_indirect=True)] == ["Manager", "Engineer"]
+    assert [e.name for e in HierarchyService.get_reports(db_session, org["ceo"].id, include_indirect=True)] == ["Vp", "Peer", "Manager", "Engineer"]
+
+    with pytest.raises(ValueError, match="own reporting line"):
+        HierarchyService.set_manager(db_session, org["vp"].id, org["engineer"].id)
+
+def test_set_manager_reassigns_open_approval_steps(db_session, org):
+    with patch("app.services.APPROVAL_CHAIN_LEVELS", 2):
+        engineer_leave = apply(db_session, org["engineer"])
+        manager_leave = apply(db_session, org["manager"])
+    manager_leave = decide(db_session, manager_leave, org["vp"])
+    assert manager_leave.status == LeaveStatus.PENDING
+
+    HierarchyService.set_manager(db_session, org["manager"].id, org["peer"].id)
+    assert [l.id for l in ApprovalService.get_pending_approvals(db_session, org["manager"].id)] == [engineer_leave.id]
+    # The second step of the manager's leave moves from the CEO to their new skip-level, the VP.
+    assert [l.id for l in ApprovalService.get_pending_approvals(db_session, org["ceo"].id)] == []
+    assert [l.id for l in ApprovalService.get_pending_approvals(db_session, org["vp"].id)] == [manager_leave.id]
+    with pytest.raises(ValueError, match="not authorized"):
+        decide(db_session, manager_leave, org["ceo"])
+    assert decide(db_session, manager_leave, org["vp"]).status == LeaveStatus.APPROVED
+
+    # Without a manager the manager's own open step has nobody left to go to.
+    next_week = date.today() + timedelta(days=7)
+    with patch("app.services.APPROVAL_CHAIN_LEVELS", 2):
+        manager_leave = LeaveService.apply_leave(db_session, LeaveRequestCreate(
+            employee_id=org["manager"].id, start_date=next_week, end_date=next_week
+        ))
+    HierarchyService.set_manager(db_session, org["manager"].id, None)
+    db_session.refresh(manager_leave)
+    assert manager_leave.approval_steps == 0
+    assert ApprovalService.current_step(db_session, manager_leave.id) is None
+    assert decide(db_session, engineer_leave, org["manager"]).status == LeaveStatus.APPROVED
+
+def test_multi_step_approval_chain(db_session, org):
+    with patch("app.services.APPROVAL_CHAIN_LEVELS", 2):
+        leave = apply(db_session, org["engineer"])
+    assert leave.approval_steps == 2
+    assert [l.id for l in ApprovalService.get_pending_approvals(db_session, org["manager"].id)] == [leave.id]
+
+    with pytest.raises(ValueError, match="not authorized"):
+        decide(db_session, leave, org["vp"])
+    with pytest.raises(ValueError, match="approver_id is required"):
+        LeaveService.update_leave_status(db_session, leave.id, LeaveRequestUpdate(status="approved", processed_by="Someone"))
+
+    leave = decide(db_session, leave, org["manager"])
+    assert leave.status == LeaveStatus.PENDING
+    assert db_session.query(OutboxJob).count() == 0
+    assert ApprovalService.get_pending_approvals(db_session, org["manager"].id) == []
+    assert [l.id for l in ApprovalService.get_pending_approvals(db_session, org["vp"].id)] == [leave.id]
+
+    leave = decide(db_session, leave, org["vp"])
+    assert leave.status == LeaveStatus.APPROVED
+    assert leave.processed_by == "Vp"
+    assert db_session.query(OutboxJob).count() > 0
+
+def test_rejection_ends_chain(db_session, org):
+    with patch("app.services.APPROVAL_CHAIN_LEVELS", 3):
+        leave = apply(db_session, org["engineer"])
+    leave = decide(db_session, leave, org["manager"], status="rejected")
+    assert leave.status == LeaveStatus.REJECTED
+    assert ApprovalService.get_pending_approvals(db_session, org["vp"].id) == []
+
+def test_delegate_can_approve_while_manager_is_on_leave(db_session, org):
+    apply(db_session, org["manager"], delegate_id=org["peer"].id)
+    tomorrow = date.today() + timedelta(days=1)
+    leave = LeaveService.apply_leave(db_session, LeaveRequestCreate(
+        employee_id=org["engineer"].id,
+        start_date=tomorrow + timedelta(days=5),
+        end_date=tomorrow + timedelta(days=6)
+    ))
+
+    assert ApprovalService.get_pending_approvals(db_session, org["peer"].id) == []
+    with pytest.raises(ValueError, match="not authorized"):
+        decide(db_session, leave, org["peer"])
+
+    ApprovalService.create_delegation(db_session, DelegationCreate(
+        delegator_id=org["manager"].id,
+        delegate_id=org["peer"].id,
+        start_date=date.today(),
+        end_date=tomorrow
+    ))
+    assert [l.id for l in ApprovalService.get_pending_approvals(db_session, org["peer"].id)] == [leave.id]
+    assert decide(db_session, leave, org["peer"]).status == LeaveStatus.APPROVED
+
+def test_delegate_cannot_approve_own_leave(db_session, org):
+    leave = apply(db_session, org["engineer"])
+    tomorrow = date.today() + timedelta(days=1)
+    ApprovalService.create_delegation(db_session, DelegationCreate(
+        delegator_id=org["manager"].id,
+        delegate_id=org["engineer"].id,
+        start_date=date.today(),
+        end_date=tomorrow
+    ))
+    with pytest.raises(ValueError, match="not authorized"):
+        decide(db_session, leave, org["engineer"])
+    assert decide(db_session, leave, org["manager"]).status == LeaveStatus.APPROVED
+
+def test_pending_approvals_include_indirect_reports(db_session, org):
+    engineer_leave = apply(db_session, org["engineer"])
+    peer_leave = apply(db_session, org["peer"])
+
+    assert [l.id for l in ApprovalService.get_pending_approvals(db_session, org["vp"].id)] == [peer_leave.id]
+    tree = ApprovalService.get_pending_approvals(db_session, org["ceo"].id, include_indirect=True)
+    assert sorted(l.id for l in tree) == sorted([engineer_leave.id, peer_leave.id])
+
+def test_pending_approvals_endpoint(client):
+    def create(name, manager_id=None):
+        return client.post("/api/v1/employees", json={
+            "name": name,
+            "email": f"{name.lower()}@company.com",
+            "department": "Engineering",
+            "joining_date": "2024-01-01",
+            "manager_id": manager_id
+        }).json()
+
+    manager = create("Manager")
+    engineer = create("Engineer", manager["id"])
+    assert engineer["manager_id"] == manager["id"]
+
+    tomorrow = date.today() + timedelta(days=1)
+    leave = client.post("/api/v1/leave-requests", json={
+        "employee_id": engineer["id"],
+        "start_date": tomorrow.isoformat(),
+        "end_date": tomorrow.isoformat()
+    }).json()
+    assert leave["approval_steps"] == 1
+
+    pending = client.get(f"/api/v1/employees/{manager['id']}/pending-approvals").json()
+    assert [l["id"] for l in pending] == [leave["id"]]
+
+    response = client.put(f"/api/v1/leave-requests/{leave['id']}/approve?processed_by=Manager&approver_id={engineer['id']}")
+    assert response.status_code == 400
+    response = client.put(f"/api/v1/leave-requests/{leave['id']}/approve?processed_by=Manager&approver_id={manager['id']}")
+    assert response.json()["status"] == "approved"
+
+    delegation = {
+        "delegator_id": manager["id"],
+        "delegate_id": engineer["id"],
+        "start_date": date.today().isoformat(),
+        "end_date": tomorrow.isoformat()
+    }
+    assert client.post("/api/v1/delegations", json=delegation, headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.post("/api/v1/delegations", json=delegation).status_code == 201
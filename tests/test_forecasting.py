@@ -0,0 +1,179 @@
+import json
+import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from app.models import Base, Employee, LeaveRequest, LeaveStatus, OutboxJob, SeasonalProfile, DEFAULT_TENANT
+from app.forecasting import ForecastService, PROFILE_JOB, add_months, build_seasonal_profile, forecast_cache, write_version
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_forecasting.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+START = date(2030, 3, 1)
+
+@pytest.fixture
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    forecast_cache.clear()
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+def add_employees(db, department, count):
+    employees = [
+        Employee(name=f"{department} {i}", email=f"{department.lower()}{i}@company.com", department=department, joining_date=date(2024, 1, 1))
+        for i in range(count)
+    ]
+    db.add_all(employees)
+    db.commit()
+    return employees
+
+def add_leave(db, employee, start, days, status=LeaveStatus.APPROVED):
+    leave = LeaveRequest(
+        employee_id=employee.id,
+        start_date=start,
+        end_date=start + timedelta(days=days - 1),
+        days_requested=days,
+        status=status
+    )
+    db.add(leave)
+    db.commit()
+    return leave
+
+def test_add_months_clamps_to_month_end():
+    assert add_months(date(2030, 1, 31), 1) == date(2030, 2, 28)
+    assert add_months(date(2030, 11, 15), 3) == date(2031, 2, 15)
+
+def test_forecast_counts_booked_leave_per_day(db_session):
+    engineers = add_employees(db_session, "Engineering", 4)
+    add_employees(db_session, "Finance", 2)
+    add_leave(db_session, engineers[0], START - timedelta(days=2), 4)
+    add_leave(db_session, engineers[1], START + timedelta(days=1), 3, status=LeaveStatus.PENDING)
+    add_leave(db_session, engineers[2], START + timedelta(days=2), 1)
+    add_leave(db_session, engineers[3], START, 1, status=LeaveStatus.REJECTED)
+
+    report = ForecastService.build(db_session, START, 1)
+    assert report["end_date"] == date(2030, 3, 31)
+    assert len(report["dates"]) == 31 and report["dates"][0] == START
+
+    engineering, finance = report["departments"]
+    assert engineering["headcount"] == 4
+    assert engineering["approved"][:5] == [1, 1, 1, 0, 0]
+    assert engineering["pending"][:5] == [0, 1, 1, 1, 0]
+    assert engineering["available"][:5] == [3, 2, 2, 3, 4]
+    assert engineering["risk"][:5] == ["medium", "high", "high", "medium", "low"]
+    assert engineering["high_risk_days"] == 2
+    assert engineering["min_availability"] == 0.5
+    assert finance["available"] == [2] * 31
+
+def test_seasonality_raises_expected_absence(db_session):
+    engineers = add_employees(db_session, "Engineering", 10)
+    for employee in engineers[:3]:
+        add_leave(db_session, employee, date(2029, 3, 1), 31)
+    ForecastService.store_seasonal_profile(db_session, DEFAULT_TENANT, START)
+
+    report = ForecastService.build(db_session, START, 2)
+    assert report["seasonal_profile_month"] == START
+    engineering = report["departments"][0]
+    assert engineering["seasonal"][0] == 1.5
+    assert engineering["available"][0] == 8.5
+    assert engineering["seasonal"][31] == 0
+    assert engineering["available"][31] == 10
+
+def test_forecast_is_cached_until_next_write(db_session):
+    engineers = add_employees(db_session, "Engineering", 2)
+    report = ForecastService.get_forecast(db_session, months=1, start=START)
+    assert ForecastService.get_forecast(db_session, months=1, start=START) is report
+
+    version, history_version = write_version(), write_version("history")
+    leave = add_leave(db_session, engineers[0], START, 1, status=LeaveStatus.PENDING)
+    assert write_version() == version + 1
+    assert write_version("history") == history_version
+    refreshed = ForecastService.get_forecast(db_session, months=1, start=START)
+    assert refreshed is not report
+    assert refreshed["departments"][0]["pending"][0] == 1
+
+    leave.status = LeaveStatus.REJECTED
+    db_session.rollback()
+    assert write_version() == version + 1
+    assert ForecastService.get_forecast(db_session, months=1, start=START) is refreshed
+
+    db_session.execute(insert(LeaveRequest), [{
+        "tenant_id": DEFAULT_TENANT,
+        "employee_id": engineers[1].id,
+        "start_date": START,
+        "end_date": START,
+        "days_requested": 1,
+        "status": LeaveStatus.APPROVED,
+        "applied_date": datetime.utcnow(),
+        "approval_steps": 0
+    }])
+    db_session.commit()
+    assert write_version("history") == history_version + 1
+    assert ForecastService.get_forecast(db_session, months=1, start=START)["departments"][0]["approved"][0] == 1
+
+    add_leave(db_session, engineers[1], date.today() - timedelta(days=30), 1)
+    assert write_version("history") == history_version + 2
+
+def profile_jobs(db):
+    return db.query(OutboxJob).filter(OutboxJob.job_type == PROFILE_JOB).order_by(OutboxJob.id).all()
+
+def test_missing_profile_is_queued_not_built(db_session):
+    engineers = add_employees(db_session, "Engineering", 2)
+    add_leave(db_session, engineers[0], date(2029, 3, 1), 31)
+    db_session.query(OutboxJob).delete()
+    db_session.commit()
+
+    report = ForecastService.build(db_session, START, 1)
+    assert report["seasonal_profile_month"] is None
+    assert report["departments"][0]["seasonal"][0] == 0
+    assert [job.idempotency_key for job in profile_jobs(db_session)] == [f"{PROFILE_JOB}:{DEFAULT_TENANT}:2030-03-01"]
+
+    ForecastService.build(db_session, START + timedelta(days=9), 1)
+    assert len(profile_jobs(db_session)) == 1
+
+    ForecastService.store_seasonal_profile(db_session, DEFAULT_TENANT, START)
+    report = ForecastService.build(db_session, add_months(START, 1), 1)
+    assert report["seasonal_profile_month"] == START
+    assert len(profile_jobs(db_session)) == 2
+
+def test_history_write_queues_profile_refresh(db_session, monkeypatch):
+    monkeypatch.setattr("app.forecasting.FORECAST_PROFILE_REFRESH_DELAY", 86400)
+    engineers = add_employees(db_session, "Engineering", 2)
+    db_session.query(OutboxJob).delete()
+    db_session.commit()
+
+    add_leave(db_session, engineers[0], START, 1)
+    assert profile_jobs(db_session) == []
+
+    add_leave(db_session, engineers[0], date.today() - timedelta(days=30), 1)
+    add_leave(db_session, engineers[1], date.today() - timedelta(days=40), 1)
+    jobs = profile_jobs(db_session)
+    assert len(jobs) == 1
+    assert jobs[0].next_run_at > datetime.utcnow()
+
+    monkeypatch.setattr("app.database.open_session", lambda tenant_id: TestingSessionLocal())
+    build_seasonal_profile({"tenant_id": DEFAULT_TENANT, "month": date.today().replace(day=1).isoformat()})
+    stored = db_session.get(SeasonalProfile, (DEFAULT_TENANT, date.today().replace(day=1)))
+    assert stored is not None and sum(json.loads(stored.profile)["Engineering"]) > 0
+
+def test_forecast_counts_leave_of_new_hires(db_session):
+    add_employees(db_session, "Engineering", 1)
+    ForecastService.build(db_session, START, 1)
+    hire = add_employees(db_session, "Finance", 1)[0]
+    add_leave(db_session, hire, START, 2)
+    finance = ForecastService.build(db_session, START, 1)["departments"][1]
+    assert finance["approved"][:3] == [1, 1, 0]
+
+def test_forecast_endpoint(client):
+    client.post("/api/v1/employees", json={"name": "Jane Doe", "email": "jane@company.com", "department": "Engineering", "joining_date": "2024-01-01"})
+    client.post("/api/v1/employees", json={"name": "John Doe", "email": "john@company.com", "department": "Finance", "joining_date": "2024-01-01"})
+
+    response = client.get("/api/v1/reports/forecast?months=2&department=Finance")
+    assert response.status_code == 200
+    body = response.json()
+    assert [d["department"] for d in body["departments"]] == ["Finance"]
+    assert len(body["dates"]) == len(body["departments"][0]["risk"])
+    assert client.get("/api/v1/reports/forecast?months=0").status_code == 422
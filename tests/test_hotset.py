@@ -0,0 +1,122 @@
+import pytest
+from datetime import date, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.hotset import EmployeeLeave, HotSetStore
+from app.models import Base, Employee, LeaveRequest, LeaveStatus
+from app.services import LeaveService
+from app.schemas import LeaveRequestCreate, LeaveRequestUpdate
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_hotset.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+TODAY = date.today()
+
+@pytest.fixture
+def store(monkeypatch):
+    store = HotSetStore(enabled=True, max_intervals=4)
+    monkeypatch.setattr("app.services.hot_set", store)
+    return store
+
+@pytest.fixture
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    session.add_all([
+        Employee(id=1, name="Ada", email="ada@company.com", department="Engineering", joining_date=date(2020, 1, 1)),
+        Employee(id=2, name="Bob", email="bob@company.com", department="Engineering", joining_date=date(2020, 1, 1)),
+        LeaveRequest(id=10, employee_id=1, start_date=TODAY - timedelta(days=30), end_date=TODAY - timedelta(days=28), days_requested=3, status=LeaveStatus.APPROVED),
+        LeaveRequest(id=11, employee_id=1, start_date=TODAY + timedelta(days=10), end_date=TODAY + timedelta(days=12), days_requested=3, status=LeaveStatus.APPROVED),
+        LeaveRequest(id=12, employee_id=1, start_date=TODAY + timedelta(days=20), end_date=TODAY + timedelta(days=21), days_requested=2, status=LeaveStatus.PENDING),
+        LeaveRequest(id=13, employee_id=1, start_date=TODAY + timedelta(days=30), end_date=TODAY + timedelta(days=30), days_requested=1, status=LeaveStatus.REJECTED),
+    ])
+    session.commit()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def statements():
+    executed = []
+    listener = lambda conn, cursor, statement, *args: executed.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    yield executed
+    event.remove(engine, "before_cursor_execute", listener)
+
+def test_record_answers_overlaps_from_current_intervals():
+    record = EmployeeLeave(TODAY.toordinal())
+    record.add(1, TODAY - timedelta(days=5), TODAY - timedelta(days=1), LeaveStatus.APPROVED, 5, 4)
+    record.add(2, TODAY + timedelta(days=3), TODAY + timedelta(days=5), LeaveStatus.PENDING, 3, 4)
+
+    assert (record.used_days, record.pending_days) == (5, 3)
+    assert len(record.ids) == 1
+    assert record.overlaps(TODAY + timedelta(days=5), TODAY + timedelta(days=8)) is True
+    assert record.overlaps(TODAY + timedelta(days=5), TODAY + timedelta(days=8), exclude_id=2) is False
+    assert record.overlaps(TODAY, TODAY + timedelta(days=2)) is False
+    # Past intervals are not held, so questions about the past go to the DB.
+    assert record.overlaps(TODAY - timedelta(days=2), TODAY) is None
+
+    record.set_status(2, LeaveStatus.PENDING, LeaveStatus.REJECTED, 3)
+    assert (record.used_days, record.pending_days) == (5, 0)
+    assert record.overlaps(TODAY + timedelta(days=5), TODAY + timedelta(days=8)) is False
+
+def test_record_keeps_only_totals_past_the_interval_cap():
+    record = EmployeeLeave(TODAY.toordinal())
+    for i in range(3):
+        day = TODAY + timedelta(days=i * 2)
+        record.add(i, day, day, LeaveStatus.PENDING, 1, 2)
+
+    assert record.overflow and len(record.ids) == 0
+    assert record.pending_days == 3
+    assert record.overlaps(TODAY, TODAY) is None
+
+def test_warm_loads_every_employee_in_one_query(store, db_session, statements):
+    assert store.warm(db_session) == 2
+    assert len(statements) == 1
+    assert store.stats() == {"employees": 2, "intervals": 2, "overflowed": 0}
+
+    statements.clear()
+    assert LeaveService.check_overlapping_requests(db_session, 1, TODAY + timedelta(days=12), TODAY + timedelta(days=14)) is True
+    assert LeaveService.check_overlapping_requests(db_session, 1, TODAY + timedelta(days=30), TODAY + timedelta(days=30)) is False
+    assert statements == []
+
+    balance = LeaveService.get_leave_balance(db_session, 1)
+    assert (balance["used_days"], balance["pending_days"]) == (6, 2)
+    assert len(statements) == 1
+
+def test_miss_falls_back_to_db_and_fills_store(store, db_session):
+    assert LeaveService.get_leave_balance(db_session, 2)["used_days"] == 0
+    assert store.stats()["employees"] == 1
+    assert LeaveService.check_overlapping_requests(db_session, 1, TODAY - timedelta(days=29), TODAY - timedelta(days=29)) is True
+    assert store.stats()["employees"] == 2
+
+def test_replica_reads_do_not_fill_store(store, db_session):
+    db_session.info["replica"] = True
+    assert LeaveService.get_leave_balance(db_session, 1)["pending_days"] == 2
+    assert store.stats()["employees"] == 0
+
+def test_write_paths_keep_store_coherent(store, db_session):
+    store.warm(db_session)
+    start = TODAY + timedelta(days=40)
+    leave = LeaveService.apply_leave(db_session, LeaveRequestCreate(employee_id=1, start_date=start, end_date=start + timedelta(days=1)))
+    with pytest.raises(ValueError, match="overlaps"):
+        LeaveService.apply_leave(db_session, LeaveRequestCreate(employee_id=1, start_date=start + timedelta(days=1), end_date=start + timedelta(days=2)))
+
+    LeaveService.update_leave_status(db_session, leave.id, LeaveRequestUpdate(status=LeaveStatus.APPROVED, processed_by="hr"))
+    LeaveService.update_leave_status(db_session, 12, LeaveRequestUpdate(status=LeaveStatus.REJECTED, processed_by="hr"))
+    cached = LeaveService.get_leave_balance(db_session, 1)
+
+    store.clear()
+    assert LeaveService.get_leave_balance(db_session, 1) == cached
+    assert (cached["used_days"], cached["pending_days"]) == (8, 0)
+    assert LeaveService.check_overlapping_requests(db_session, 1, start + timedelta(days=1), start + timedelta(days=2)) is True
+
+def test_uncommitted_writes_do_not_reach_store(store, db_session):
+    store.warm(db_session)
+    start = TODAY + timedelta(days=40)
+    LeaveService.apply_leave(db_session, LeaveRequestCreate(employee_id=1, start_date=start, end_date=start), commit=False)
+    db_session.rollback()
+
+    assert store.stats()["intervals"] == 2
+    assert LeaveService.check_overlapping_requests(db_session, 1, start, start) is False
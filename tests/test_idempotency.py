@@ -0,0 +1,131 @@
+import pytest
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.models import Base, IdempotencyRecord
+from app.idempotency import IdempotencyStore
+from app.services import LeaveService
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_idempotency.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+def create_employee(client):
+    response = client.post("/api/v1/employees", json={
+        "name": "John Doe",
+        "email": "john.doe@company.com",
+        "department": "Engineering",
+        "joining_date": "2024-01-01"
+    })
+    return response.json()["id"]
+
+def leave_payload(employee_id):
+    tomorrow = date.today() + timedelta(days=1)
+    return {
+        "employee_id": employee_id,
+        "start_date": tomorrow.isoformat(),
+        "end_date": (tomorrow + timedelta(days=2)).isoformat(),
+        "reason": "Personal leave"
+    }
+
+def test_retried_apply_leave_returns_original_response(client):
+    employee_id = create_employee(client)
+    headers = {"Idempotency-Key": "apply-1"}
+
+    first = client.post("/api/v1/leave-requests", json=leave_payload(employee_id), headers=headers)
+    assert first.status_code == 201
+
+    with patch.object(LeaveService, "check_overlapping_requests") as overlap, \
+            patch.object(LeaveService, "get_leave_balance") as balance:
+        retry = client.post("/api/v1/leave-requests", json=leave_payload(employee_id), headers=headers)
+        overlap.assert_not_called()
+        balance.assert_not_called()
+
+    assert retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+
+    requests = client.get(f"/api/v1/employees/{employee_id}/leave-requests").json()
+    assert len(requests) == 1
+
+def test_retry_without_key_still_detects_overlap(client):
+    employee_id = create_employee(client)
+    client.post("/api/v1/leave-requests", json=leave_payload(employee_id), headers={"Idempotency-Key": "apply-2"})
+    response = client.post("/api/v1/leave-requests", json=leave_payload(employee_id))
+    assert response.status_code == 400
+
+def test_reused_key_with_different_body_is_rejected(client):
+    employee_id = create_employee(client)
+    headers = {"Idempotency-Key": "apply-3"}
+    client.post("/api/v1/leave-requests", json=leave_payload(employee_id), headers=headers)
+
+    payload = leave_payload(employee_id)
+    payload["reason"] = "Something else"
+    response = client.post("/api/v1/leave-requests", json=payload, headers=headers)
+    assert response.status_code == 422
+
+def test_retried_approval_returns_original_response(client):
+    employee_id = create_employee(client)
+    leave_id = client.post("/api/v1/leave-requests", json=leave_payload(employee_id)).json()["id"]
+    headers = {"Idempotency-Key": "approve-1"}
+
+    first = client.put(f"/api/v1/leave-requests/{leave_id}/approve?processed_by=HR Manager", headers=headers)
+    retry = client.put(f"/api/v1/leave-requests/{leave_id}/approve?processed_by=HR Manager", headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+
+def test_store_serves_hits_from_cache(db_session):
+    store = IdempotencyStore()
+    store.save(db_session, "scope", "key", "abc", 201, "{}")
+    db_session.query(IdempotencyRecord).delete()
+    db_session.commit()
+    assert store.get(db_session, "scope", "key").fingerprint == "abc"
+
+    store.clear_cache()
+    assert store.get(db_session, "scope", "key") is None
+
+def test_purge_expired_in_batches(db_session):
+    store = IdempotencyStore()
+    expired = datetime.utcnow() - timedelta(seconds=1)
+    for i in range(7):
+        db_session.add(IdempotencyRecord(scope="s", key=f"old-{i}", fingerprint="f", status_code=201, response_body="{}", expires_at=expired))
+    store.save(db_session, "s", "fresh", "f", 201, "{}")
+    db_session.commit()
+
+    assert store.purge_expired(db_session, batch_size=3) == 7
+    assert [r.key for r in db_session.query(IdempotencyRecord).all()] == ["fresh"]
+
+def test_failed_store_rolls_back_leave_and_retry_runs_once(client):
+    employee_id = create_employee(client)
+    headers = {"Idempotency-Key": "apply-4"}
+
+    with patch("app.routes.store_idempotent_response", side_effect=RuntimeError("disk full")):
+        failed = client.post("/api/v1/leave-requests", json=leave_payload(employee_id), headers=headers)
+    assert failed.status_code == 500
+    assert client.get(f"/api/v1/employees/{employee_id}/leave-requests").json() == []
+
+    first = client.post("/api/v1/leave-requests", json=leave_payload(employee_id), headers=headers)
+    retry = client.post("/api/v1/leave-requests", json=leave_payload(employee_id), headers=headers)
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+    assert len(client.get(f"/api/v1/employees/{employee_id}/leave-requests").json()) == 1
+
+def test_claim_is_released_on_rollback(db_session):
+    store = IdempotencyStore()
+    assert store.claim(db_session, "scope", "key") is None
+    db_session.rollback()
+    assert db_session.query(IdempotencyRecord).count() == 0
+
+    assert store.claim(db_session, "scope", "key") is None
+    store.save(db_session, "scope", "key", "abc", 201, "{}")
+    assert db_session.query(IdempotencyRecord).count() == 1
+    assert store.claim(db_session, "scope", "key").fingerprint == "abc"
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.models import Base, OutboxJob, JobStatus
+from app.services import EmployeeService, LeaveService
+from app.schemas import EmployeeCreate, LeaveRequestCreate, LeaveRequestUpdate
+from app.jobs import JobWorker, enqueue_job, register_handler, LEAVE_STATUS_JOBS
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_jobs.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+calls = []
+
+@register_handler("test.record")
+def record_job(payload):
+    calls.append(payload)
+
+@register_handler("test.fail")
+def failing_job(payload):
+    raise RuntimeError("downstream unavailable")
+
+@pytest.fixture
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    calls.clear()
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+def create_pending_leave(db_session):
+    employee = EmployeeService.create_employee(db_session, EmployeeCreate(
+        name="John Doe",
+        email="john@company.com",
+        department="Engineering",
+        joining_date=date(2024, 1, 1)
+    ))
+    tomorrow = date.today() + timedelta(days=1)
+    return LeaveService.apply_leave(db_session, LeaveRequestCreate(
+        employee_id=employee.id,
+        start_date=tomorrow,
+        end_date=tomorrow + timedelta(days=2)
+    ))
+
+def test_update_leave_status_enqueues_side_effects(db_session):
+    leave_request = create_pending_leave(db_session)
+    LeaveService.update_leave_status(db_session, leave_request.id, LeaveRequestUpdate(status="approved", processed_by="HR Manager"))
+
+    jobs = db_session.query(OutboxJob).all()
+    assert sorted(job.job_type for job in jobs) == sorted(LEAVE_STATUS_JOBS)
+    assert all(job.status == JobStatus.PENDING for job in jobs)
+    assert all(job.idempotency_key.endswith(f":{leave_request.id}:approved") for job in jobs)
+
+def test_enqueue_job_is_idempotent(db_session):
+    assert enqueue_job(db_session, "test.record", {"value": 1}, "same-key") is not None
+    db_session.commit()
+    assert enqueue_job(db_session, "test.record", {"value": 2}, "same-key") is None
+    db_session.commit()
+    assert db_session.query(OutboxJob).count() == 1
+
+def test_worker_runs_job_once(db_session):
+    enqueue_job(db_session, "test.record", {"value": 1}, "record-1")
+    db_session.commit()
+
+    worker = JobWorker(TestingSessionLocal)
+    claimed = worker.claim_jobs(10)
+    assert len(claimed) == 1
+    assert worker.claim_jobs(10) == []
+
+    worker.run_job(claimed[0])
+    job = db_session.query(OutboxJob).first()
+    db_session.refresh(job)
+    assert job.status == JobStatus.DONE
+    assert job.attempts == 1
+    assert calls == [{"value": 1, "idempotency_key": "record-1"}]
+
+def test_failed_job_is_retried_with_backoff(db_session):
+    enqueue_job(db_session, "test.fail", {}, "fail-1", max_attempts=2)
+    db_session.commit()
+
+    worker = JobWorker(TestingSessionLocal)
+    worker.run_job(worker.claim_jobs(10)[0])
+    job = db_session.query(OutboxJob).first()
+    db_session.refresh(job)
+    assert job.status == JobStatus.PENDING
+    assert job.next_run_at > datetime.utcnow()
+    assert "downstream unavailable" in job.last_error
+    assert worker.claim_jobs(10) == []
+
+    job.next_run_at = datetime.utcnow() - timedelta(seconds=1)
+    db_session.commit()
+    worker.run_job(worker.claim_jobs(10)[0])
+    db_session.refresh(job)
+    assert job.status == JobStatus.FAILED
+    assert job.attempts == 2
+
+def test_stale_running_jobs_are_recovered(db_session):
+    enqueue_job(db_session, "test.record", {}, "stale-1")
+    db_session.commit()
+
+    worker = JobWorker(TestingSessionLocal, lease_seconds=60)
+    worker.claim_jobs(10)
+    job = db_session.query(OutboxJob).first()
+    job.locked_at = datetime.utcnow() - timedelta(minutes=5)
+    db_session.commit()
+
+    assert worker.recover_stale_jobs() == 1
+    db_session.refresh(job)
+    assert job.status == JobStatus.PENDING
+
+release = threading.Event()
+
+@register_handler("test.slow")
+def slow_job(payload):
+    release.wait(5)
+
+def test_worker_renews_leases_and_recovers_stale_jobs_while_running(db_session):
+    enqueue_job(db_session, "test.slow", {}, "slow-1")
+    db_session.commit()
+    release.clear()
+
+    async def run_worker():
+        worker = JobWorker(TestingSessionLocal, poll_interval=0.01, lease_seconds=60, heartbeat_interval=0.05)
+        await worker.start()
+        await asyncio.sleep(0.02)
+        # A job left behind by a dead worker, and our own long job past its original lease.
+        stale = enqueue_job(db_session, "test.record", {}, "stale-2")
+        stale.status, stale.locked_at = JobStatus.RUNNING, datetime.utcnow() - timedelta(minutes=5)
+        slow = db_session.query(OutboxJob).filter(OutboxJob.idempotency_key == "slow-1").one()
+        slow.locked_at = datetime.utcnow() - timedelta(minutes=5)
+        db_session.commit()
+        for _ in range(200):
+            if calls:
+                break
+            await asyncio.sleep(0.01)
+        db_session.expire_all()
+        slow_locked_at = db_session.get(OutboxJob, slow.id).locked_at
+        release.set()
+        await worker.stop()
+        return slow_locked_at
+
+    slow_locked_at = asyncio.run(run_worker())
+    assert len(calls) == 1
+    assert slow_locked_at > datetime.utcnow() - timedelta(seconds=5)
+    assert db_session.query(OutboxJob).filter(OutboxJob.status == JobStatus.DONE).count() == 2
+
+def test_worker_drains_outbox_in_background(db_session):
+    for i in range(5):
+        enqueue_job(db_session, "test.record", {"value": i}, f"bg-{i}")
+    db_session.commit()
+
+    async def run_worker():
+        worker = JobWorker(TestingSessionLocal, concurrency=2, poll_interval=0.01)
+        await worker.start()
+        for _ in range(200):
+            if len(calls) == 5:
+                break
+            await asyncio.sleep(0.01)
+        await worker.stop()
+
+    asyncio.run(run_worker())
+    assert sorted(call["value"] for call in calls) == list(range(5))
+    assert db_session.query(OutboxJob).filter(OutboxJob.status == JobStatus.DONE).count() == 5
@@ -0,0 +1,149 @@
+import pytest
+from datetime import date
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from app.migrations import (
+    LATEST_VERSION, MigrationContext, add_employee_trigram_indexes, current_version, index_ddl, main, upgrade, pending_migrations
+)
+from app.models import Base, EmployeeHierarchy, LeaveRequest
+from app.services import EmployeeService
+from app.schemas import EmployeeCreate
+
+LEGACY_SCHEMA = [
+    """CREATE TABLE employees (
+        id INTEGER NOT NULL PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        email VARCHAR(100) NOT NULL,
+        department VARCHAR(50) NOT NULL,
+        joining_date DATE NOT NULL,
+        annual_leave_entitlement FLOAT,
+        created_at DATETIME
+    )""",
+    "CREATE UNIQUE INDEX ix_employees_email ON employees (email)",
+    """CREATE TABLE leave_requests (
+        id INTEGER NOT NULL PRIMARY KEY,
+        employee_id INTEGER NOT NULL,
+        start_date DATE NOT NULL,
+        end_date DATE NOT NULL,
+        days_requested FLOAT NOT NULL,
+        reason VARCHAR(500),
+        status VARCHAR(8),
+        applied_date DATETIME,
+        processed_date DATETIME,
+        processed_by VARCHAR(100)
+    )""",
+    "CREATE TABLE schema_version (version INTEGER NOT NULL PRIMARY KEY, applied_at DATETIME)",
+]
+
+@pytest.fixture
+def legacy(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.exec_driver_sql(statement)
+        for i in range(1, 6):
+            conn.exec_driver_sql(
+                "INSERT INTO employees (id, name, email, department, joining_date) VALUES (?, ?, ?, 'Engineering', '2024-01-01')",
+                (i, f"Employee {i}", f"employee{i}@company.com")
+            )
+        conn.exec_driver_sql(
+            "INSERT INTO leave_requests (employee_id, start_date, end_date, days_requested, status) "
+            "VALUES (1, '2024-03-01', '2024-03-02', 2, 'PENDING')"
+        )
+    yield engine
+    engine.dispose()
+
+def test_upgrade_brings_legacy_database_to_current_schema(legacy, monkeypatch):
+    pauses = []
+    monkeypatch.setattr("app.migrations.time.sleep", pauses.append)
+    assert current_version(legacy) is None
+
+    applied = upgrade(legacy, chunk_size=2, pause=0.01)
+    assert [migration.version for migration in applied] == list(range(1, LATEST_VERSION + 1))
+    assert current_version(legacy) == LATEST_VERSION
+    # Two pauses each for the closure and search backfills of five employees.
+    assert pauses == [0.01] * 4
+
+    inspector = inspect(legacy)
+    assert {"tenant_id", "manager_id"} <= {column["name"] for column in inspector.get_columns("employees")}
+    assert {"tenant_id", "approval_steps"} <= {column["name"] for column in inspector.get_columns("leave_requests")}
+    assert "ix_leave_requests_tenant_window" in {index["name"] for index in inspector.get_indexes("leave_requests")}
+    assert "ix_employees_email" not in {index["name"] for index in inspector.get_indexes("employees")}
+    assert "schema_version" not in inspector.get_table_names()
+
+    db = sessionmaker(bind=legacy)()
+    try:
+        leave = db.query(LeaveRequest).one()
+        assert (leave.tenant_id, leave.approval_steps) == ("default", 0)
+        assert db.query(EmployeeHierarchy).filter(EmployeeHierarchy.depth == 0).count() == 5
+        assert db.execute(text("SELECT count(*) FROM employees_search WHERE employees_search MATCH 'employee'")).scalar() == 5
+
+        other_tenant = sessionmaker(bind=legacy)()
+        other_tenant.info["tenant_id"] = "acme"
+        employee = EmployeeService.create_employee(other_tenant, EmployeeCreate(
+            name="Employee 1", email="employee1@company.com", department="Engineering", joining_date=date(2024, 1, 1)
+        ))
+        assert employee.tenant_id == "acme"
+        other_tenant.close()
+    finally:
+        db.close()
+
+def test_upgrade_is_idempotent(legacy):
+    upgrade(legacy)
+    assert pending_migrations(legacy) == []
+    assert upgrade(legacy) == []
+
+    with legacy.begin() as conn:
+        conn.execute(text("DELETE FROM schema_migrations WHERE version >= 2"))
+    assert [migration.version for migration in upgrade(legacy)] == list(range(2, LATEST_VERSION + 1))
+
+def test_fresh_database_matches_models(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    upgrade(engine)
+    ctx = MigrationContext(engine)
+    assert "uq_employees_tenant_email" in ctx.indexes("employees")
+    assert "approval_steps" in ctx.columns("leave_requests")
+    # Migration 1 is pinned DDL; together with the later migrations it must still add up to the models.
+    # The FTS5 search table and its shadow tables are managed outside the models.
+    tables = set(inspect(engine).get_table_names())
+    assert "employees_search" in tables
+    assert {name for name in tables if not name.startswith("employees_search")} == set(Base.metadata.tables)
+    with engine.connect() as conn:
+        indexes = set(conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'").scalars())
+    for table in Base.metadata.sorted_tables:
+        assert set(ctx.columns(table.name)) == set(table.c.keys())
+        assert {index.name for index in table.indexes} <= indexes
+    engine.dispose()
+
+def test_online_index_ddl_uses_concurrently_on_postgres():
+    index = next(index for index in LeaveRequest.__table__.indexes if index.name == "ix_leave_requests_tenant_window")
+    assert index_ddl(index, postgresql.dialect()).startswith("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_leave_requests_tenant_window")
+    assert "CONCURRENTLY" not in index_ddl(index, postgresql.dialect(), online=False)
+
+def test_trigram_indexes_are_built_concurrently_on_postgres():
+    class RecordingContext:
+        dialect = postgresql.dialect()
+
+        def __init__(self):
+            self.statements = []
+
+        def execute(self, statement):
+            self.statements.append(statement)
+
+        def create_index_concurrently(self, name, ddl):
+            self.statements.append(ddl)
+
+    ctx = RecordingContext()
+    add_employee_trigram_indexes(ctx)
+    assert ctx.statements[0] == "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+    assert len(ctx.statements) == 3
+    assert all(statement.startswith("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_employees_") for statement in ctx.statements[1:])
+
+def test_cli_status_and_upgrade(tmp_path, capsys):
+    url = f"sqlite:///{tmp_path / 'cli.db'}"
+    main(["status", "--database-url", url])
+    assert f"version 0 of {LATEST_VERSION}" in capsys.readouterr().out
+    main(["upgrade", "--database-url", url])
+    main(["status", "--database-url", url])
+    assert "0 pending" in capsys.readouterr().out
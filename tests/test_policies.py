@@ -0,0 +1,160 @@
+import pytest
+from datetime import date, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.models import Base
+from app.services import EmployeeService, LeaveService
+from app.schemas import EmployeeCreate, LeaveRequestCreate, LeavePolicyCreate, LeavePolicyUpdate
+from app.policies import PolicyPlan, PolicyPlanCache, PolicyService, policy_cache
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_policies.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    policy_cache.clear()
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+def add_employee(db, name, department="Engineering"):
+    return EmployeeService.create_employee(db, EmployeeCreate(
+        name=name,
+        email=f"{name.lower()}@company.com",
+        department=department,
+        joining_date=date(2024, 1, 1)
+    ))
+
+def apply(db, employee, offset=10, days=2):
+    start = date.today() + timedelta(days=offset)
+    return LeaveService.apply_leave(db, LeaveRequestCreate(
+        employee_id=employee.id,
+        start_date=start,
+        end_date=start + timedelta(days=days - 1)
+    ))
+
+def add_policy(db, rule_type, params, department=None):
+    return PolicyService.create_policy(db, LeavePolicyCreate(rule_type=rule_type, params=params, department=department))
+
+def test_max_consecutive_days(db_session):
+    employee = add_employee(db_session, "Jane")
+    add_policy(db_session, "max_consecutive_days", {"days": 3})
+    with pytest.raises(ValueError, match="cannot exceed 3"):
+        apply(db_session, employee, days=5)
+    assert apply(db_session, employee, days=3).days_requested == 3
+
+def test_blackout_period_applies_to_department_only(db_session):
+    engineer = add_employee(db_session, "Jane")
+    accountant = add_employee(db_session, "John", department="Finance")
+    start = date.today() + timedelta(days=10)
+    add_policy(db_session, "blackout_period", {"start": start.isoformat(), "end": start.isoformat(), "reason": "Release"}, department="Engineering")
+
+    with pytest.raises(ValueError, match="blackout period \\(Release\\)"):
+        apply(db_session, engineer)
+    assert apply(db_session, accountant).id is not None
+
+def test_min_notice_days(db_session):
+    employee = add_employee(db_session, "Jane")
+    add_policy(db_session, "min_notice_days", {"days": 7})
+    with pytest.raises(ValueError, match="at least 7 days"):
+        apply(db_session, employee, offset=3)
+    assert apply(db_session, employee, offset=7).id is not None
+
+def test_max_concurrent_absences_uses_one_query(db_session):
+    team = [add_employee(db_session, name) for name in ("Ann", "Bob", "Cat")]
+    add_employee(db_session, "Dan", department="Finance")
+    add_policy(db_session, "max_concurrent_absences", {"limit": 2})
+
+    apply(db_session, team[0], offset=10, days=3)
+    apply(db_session, team[1], offset=12, days=3)
+
+    db_session.refresh(team[2])
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        counts = PolicyService.team_absences(db_session, team[2], date.today() + timedelta(days=9), date.today() + timedelta(days=15))
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert len(statements) == 1
+    assert counts == [0, 1, 1, 2, 1, 1, 0]
+
+    with pytest.raises(ValueError, match="limit 2"):
+        apply(db_session, team[2], offset=12, days=1)
+    assert apply(db_session, team[2], offset=15, days=1).id is not None
+
+def test_plan_cache_is_invalidated_on_edit(db_session):
+    employee = add_employee(db_session, "Jane")
+    policy = add_policy(db_session, "max_consecutive_days", {"days": 1})
+    plan = PolicyService.get_plan(db_session, "Engineering")
+    assert PolicyService.get_plan(db_session, "Engineering") is plan
+
+    PolicyService.update_policy(db_session, policy.id, LeavePolicyUpdate(params={"days": 5}))
+    assert PolicyService.get_plan(db_session, "Engineering") is not plan
+    assert apply(db_session, employee, days=4).id is not None
+
+    PolicyService.update_policy(db_session, policy.id, LeavePolicyUpdate(enabled=False))
+    assert PolicyService.get_plan(db_session, "Engineering").checks == []
+
+def test_plan_cache_is_bounded_and_drops_expired_plans(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("app.policies.time.monotonic", lambda: clock[0])
+    cache = PolicyPlanCache(ttl=10, max_entries=2)
+    plans = [PolicyPlan() for _ in range(3)]
+
+    cache.put("default", "Engineering", plans[0])
+    cache.put("default", "Finance", plans[1])
+    assert cache.get("default", "Engineering") is plans[0]
+    cache.put("default", "Sales", plans[2])
+    assert len(cache) == 2
+    assert cache.get("default", "Finance") is None
+    assert cache.get("default", "Engineering") is plans[0]
+
+    clock[0] += 10
+    assert cache.get("default", "Engineering") is None
+    cache.put("acme", "Engineering", plans[0])
+    assert len(cache) == 1
+
+def test_invalid_params_are_rejected(db_session):
+    with pytest.raises(ValueError, match="non-negative integer"):
+        add_policy(db_session, "max_consecutive_days", {"days": "ten"})
+    with pytest.raises(ValueError, match="ISO date"):
+        add_policy(db_session, "blackout_period", {"start": "soon", "end": "2026-01-01"})
+
+def test_policy_endpoints(client):
+    response = client.post("/api/v1/policies", json={"rule_type": "max_consecutive_days", "params": {"days": 2}})
+    assert response.status_code == 201
+    policy = response.json()
+    assert policy["params"] == {"days": 2}
+
+    assert client.post("/api/v1/policies", json={"rule_type": "unknown", "params": {}}).status_code == 422
+    assert client.post("/api/v1/policies", json={"rule_type": "min_notice_days", "params": {}}).status_code == 400
+
+    employee = client.post("/api/v1/employees", json={
+        "name": "Jane Doe",
+        "email": "jane@company.com",
+        "department": "Engineering",
+        "joining_date": "2024-01-01"
+    }).json()
+    start = date.today() + timedelta(days=10)
+    leave = {"employee_id": employee["id"], "start_date": start.isoformat(), "end_date": (start + timedelta(days=3)).isoformat()}
+    assert client.post("/api/v1/leave-requests", json=leave).status_code == 400
+
+    response = client.put(f"/api/v1/policies/{policy['id']}", json={"params": {"days": 10}})
+    assert response.json()["params"] == {"days": 10}
+    assert client.post("/api/v1/leave-requests", json=leave).status_code == 201
+
+    assert [p["id"] for p in client.get("/api/v1/policies").json()] == [policy["id"]]
+    assert client.delete(f"/api/v1/policies/{policy['id']}").status_code == 204
+    assert client.delete(f"/api/v1/policies/{policy['id']}").status_code == 404
+    assert client.get("/api/v1/policies").json() == []
+
+def test_policy_writes_require_admin(client):
+    no_admin = {"X-Admin-Token": "wrong"}
+    assert client.post("/api/v1/policies", json={"rule_type": "max_consecutive_days", "params": {"days": 2}}, headers=no_admin).status_code == 403
+    assert client.put("/api/v1/policies/1", json={"params": {"days": 10}}, headers=no_admin).status_code == 403
+    assert client.delete("/api/v1/policies/1", headers=no_admin).status_code == 403
+    assert client.get("/api/v1/policies", headers=no_admin).status_code == 200
@@ -0,0 +1,57 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.main import app
+from tests.conftest import ADMIN_TOKEN
+from app.profiling import (
+    ProfileStore, ProfilingMiddleware, RequestProfile, profile_store,
+    _before_cursor_execute, uninstall_sql_timeline
+)
+
+EMPLOYEE = {"name": "Jane Doe", "email": "jane@company.com", "department": "Engineering", "joining_date": "2024-01-01"}
+
+@pytest.fixture
+def profiled(client):
+    store = ProfileStore(max_profiles=2)
+    wrapped = ProfilingMiddleware(app, store=store, profiler="cprofile")
+    yield TestClient(wrapped), store, wrapped
+    uninstall_sql_timeline()
+
+def test_disabled_profiling_adds_no_middleware_or_listeners(client):
+    assert all(middleware.cls is not ProfilingMiddleware for middleware in app.user_middleware)
+    assert not event.contains(Engine, "before_cursor_execute", _before_cursor_execute)
+    assert "x-profile-id" not in client.get("/api/v1/employees", headers={"X-Profile": "1"}).headers
+
+def test_admin_header_captures_profile_with_sql_timeline(profiled):
+    client, store, _ = profiled
+    assert "x-profile-id" not in client.post("/api/v1/employees", json=EMPLOYEE, headers={"X-Profile": "1"}).headers
+    assert "x-profile-id" not in client.get("/api/v1/employees", headers={"X-Profile": "1", "X-Admin-Token": "wrong"}).headers
+
+    response = client.get("/api/v1/employees", headers={"X-Profile": "1", "X-Admin-Token": ADMIN_TOKEN})
+    assert response.status_code == 200
+    profile = store.get(int(response.headers["x-profile-id"]))
+    assert profile.reason == "header" and profile.status_code == 200
+    assert profile.profiler == "cprofile" and "function calls" in profile.report
+    assert any(query["statement"].startswith("SELECT") for query in profile.sql)
+    assert all(query["offset_ms"] >= 0 for query in profile.sql)
+
+def test_sampling_and_ring_buffer(profiled):
+    client, store, middleware = profiled
+    middleware.sample_rate = 1.0
+    for _ in range(3):
+        client.get("/api/v1/employees")
+    profiles = store.list()
+    assert [profile["id"] for profile in profiles] == [3, 2]
+    assert {profile["reason"] for profile in profiles} == {"sampled"}
+
+def test_profile_admin_endpoints(client):
+    profile = RequestProfile(profile_store.next_id(), "POST", "/api/v1/leave-requests", "header")
+    profile_store.add(profile)
+    try:
+        assert client.get("/api/v1/admin/profiles").json()[0]["id"] == profile.id
+        assert client.get(f"/api/v1/admin/profiles/{profile.id}").json()["sql"] == []
+        assert client.get(f"/api/v1/admin/profiles/{profile.id}/flamegraph").status_code == 404
+        assert client.get("/api/v1/admin/profiles/0").status_code == 404
+    finally:
+        profile_store.clear()
@@ -0,0 +1,70 @@
+import asyncio
+from app.ratelimit import InMemoryBackend, ConcurrencyLimiter, get_client_id, rate_limiter, RATE_LIMIT_CLIENT_BURST
+
+def test_token_bucket_allows_burst_then_limits():
+    backend = InMemoryBackend()
+    for _ in range(3):
+        assert backend.take("client", rate=1, burst=3) == 0
+    retry_after = backend.take("client", rate=1, burst=3)
+    assert 0 < retry_after <= 1
+    assert backend.take("other-client", rate=1, burst=3) == 0
+
+def test_token_bucket_evicts_oldest_keys():
+    backend = InMemoryBackend(max_keys=2)
+    backend.take("a", rate=1, burst=1)
+    backend.take("b", rate=1, burst=1)
+    backend.take("c", rate=1, burst=1)
+    assert backend.take("a", rate=1, burst=1) == 0
+
+def test_concurrency_limiter_sheds_when_queue_is_full():
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=1, max_waiting=1, timeout=0.05)
+        assert await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not await limiter.acquire()
+        assert not await waiter
+        limiter.release()
+        assert await limiter.acquire()
+
+    asyncio.run(scenario())
+
+def test_write_route_returns_429_with_retry_after(client):
+    for _ in range(int(RATE_LIMIT_CLIENT_BURST)):
+        response = client.put("/api/v1/leave-requests/999/approve?processed_by=HR")
+        assert response.status_code == 400
+
+    response = client.put("/api/v1/leave-requests/999/approve?processed_by=HR")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+    # Untrusted peers cannot pick a fresh bucket by naming themselves.
+    spoofed = client.put("/api/v1/leave-requests/999/approve?processed_by=HR", headers={"X-Client-ID": "other"})
+    assert spoofed.status_code == 429
+
+def test_client_id_headers_are_trusted_only_from_proxies():
+    def scope(peer, **headers):
+        return {"client": (peer, 1234), "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]}
+
+    proxies = frozenset({"10.0.0.1"})
+    assert get_client_id(scope("203.0.113.9", x_client_id="admin"), proxies) == "203.0.113.9"
+    assert get_client_id(scope("10.0.0.1", x_client_id="user-42"), proxies) == "user-42"
+    assert get_client_id(scope("10.0.0.1", x_forwarded_for="1.1.1.1, 198.51.100.7"), proxies) == "198.51.100.7"
+    assert get_client_id(scope("10.0.0.1"), proxies) == "10.0.0.1"
+
+def test_read_routes_are_not_limited(client):
+    for _ in range(int(RATE_LIMIT_CLIENT_BURST) + 5):
+        assert client.get("/api/v1/employees").status_code == 200
+
+def test_rate_limit_stats_endpoint(client):
+    client.put("/api/v1/leave-requests/999/reject?processed_by=HR")
+    response = client.get("/api/v1/admin/rate-limits")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["counters"]["reject_leave.requests"] == 1
+    assert data["concurrency"]["limit"] == rate_limiter.concurrency.limit
+
+def test_admin_endpoints_fail_closed(client, monkeypatch):
+    assert client.get("/api/v1/admin/rate-limits", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    monkeypatch.setattr("app.auth.ADMIN_TOKEN", None)
+    assert client.get("/api/v1/admin/rate-limits").status_code == 403
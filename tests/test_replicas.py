@@ -0,0 +1,89 @@
+import os
+import shutil
+import sqlite3
+import pytest
+from datetime import date
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.database import ReplicaRouter, get_read_db
+from app.models import Base, Employee
+
+PRIMARY_PATH = "./test_replica_primary.db"
+REPLICA_PATH = "./test_replica_copy.db"
+
+@pytest.fixture
+def primary_sessionmaker():
+    engine = create_engine(f"sqlite:///{PRIMARY_PATH}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    db.add(Employee(name="Primary Only", email="primary@company.com", department="HR", joining_date=date(2024, 1, 1)))
+    db.commit()
+    db.close()
+    yield Session
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+@pytest.fixture
+def router(primary_sessionmaker):
+    shutil.copyfile(PRIMARY_PATH, REPLICA_PATH)
+    db = primary_sessionmaker()
+    db.add(Employee(name="Not Replicated Yet", email="lagging@company.com", department="HR", joining_date=date(2024, 1, 1)))
+    db.commit()
+    db.close()
+
+    router = ReplicaRouter([f"sqlite:///{REPLICA_PATH}"], primary_sessionmaker=primary_sessionmaker)
+    yield router
+    for replica in router.replicas:
+        replica.engine.dispose()
+    os.remove(REPLICA_PATH)
+
+def employee_names(db):
+    return sorted(e.name for e in db.query(Employee).all())
+
+def test_reads_are_routed_to_replica(router):
+    db, replica = router.session()
+    try:
+        assert replica is router.replicas[0]
+        assert employee_names(db) == ["Primary Only"]
+    finally:
+        db.close()
+
+def test_unhealthy_replica_falls_back_to_primary(primary_sessionmaker):
+    router = ReplicaRouter(["sqlite:////nonexistent-dir/replica.db"], primary_sessionmaker=primary_sessionmaker)
+    db, replica = router.session()
+    try:
+        assert replica is None
+        assert employee_names(db) == ["Primary Only"]
+        assert router.status()[0]["healthy"] is False
+    finally:
+        db.close()
+
+def test_round_robin_skips_unhealthy_replicas(router, primary_sessionmaker):
+    broken = ReplicaRouter(["sqlite:////nonexistent-dir/replica.db"]).replicas[0]
+    router.replicas.insert(0, broken)
+    picks = {id(router.pick()) for _ in range(4)}
+    assert picks == {id(router.replicas[1])}
+
+def test_read_routes_use_replica_and_strong_reads_use_primary(client, router, monkeypatch):
+    monkeypatch.setattr("app.database.read_router", router)
+    monkeypatch.delitem(app.dependency_overrides, get_read_db)
+
+    response = client.get("/api/v1/employees")
+    assert [e["name"] for e in response.json()] == ["Primary Only"]
+
+    response = client.get("/api/v1/employees", headers={"X-Read-Consistency": "strong"})
+    assert sorted(e["name"] for e in response.json()) == ["Not Replicated Yet", "Primary Only"]
+
+def test_failing_replica_query_is_retried_on_primary(client, router, monkeypatch):
+    monkeypatch.setattr("app.database.read_router", router)
+    monkeypatch.delitem(app.dependency_overrides, get_read_db)
+    with sqlite3.connect(REPLICA_PATH) as conn:
+        conn.execute("DROP TABLE leave_requests")
+
+    for path in ("/api/v1/employees/1/leave-requests", "/api/v1/employees/1/leave-balance"):
+        router.replicas[0].healthy = True
+        response = client.get(path)
+        assert response.status_code == 200
+        assert router.replicas[0].healthy is False
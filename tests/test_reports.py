@@ -0,0 +1,140 @@
+import csv
+import json
+import os
+import pytest
+from datetime import date
+from sqlalchemy import create_engine, insert
+from app.models import Base, Employee, LeaveRequest, LeaveStatus, OutboxJob, DEFAULT_TENANT
+from app.reports import YearEndReport, build_partition, entitlement_for_year
+from tests.conftest import TestingSessionLocal
+
+YEAR = 2025
+
+@pytest.fixture
+def database_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'reports.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Employee), [
+            {
+                "id": employee_id,
+                "tenant_id": DEFAULT_TENANT,
+                "name": f"Employee {employee_id}",
+                "email": f"employee{employee_id}@company.com",
+                "department": "Engineering" if employee_id % 2 else "Finance",
+                "joining_date": date(2025, 7, 1) if employee_id == 7 else date(2020, 1, 1),
+                "annual_leave_entitlement": 24.0
+            }
+            for employee_id in range(1, 11)
+        ])
+        conn.execute(insert(LeaveRequest), [
+            {"tenant_id": DEFAULT_TENANT, "employee_id": 1, "start_date": date(2024, 12, 30), "end_date": date(2025, 1, 3), "days_requested": 5, "status": LeaveStatus.APPROVED, "approval_steps": 0},
+            {"tenant_id": DEFAULT_TENANT, "employee_id": 1, "start_date": date(2025, 6, 2), "end_date": date(2025, 6, 11), "days_requested": 10, "status": LeaveStatus.APPROVED, "approval_steps": 0},
+            {"tenant_id": DEFAULT_TENANT, "employee_id": 1, "start_date": date(2025, 12, 22), "end_date": date(2025, 12, 23), "days_requested": 2, "status": LeaveStatus.PENDING, "approval_steps": 0},
+            {"tenant_id": DEFAULT_TENANT, "employee_id": 2, "start_date": date(2025, 3, 3), "end_date": date(2025, 3, 4), "days_requested": 2, "status": LeaveStatus.REJECTED, "approval_steps": 0},
+            {"tenant_id": DEFAULT_TENANT, "employee_id": 8, "start_date": date(2025, 8, 1), "end_date": date(2025, 8, 20), "days_requested": 20, "status": LeaveStatus.APPROVED, "approval_steps": 0},
+        ])
+    engine.dispose()
+    return url
+
+def read_csv(path):
+    with open(path, newline="") as handle:
+        return list(csv.DictReader(handle))
+
+def test_entitlement_is_prorated_in_joining_year():
+    assert entitlement_for_year(date(2025, 7, 1), 24, 2025) == 12
+    assert entitlement_for_year(date(2026, 1, 1), 24, 2025) == 0
+    assert entitlement_for_year(date(2020, 1, 1), 24, 2025) == 24
+
+def test_year_end_statements_and_department_summary(database_url, tmp_path):
+    output = tmp_path / "out"
+    progress = []
+    manifest = YearEndReport(database_url, YEAR, str(output), workers=1, chunk_size=4).run(progress=lambda done, total: progress.append((done, total)))
+
+    assert manifest["completed"] and manifest["total_partitions"] == 3
+    assert progress == [(0, 3), (1, 3), (2, 3), (3, 3)]
+
+    statements = {int(row["employee_id"]): row for row in read_csv(output / "statements.csv")}
+    assert sorted(statements) == list(range(1, 11))
+    assert float(statements[1]["used_days"]) == 13
+    assert float(statements[1]["pending_days"]) == 2
+    assert float(statements[1]["carry_over_days"]) == 5
+    assert statements[1]["approved_requests"] == "2"
+    assert float(statements[2]["used_days"]) == 0
+    assert float(statements[7]["entitlement_days"]) == 12
+    assert float(statements[8]["remaining_days"]) == 4
+    assert float(statements[8]["carry_over_days"]) == 4
+
+    departments = {row["department"]: row for row in read_csv(output / "departments.csv")}
+    assert departments["Engineering"]["employees"] == "5"
+    assert float(departments["Engineering"]["used_days"]) == 13
+    assert float(departments["Finance"]["used_days"]) == 20
+    assert float(departments["Finance"]["carry_over_days"]) == 24
+
+def test_interrupted_report_resumes_from_manifest(database_url, tmp_path, monkeypatch):
+    output = str(tmp_path / "out")
+    built, crash = [], [True]
+
+    def flaky(*args):
+        built.append(args[3])
+        if crash[0] and len(built) == 2:
+            raise RuntimeError("worker crashed")
+        return build_partition(*args)
+
+    monkeypatch.setattr("app.reports.build_partition", flaky)
+    with pytest.raises(RuntimeError):
+        YearEndReport(database_url, YEAR, output, workers=1, chunk_size=4).run()
+    with open(os.path.join(output, "manifest.json")) as handle:
+        assert list(json.load(handle)["partitions"]) == ["0-4"]
+
+    built.clear()
+    crash[0] = False
+    manifest = YearEndReport(database_url, YEAR, output, workers=1, chunk_size=4).run()
+    assert built == [4, 8]
+    assert manifest["completed"]
+    assert len(read_csv(os.path.join(output, "statements.csv"))) == 10
+
+    with pytest.raises(ValueError, match="different report"):
+        YearEndReport(database_url, YEAR + 1, output, workers=1, chunk_size=4).run()
+
+def test_new_run_id_regenerates_finished_report(database_url, tmp_path, monkeypatch):
+    output = str(tmp_path / "out")
+    YearEndReport(database_url, YEAR, output, workers=1, chunk_size=4).run()
+
+    built = []
+    def tracked(*args):
+        built.append(args[3])
+        return build_partition(*args)
+    monkeypatch.setattr("app.reports.build_partition", tracked)
+
+    assert YearEndReport(database_url, YEAR, output, workers=1, chunk_size=4).run()["run_id"] is None
+    assert built == []
+    manifest = YearEndReport(database_url, YEAR, output, workers=1, chunk_size=4, run_id="rerun").run()
+    assert manifest["run_id"] == "rerun" and manifest["completed"]
+    assert built == [0, 4, 8]
+    YearEndReport(database_url, YEAR, output, workers=1, chunk_size=4, run_id="rerun").run()
+    assert built == [0, 4, 8]
+
+def test_process_pool_matches_inline_run(database_url, tmp_path):
+    YearEndReport(database_url, YEAR, str(tmp_path / "inline"), workers=1, chunk_size=3).run()
+    YearEndReport(database_url, YEAR, str(tmp_path / "pool"), workers=2, chunk_size=3).run()
+    for name in ("statements.csv", "departments.csv"):
+        assert read_csv(tmp_path / "inline" / name) == read_csv(tmp_path / "pool" / name)
+
+def test_year_end_report_endpoints(client, tmp_path, monkeypatch):
+    monkeypatch.setattr("app.reports.REPORTS_DIR", str(tmp_path))
+    assert client.get(f"/api/v1/admin/reports/year-end/{YEAR}").status_code == 404
+
+    response = client.post(f"/api/v1/admin/reports/year-end/{YEAR}")
+    assert response.status_code == 202
+    assert response.json()["queued"] is True
+    assert client.post(f"/api/v1/admin/reports/year-end/{YEAR}").json()["queued"] is False
+    forced = client.post(f"/api/v1/admin/reports/year-end/{YEAR}?force=true").json()
+    assert forced["queued"] is True and forced["run_id"]
+
+    db = TestingSessionLocal()
+    try:
+        assert db.query(OutboxJob).filter(OutboxJob.job_type == "reports.year_end").count() == 2
+    finally:
+        db.close()
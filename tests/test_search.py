@@ -0,0 +1,81 @@
+import pytest
+from datetime import date
+from unittest.mock import patch
+from app.search import TrigramIndex, EmployeeSearchService
+
+EMPLOYEES = [
+    ("Alice Johnson", "alice.johnson@company.com", "Engineering"),
+    ("Alicia Keys", "alicia@company.com", "Marketing"),
+    ("Bob Smith", "bob.smith@company.com", "Engineering"),
+    ("Jonathan Malik", "jon.malik@company.com", "HR"),
+]
+
+@pytest.fixture
+def index():
+    index = TrigramIndex()
+    for employee_id, (name, email, department) in enumerate(EMPLOYEES, start=1):
+        index.add(employee_id, name, email, department)
+    return index
+
+def test_trigram_index_prefix(index):
+    assert index.search("ali", mode="prefix") == [1, 2]
+    assert index.search("bob.", mode="prefix") == [3]
+
+def test_trigram_index_substring(index):
+    assert index.search("smith", mode="substring") == [3]
+    assert index.search("company", mode="substring") == [1, 2, 3, 4]
+
+def test_trigram_index_fuzzy(index):
+    assert index.search("jonathon malik", mode="fuzzy")[0] == 4
+    assert index.search("zzzz", mode="fuzzy") == []
+
+def test_trigram_index_department_filter(index):
+    assert index.search("ali", department="Marketing") == [2]
+    assert index.search("ali", department="Finance") == []
+
+def test_trigram_index_auto_ranks_prefix_first(index):
+    assert index.search("jo", limit=2) == [4, 1]
+
+def create_employees(client):
+    for name, email, department in EMPLOYEES:
+        client.post("/api/v1/employees", json={
+            "name": name,
+            "email": email,
+            "department": department,
+            "joining_date": "2024-01-01"
+        })
+
+@pytest.mark.parametrize("backend", ["sqlite_fts", "memory"])
+def test_search_endpoint(client, backend):
+    EmployeeSearchService.reset()
+    with patch("app.search.SEARCH_BACKEND", backend):
+        create_employees(client)
+
+        response = client.get("/api/v1/employees/search", params={"q": "ali"})
+        assert response.status_code == 200
+        assert [e["name"] for e in response.json()] == ["Alice Johnson", "Alicia Keys", "Jonathan Malik"]
+
+        response = client.get("/api/v1/employees/search", params={"q": "ali", "mode": "prefix"})
+        assert [e["name"] for e in response.json()] == ["Alice Johnson", "Alicia Keys"]
+
+        response = client.get("/api/v1/employees/search", params={"q": "BOB.", "mode": "prefix"})
+        assert [e["name"] for e in response.json()] == ["Bob Smith"]
+
+        response = client.get("/api/v1/employees/search", params={"q": "smith", "mode": "substring"})
+        assert [e["name"] for e in response.json()] == ["Bob Smith"]
+
+        response = client.get("/api/v1/employees/search", params={"q": "jonathon", "mode": "fuzzy"})
+        assert response.json()[0]["name"] == "Jonathan Malik"
+
+        response = client.get("/api/v1/employees/search", params={"q": "ali", "department": "Engineering"})
+        assert [e["name"] for e in response.json()] == ["Alice Johnson"]
+    EmployeeSearchService.reset()
+
+def test_search_endpoint_department_only(client):
+    create_employees(client)
+    response = client.get("/api/v1/employees/search", params={"department": "Engineering"})
+    assert [e["name"] for e in response.json()] == ["Alice Johnson", "Bob Smith"]
+
+def test_search_endpoint_rejects_unknown_mode(client):
+    response = client.get("/api/v1/employees/search", params={"q": "ali", "mode": "regex"})
+    assert response.status_code == 422
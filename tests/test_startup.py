@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+import pytest
+from sqlalchemy import create_engine, inspect
+from app.database import ensure_schema, get_schema_version, SCHEMA_VERSION
+
+@pytest.fixture
+def bind(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'startup.db'}")
+    yield engine
+    engine.dispose()
+
+def test_importing_app_defers_optional_dependencies():
+    # An API-only process with profiling off loads neither the profiler nor report generation.
+    deferred = ["numpy", "cProfile", "pstats", "multiprocessing", "app.profiling", "app.reports"]
+    script = f"import sys, app.main; print([name for name in {deferred!r} if name in sys.modules])"
+    env = {**os.environ, "JOB_WORKER_ENABLED": "false", "PROFILING_ENABLED": "false"}
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True, env=env)
+    assert output.stdout.strip() == "[]"
+
+def test_ensure_schema_migrates_and_stamps_version(bind):
+    assert get_schema_version(bind) is None
+    assert ensure_schema(bind, auto_migrate=True)
+    assert get_schema_version(bind) == SCHEMA_VERSION
+    assert "employees" in inspect(bind).get_table_names()
+
+def test_startup_only_checks_version_when_schema_is_current(bind):
+    ensure_schema(bind, auto_migrate=True)
+    with bind.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE outbox_jobs")
+
+    assert not ensure_schema(bind, auto_migrate=True)
+    assert "outbox_jobs" not in inspect(bind).get_table_names()
+
+def test_startup_refuses_unmigrated_database_without_auto_migrate(bind):
+    with pytest.raises(RuntimeError, match="app.migrations upgrade"):
+        ensure_schema(bind, auto_migrate=False)
+    assert "employees" not in inspect(bind).get_table_names()
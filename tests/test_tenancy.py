@@ -0,0 +1,120 @@
+import pytest
+from datetime import date, timedelta
+from fastapi import Depends
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.database import get_db, get_read_db, make_engine
+from app.models import Base, DEFAULT_TENANT
+from app.services import EmployeeService, LeaveService
+from app.schemas import EmployeeCreate, LeaveRequestCreate
+from app.tenancy import ShardMap, get_tenant_id
+from tests.conftest import TestingSessionLocal
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_tenancy.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+SessionForTenants = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture
+def tenant_sessions():
+    Base.metadata.create_all(bind=engine)
+    sessions = {}
+    for tenant_id in ("acme", "globex"):
+        sessions[tenant_id] = SessionForTenants()
+        sessions[tenant_id].info["tenant_id"] = tenant_id
+    yield sessions
+    for session in sessions.values():
+        session.close()
+    Base.metadata.drop_all(bind=engine)
+
+def employee_data(email="jane@company.com"):
+    return EmployeeCreate(name="Jane Doe", email=email, department="Engineering", joining_date=date(2024, 1, 1))
+
+def test_services_are_tenant_scoped(tenant_sessions):
+    acme, globex = tenant_sessions["acme"], tenant_sessions["globex"]
+    acme_employee = EmployeeService.create_employee(acme, employee_data())
+    globex_employee = EmployeeService.create_employee(globex, employee_data())
+
+    assert acme_employee.tenant_id == "acme"
+    assert [e.id for e in EmployeeService.get_all_employees(acme)] == [acme_employee.id]
+    assert EmployeeService.get_employee_by_id(globex, acme_employee.id) is None
+
+    tomorrow = date.today() + timedelta(days=1)
+    leave = LeaveService.apply_leave(acme, LeaveRequestCreate(employee_id=acme_employee.id, start_date=tomorrow, end_date=tomorrow))
+    assert leave.tenant_id == "acme"
+    assert LeaveService.get_employee_leave_requests(globex, acme_employee.id) == []
+    with pytest.raises(ValueError, match="Employee not found"):
+        LeaveService.get_leave_balance(globex, acme_employee.id)
+
+def test_sessions_default_to_default_tenant(tenant_sessions):
+    db = SessionForTenants()
+    try:
+        employee = EmployeeService.create_employee(db, employee_data())
+        assert employee.tenant_id == DEFAULT_TENANT
+    finally:
+        db.close()
+
+def test_shard_map_routes_tenants_and_opens_pools_lazily(tmp_path):
+    created = []
+    urls = [f"sqlite:///{tmp_path / f'shard{i}.db'}" for i in range(3)]
+    shards = ShardMap(urls, engine_factory=make_engine, overrides={"pinned": 2}, on_engine_created=created.append)
+
+    assert shards.shard_for("pinned").index == 2
+    assert shards.shard_for("acme") is shards.shard_for("acme")
+    assert created == []
+
+    db = shards.session("acme")
+    try:
+        assert db.info["tenant_id"] == "acme"
+        assert db.get_bind().url.database.endswith(f"shard{shards.shard_for('acme').index}.db")
+    finally:
+        db.close()
+    assert len(created) == 1
+
+    shards.session("acme").close()
+    assert len(created) == 1
+
+def test_shard_map_evicts_idle_pools(tmp_path):
+    shards = ShardMap([f"sqlite:///{tmp_path / 'shard.db'}"], engine_factory=make_engine, idle_seconds=30)
+    shards.session("acme").close()
+    last_used = shards.shards[0].last_used
+
+    assert shards.evict_idle(now=last_used + 10) == 0
+    assert shards.evict_idle(now=last_used + 31) == 1
+    assert shards.stats()[0]["open"] is False
+
+    shards.session("acme").close()
+    assert shards.stats()[0]["open"] is True
+
+def test_background_sessions_do_not_keep_shards_open(tmp_path):
+    shards = ShardMap([f"sqlite:///{tmp_path / 'shard.db'}"], engine_factory=make_engine, idle_seconds=30)
+    shards.background_session(shards.shards[0]).close()
+    assert shards.stats()[0] == {"shard": 0, "open": False, "last_used": 0.0}
+
+    shards.session("acme").close()
+    last_used = shards.shards[0].last_used
+    shards.background_session(shards.shards[0]).close()
+    assert shards.shards[0].last_used == last_used
+    assert shards.evict_idle(now=last_used + 31) == 1
+
+def tenant_db(tenant_id: str = Depends(get_tenant_id)):
+    db = TestingSessionLocal()
+    db.info["tenant_id"] = tenant_id
+    try:
+        yield db
+    finally:
+        db.close()
+
+def test_tenant_header_is_required_in_multi_tenant_mode(client, monkeypatch):
+    monkeypatch.setattr("app.tenancy.MULTI_TENANT", True)
+    monkeypatch.setitem(app.dependency_overrides, get_db, tenant_db)
+    monkeypatch.setitem(app.dependency_overrides, get_read_db, tenant_db)
+
+    assert client.get("/api/v1/employees").status_code == 400
+
+    payload = {"name": "Jane Doe", "email": "jane@company.com", "department": "HR", "joining_date": "2024-01-01"}
+    assert client.post("/api/v1/employees", json=payload, headers={"X-Tenant-ID": "acme"}).status_code == 201
+    assert client.post("/api/v1/employees", json=payload, headers={"X-Tenant-ID": "globex"}).status_code == 201
+
+    response = client.get("/api/v1/employees", headers={"X-Tenant-ID": "acme"})
+    assert len(response.json()) == 1